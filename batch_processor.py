@@ -0,0 +1,920 @@
+"""پردازش دسته‌ای تصاویر بدون وابستگی به رابط گرافیکی
+
+این ماژول tkinter را وارد نمی‌کند تا از خط فرمان و روی سرورهای بدون
+نمایشگر هم قابل استفاده باشد.
+"""
+from tesseract_engine import create_engine, DEFAULT_ENGINE, OCRTimeout
+from code_extractor import extract_codes, find_codes
+from preprocessing import preprocess, blank_page_reason, StageTimer
+from page_source import open_page, source_fields, split_page, allow_large_images
+from tracing import PipelineStats
+from PIL import Image
+import re
+import os
+import sys
+import time
+import queue
+import threading
+from concurrent.futures import FIRST_COMPLETED, wait
+
+# پسوندهای تصاویر قابل پردازش
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tiff', '.tif', '.webp', '.pdf')
+
+# تنظیمات tesseract
+TESSERACT_CONFIG = r'--psm 6 --oem 3 -c tessedit_char_whitelist=0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ.,!?@#$%^&*()_-+={{}}[]|\\:;"\'<>/ '
+
+# تنظیمات tesseract برای خواندن دوباره یک خط جداشده
+LINE_TESSERACT_CONFIG = TESSERACT_CONFIG.replace('--psm 6', '--psm 7')
+
+# حالت cascade: خطوط با اطمینان کمتر با روش‌های دیگر دوباره خوانده می‌شوند
+CASCADE_MIN_CONFIDENCE = 70.0
+# اگر بیش از این نسبت از خطوط کم‌اطمینان باشند کل تصویر دوباره پردازش می‌شود
+CASCADE_REGION_SHARE = 0.5
+# فاصله اضافه دور کادر خط هنگام جدا کردن آن (نسبت به ارتفاع خط)
+CASCADE_LINE_PADDING = 0.3
+# روش‌های جایگزین پیش‌پردازش به ترتیب امتحان: (نام، تغییرات config)
+CASCADE_VARIANTS = (
+    ('sauvola', {'binary': True, 'threshold_method': 'sauvola'}),
+    ('gray', {'binary': False}),
+    ('upscale', {'upscale': 2.0}),
+    ('upscale_sauvola', {'upscale': 2.0, 'binary': True, 'threshold_method': 'sauvola'}),
+)
+
+# مهلت پیش‌فرض OCR هر تصویر (ثانیه)؛ صفر یعنی بدون مهلت
+IMAGE_TIME_LIMIT = 120.0
+
+# تلاش ارزان‌تر پس از پایان مهلت: تصویر کوچک‌تر، تقسیم‌بندی متن پراکنده و
+# سهمی از مهلت اصلی
+FALLBACK_SCALE = 0.5
+FALLBACK_TIME_SHARE = 0.5
+FALLBACK_TESSERACT_CONFIG = TESSERACT_CONFIG.replace('--psm 6', '--psm 11')
+
+# ظرفیت صف‌های بین مراحل خط لوله پردازش ترتیبی
+PIPELINE_DEPTH = 4
+
+# فایل‌های بزرگ‌تر از این پیشاپیش خوانده نمی‌شوند
+PREFETCH_MAX_BYTES = 256 * 1024 * 1024
+
+# نشانه پایان هر صف خط لوله
+_END = object()
+
+# پردازشگر هر فرایند کارگر (یک بار در initializer ساخته می‌شود)
+_worker_processor = None
+
+def _init_worker(cancel_event, max_image_pixels):
+    """راه‌اندازی فرایند کارگر با همان حد اندازه تصویر فرایند اصلی"""
+    global _worker_processor
+    if max_image_pixels:
+        allow_large_images(max_image_pixels)
+    _worker_processor = BatchProcessor()
+    threading.Thread(target=_watch_cancel, args=(cancel_event,), name='ocr-cancel', daemon=True).start()
+
+def _watch_cancel(cancel_event):
+    """لغو اجرای موتور کارگر (و کشتن فرایند tesseract آن) با درخواست لغو فرایند اصلی
+    
+    در یک رشته عادی اجرا می‌شود (نه کنترل‌کننده سیگنال) تا گرفتن قفل موتور
+    بی‌خطر باشد؛ در ویندوز هم کار می‌کند.
+    """
+    cancel_event.wait()
+    _worker_processor.cancel()
+
+def _process_images_worker(image_paths, config):
+    """پردازش یک بسته از تصاویر در فرایند کارگر"""
+    return _worker_processor.process_images(image_paths, config)
+
+def text_confidence(lines):
+    """اطمینان کل متن: میانگین اطمینان خطوط با وزن تعداد کاراکتر"""
+    chars = sum(line['chars'] for line in lines)
+    return sum(line['conf'] * line['chars'] for line in lines) / chars if chars else 0.0
+
+def prefetch_file(path, buffer):
+    """خواندن کامل فایل تا در حافظه نهان سیستم عامل قرار گیرد"""
+    with open(path, 'rb', buffering=0) as f:
+        while f.readinto(buffer):
+            pass
+
+class BatchProcessor:
+    """پردازشگر دسته‌ای تصاویر"""
+    
+    def __init__(self, cache=None):
+        self.queue = queue.Queue()
+        self.results = []
+        self.processing = False
+        self.engine = None
+        self.cache = cache
+        self.pipeline_stats = None
+        # موتورهای رشته‌های کاشی و رویداد لغو فرایندهای کارگر برای cancel
+        self.tile_engines = set()
+        self.cancel_event = None
+    
+    def get_engine(self, config):
+        """موتور OCR گرم برای این پردازشگر"""
+        name = config.get('engine', DEFAULT_ENGINE)
+        if self.engine is None or self.engine.name != name:
+            if self.engine is not None:
+                self.engine.close()
+            self.engine = create_engine(name)
+        return self.engine
+    
+    def start_batch(self):
+        """آغاز دسته تازه؛ لغو دسته قبلی پاک و موتور برای اجرای بعدی آماده می‌شود
+        
+        فقط نقطه‌های ورود (process_batch و resume_batch) آن را فراخوانی
+        می‌کنند تا cancel در حین تشخیص تکراری یا بازپخش دفترچه از دست نرود.
+        """
+        self.processing = True
+        if self.engine is not None:
+            self.engine.reset()
+    
+    def cancel(self):
+        """توقف پردازش همراه با کشتن اجرای در حال انجام موتورها
+        
+        فرایندهای کارگر process_batch_parallel با رویداد cancel_event موتور
+        خود را لغو می‌کنند (موتور tesserocr تا پایان مهلت تصویر جاری ادامه
+        می‌دهد). نتیجه تصاویر لغوشده گزارش نمی‌شود.
+        """
+        self.processing = False
+        for engine in [self.engine, *self.tile_engines]:
+            if engine is not None:
+                engine.cancel()
+        cancel_event = self.cancel_event
+        if cancel_event is not None:
+            cancel_event.set()
+    
+    def deadline(self, config, share=1.0):
+        """پایان مهلت OCR یک تصویر (time.monotonic) یا None"""
+        limit = config.get('time_limit')
+        return time.monotonic() + limit * share if limit else None
+    
+    def skip_reason(self, img, config):
+        """دلیل رد شدن صفحه بدون OCR ('blank' یا 'no_text') یا None"""
+        if not config.get('skip_blank'):
+            return None
+        return blank_page_reason(img, config)
+    
+    def preprocess_image(self, img, config, timings=None, timer=None):
+        """پیش‌پردازش تصویر بازشده"""
+        return preprocess(img, config, timings, timer)
+    
+    def recognize_cascade(self, source, base, config, timer):
+        """OCR با گذر ارزان اول و امتحان روش‌های دیگر فقط برای بخش‌های کم‌اطمینان
+        
+        اگر همه خطوط گذر اول اطمینان کافی داشته باشند هزینه همان یک گذر است.
+        اگر بیشتر خطوط کم‌اطمینان باشند کل تصویر و در غیر این صورت فقط همان
+        خطوط (از تصویر اصلی) با CASCADE_VARIANTS دوباره خوانده می‌شوند و
+        بهترین نتیجه نگه داشته می‌شود. خروجی {'text', 'confidence',
+        'variant', 'passes'}.
+        """
+        engine = self.get_engine(config)
+        min_confidence = config.get('min_confidence', CASCADE_MIN_CONFIDENCE)
+        timer.restart()
+        lines = engine.recognize_data(base, TESSERACT_CONFIG)
+        timer('ocr')
+        
+        variant = 'base'
+        passes = 1
+        low = [i for i, line in enumerate(lines) if line['conf'] < min_confidence]
+        variants = [
+            (name, dict(config, **changes)) for name, changes in CASCADE_VARIANTS
+            if any(config.get(key) != value for key, value in changes.items())
+        ]
+        
+        if not lines or len(low) > len(lines) * CASCADE_REGION_SHARE:
+            best = text_confidence(lines)
+            for name, variant_config in variants:
+                candidate = engine.recognize_data(
+                    self.preprocess_image(source, variant_config), TESSERACT_CONFIG
+                )
+                passes += 1
+                score = text_confidence(candidate)
+                if score > best:
+                    best, lines, variant = score, candidate, name
+                if best >= min_confidence:
+                    break
+        elif low:
+            # کادر خطوط در مختصات تصویر پیش‌پردازش‌شده است
+            scale_x = source.width / base.width
+            scale_y = source.height / base.height
+            for i in low:
+                left, top, right, bottom = lines[i]['box']
+                pad = (bottom - top) * CASCADE_LINE_PADDING
+                crop = source.crop((
+                    max(0, int((left - pad) * scale_x)), max(0, int((top - pad) * scale_y)),
+                    min(source.width, int((right + pad) * scale_x) + 1),
+                    min(source.height, int((bottom + pad) * scale_y) + 1)
+                ))
+                for name, variant_config in variants:
+                    candidate = engine.recognize_data(
+                        self.preprocess_image(crop, dict(variant_config, normalize=False)),
+                        LINE_TESSERACT_CONFIG
+                    )
+                    passes += 1
+                    score = text_confidence(candidate)
+                    if candidate and score > lines[i]['conf']:
+                        text = ' '.join(line['text'] for line in candidate)
+                        lines[i] = dict(lines[i], text=text, conf=score)
+                        variant = 'regions'
+                    if lines[i]['conf'] >= min_confidence:
+                        break
+        if passes > 1:
+            timer('cascade')
+        
+        return {
+            'text': '\n'.join(line['text'] for line in lines),
+            'confidence': round(text_confidence(lines), 1),
+            'variant': variant,
+            'passes': passes
+        }
+    
+    def new_timer(self, config):
+        """زمان‌سنج مراحل یک تصویر (با config['trace'] بازه‌ها هم ثبت می‌شوند)"""
+        return StageTimer({}, [] if config.get('trace') else None)
+    
+    def build_result(self, image_path, text, timer=None):
+        """ساخت نتیجه از متن استخراج شده"""
+        timer = timer or StageTimer()
+        
+        # پاکسازی و استخراج کدها
+        timer.restart()
+        cleaned_text = self.clean_text(text)
+        timer('clean_text')
+        code_matches = self.find_codes(text)
+        codes = [m['code'] for m in code_matches]
+        timer('extract_codes')
+        
+        return {
+            **source_fields(image_path),
+            'raw_text': text,
+            'cleaned_text': cleaned_text,
+            'codes': codes,
+            'code_matches': code_matches,
+            'code_count': len(codes),
+            'word_count': len(cleaned_text.split()),
+            'char_count': len(cleaned_text),
+            'processing_time': time.time(),
+            'success': True
+        }
+    
+    def attach_timings(self, result, timer):
+        """افزودن زمان مراحل (و در حالت trace بازه‌ها) به نتیجه"""
+        timings = timer.timings
+        timings['total'] = sum(timings.values())
+        result['timings'] = timings
+        if timer.spans is not None:
+            result['trace'] = {
+                'pid': os.getpid(),
+                'tid': threading.get_ident(),
+                'thread': threading.current_thread().name,
+                'spans': timer.spans
+            }
+        return result
+    
+    def skipped_result(self, image_path, reason, timer=None):
+        """نتیجه صفحه‌ای که بدون OCR رد شده است"""
+        result = self.build_result(image_path, '', timer)
+        result['skipped'] = reason
+        return result
+    
+    def process_image(self, image_path, config):
+        """پردازش یک تصویر یا یک صفحه (مرجع page_source.page_ref)"""
+        return self.process_images([image_path], config)[0]
+    
+    def lookup_cache(self, image_path, config, timer=None):
+        """جستجو در حافظه نهان؛ خروجی (کلید، نتیجه یا None)"""
+        if self.cache is None:
+            return None, None
+        try:
+            key, result = self.cache.lookup(image_path, config, TESSERACT_CONFIG)
+        except OSError:
+            # خطای خواندن فایل در مرحله پردازش گزارش می‌شود
+            return None, None
+        
+        if timer is not None:
+            timer('cache')
+            if result is not None:
+                self.attach_timings(result, timer)
+        return key, result
+    
+    def store_cache(self, key, result):
+        """ذخیره نتیجه در حافظه نهان (بدون بازه‌های trace)"""
+        if self.cache is not None and key is not None:
+            if 'trace' in result:
+                result = {k: v for k, v in result.items() if k != 'trace'}
+            self.cache.put(key, result)
+    
+    def prepare_image(self, image_path, config, timer):
+        """مراحل پیش از OCR یک تصویر
+        
+        خروجی (کلید حافظه نهان، نتیجه نهایی یا None، تصویر آماده OCR یا None)؛
+        برای نتیجه از حافظه نهان، صفحه ردشده، تصویر کاشی‌کاری‌شده (tiling)
+        یا خطا تصویری برنمی‌گردد. در حالت cascade تصویر آماده زوج (تصویر
+        اصلی، تصویر پیش‌پردازش‌شده) است.
+        """
+        key, result = self.lookup_cache(image_path, config, timer)
+        if result is not None:
+            return key, result, None
+        try:
+            # از فایل‌های چندصفحه‌ای فقط همین صفحه رمزگشایی می‌شود
+            img = open_page(image_path)
+            timer('open')
+            reason = self.skip_reason(img, config)
+            if config.get('skip_blank'):
+                timer('classify')
+            if reason:
+                # صفحه خالی بدون اجرای موتور
+                result = self.attach_timings(self.skipped_result(image_path, reason, timer), timer)
+                self.store_cache(key, result)
+                return key, result, None
+            if config.get('tile'):
+                # tiling فقط با گزینه tile وارد می‌شود
+                from tiling import needs_tiling, recognize_tiled
+                if needs_tiling(img, config):
+                    # تصویر بسیار بزرگ همین‌جا کاشی‌به‌کاشی و موازی خوانده می‌شود
+                    timer.restart()
+                    text = recognize_tiled(
+                        img, config, TESSERACT_CONFIG, config.get('tile_workers'),
+                        self.deadline(config), self.tile_engines
+                    )
+                    timer('ocr')
+                    return key, self.finish_result(image_path, text, timer, key), None
+            if config.get('cascade'):
+                # تصویر اصلی برای روش‌های جایگزین cascade نگه داشته می‌شود
+                return key, None, (img, self.preprocess_image(img, config, timer=timer))
+            return key, None, self.preprocess_image(img, config, timer=timer)
+        except Exception as e:
+            return key, self.attach_timings(self.error_result(image_path, e), timer), None
+    
+    def recognize_prepared(self, images, config, timers):
+        """OCR تصاویر آماده با یک بار اجرای موتور؛ خروجی متن یا استثنای هر تصویر
+        
+        در اجرای گروهی هر تصویر مهلت config['time_limit'] خودش را دارد
+        (engine.image_limit). اگر تصویری از مهلتش بگذرد، متن تصاویر تمام‌شده
+        نگه داشته می‌شود، فقط همان تصویر با recognize_fallback خوانده می‌شود و
+        بقیه دوباره گروهی اجرا می‌شوند. اگر اجرای گروهی به هر دلیل دیگری
+        شکست بخورد، تصاویر باقی‌مانده یکی‌یکی و هر کدام با مهلت خودش پردازش
+        می‌شوند تا خطای یک تصویر نتیجه بقیه را از بین نبرد. زمان اجرای گروهی
+        بین تصاویر تقسیم می‌شود. در حالت cascade هر تصویر جداگانه با
+        recognize_cascade خوانده می‌شود.
+        """
+        engine = self.get_engine(config)
+        if config.get('cascade'):
+            texts = []
+            for (source, base), timer in zip(images, timers):
+                engine.deadline = self.deadline(config)
+                try:
+                    texts.append(self.recognize_cascade(source, base, config, timer))
+                except Exception as e:
+                    timer('ocr')
+                    texts.append(e)
+                finally:
+                    engine.deadline = None
+            return texts
+        
+        texts = []
+        if len(images) > 1:
+            engine.image_limit = config.get('time_limit')
+            start = time.perf_counter()
+            start_wall = time.time()
+            try:
+                while len(texts) < len(images):
+                    try:
+                        texts.extend(engine.recognize_many(images[len(texts):], TESSERACT_CONFIG))
+                    except OCRTimeout as e:
+                        texts.extend(e.done)
+                        texts.append(self.recognize_fallback(images[len(texts)], config, e))
+            except Exception as e:
+                # بقیه تصاویر یکی‌یکی؛ پس از cancel هر اجرا بلافاصله لغو می‌شود
+                if not engine.cancelled:
+                    print(f"هشدار: اجرای گروهی موتور {engine.name} شکست خورد "
+                          f"({type(e).__name__}: {e})؛ {len(images) - len(texts)} تصویر یکی‌یکی "
+                          f"پردازش می‌شوند", file=sys.stderr, flush=True)
+            finally:
+                engine.image_limit = None
+            elapsed = time.perf_counter() - start
+            
+            for n, timer in enumerate(timers[:len(texts)]):
+                timer.timings['ocr'] = elapsed / len(texts)
+                if timer.spans is not None and n == 0:
+                    # یک بازه برای کل اجرای گروهی
+                    timer.spans.append((f"ocr ({len(texts)})", start_wall * 1e6, elapsed * 1e6))
+        
+        for img, timer in zip(images[len(texts):], timers[len(texts):]):
+            timer.restart()
+            texts.append(self.recognize_within_limit(img, config))
+            timer('ocr')
+        return texts
+    
+    def recognize_within_limit(self, img, config):
+        """OCR یک تصویر در مهلت config['time_limit']؛ خروجی متن یا استثنا
+        
+        پس از پایان مهلت، تصویر با recognize_fallback دوباره خوانده می‌شود.
+        """
+        engine = self.get_engine(config)
+        try:
+            engine.deadline = self.deadline(config)
+            return engine.recognize(img, TESSERACT_CONFIG)
+        except OCRTimeout as e:
+            return self.recognize_fallback(img, config, e)
+        except Exception as e:
+            return e
+        finally:
+            engine.deadline = None
+    
+    def recognize_fallback(self, img, config, error):
+        """تلاش ارزان‌تر برای تصویری که از مهلتش گذشت؛ خروجی {'text', 'fallback'} یا error
+        
+        اگر config['timeout_fallback'] خاموش نباشد نسخه کوچک‌تر تصویر با
+        FALLBACK_TESSERACT_CONFIG و سهمی از مهلت خوانده می‌شود.
+        """
+        engine = self.get_engine(config)
+        if not config.get('timeout_fallback', True) or engine.cancelled:
+            return error
+        small = img.resize((
+            max(1, round(img.width * FALLBACK_SCALE)), max(1, round(img.height * FALLBACK_SCALE))
+        ))
+        engine.deadline = self.deadline(config, FALLBACK_TIME_SHARE)
+        try:
+            return {'text': engine.recognize(small, FALLBACK_TESSERACT_CONFIG), 'fallback': 'timeout'}
+        except Exception:
+            return error
+        finally:
+            engine.deadline = None
+    
+    def finish_result(self, image_path, text, timer, key=None):
+        """نتیجه نهایی از خروجی موتور (متن، خروجی cascade یا استثنا)"""
+        if isinstance(text, Exception):
+            return self.attach_timings(self.error_result(image_path, text), timer)
+        details = {}
+        if isinstance(text, dict):
+            # اطمینان و روش انتخاب‌شده در حالت cascade، تعداد کاشی‌ها یا تلاش ارزان‌تر
+            details = dict(text)
+            text = details.pop('text')
+        result = self.attach_timings(self.build_result(image_path, text, timer), timer)
+        result.update(details)
+        if not details.get('fallback'):
+            # نتیجه تلاش ارزان‌تر با مهلت بیشتر بهتر می‌شود و نگه داشته نمی‌شود
+            self.store_cache(key, result)
+        return result
+    
+    def process_images(self, image_paths, config):
+        """پردازش چند تصویر با یک بار اجرای موتور
+        
+        هر نتیجه زمان مراحل خود را در result['timings'] دارد.
+        """
+        results = [None] * len(image_paths)
+        keys = [None] * len(image_paths)
+        timers = [self.new_timer(config) for _ in image_paths]
+        images = []
+        
+        for i, image_path in enumerate(image_paths):
+            keys[i], results[i], img = self.prepare_image(image_path, config, timers[i])
+            if img is not None:
+                images.append((i, img))
+        
+        if images:
+            texts = self.recognize_prepared(
+                [img for _, img in images], config, [timers[i] for i, _ in images]
+            )
+            for (i, _), text in zip(images, texts):
+                results[i] = self.finish_result(image_paths[i], text, timers[i], keys[i])
+        
+        return results
+    
+    def error_result(self, image_path, error):
+        """ساخت نتیجه خطا برای یک تصویر"""
+        result = {
+            **source_fields(image_path),
+            'error': str(error),
+            'success': False
+        }
+        if isinstance(error, OCRTimeout):
+            result['timeout'] = True
+        return result
+    
+    def process_batch(self, image_paths, config, workers=1, on_result=None, collect=True):
+        """پردازش دسته‌ای تصاویر به صورت ترتیبی یا موازی
+        
+        نتایج به ترتیب ورودی برگردانده می‌شوند و هر نتیجه پس از آماده شدن
+        به on_result(index, result) داده می‌شود. با collect=False نتایج
+        نگه داشته نمی‌شوند (مثلاً وقتی on_result آن‌ها را در فایل می‌نویسد)
+        و خروجی None است.
+        """
+        self.start_batch()
+        return self.run_batch(image_paths, config, workers, on_result, collect)
+    
+    def run_batch(self, image_paths, config, workers=1, on_result=None, collect=True):
+        """process_batch بدون آغاز دسته تازه؛ پس از cancel چیزی پردازش نمی‌شود"""
+        if config.get('dedup') and len(image_paths) > 1:
+            # تشخیص تکراری (numpy و هش تصاویر) فقط با dedup وارد می‌شود
+            from image_dedup import find_duplicates, DEDUP_DISTANCE
+            duplicates = find_duplicates(image_paths, config.get('dedup_distance', DEDUP_DISTANCE))
+            if not self.processing:
+                # توقف در حین تشخیص تکراری
+                return [] if collect else None
+            if duplicates:
+                return self.process_deduplicated(
+                    image_paths, config, duplicates, workers, on_result, collect
+                )
+        if workers and workers > 1 and len(image_paths) > 1:
+            return self.process_batch_parallel(image_paths, config, workers, on_result, collect)
+        return self.process_pipelined(image_paths, config, on_result, collect)
+    
+    def process_deduplicated(self, image_paths, config, duplicates, workers=1, on_result=None,
+                             collect=True):
+        """پردازش فقط نماینده هر خوشه تصاویر تکراری (image_dedup.find_duplicates)
+        
+        بقیه اعضای خوشه بلافاصله پس از نماینده نتیجه آن را با مسیر خودشان و
+        فیلدهای duplicate_of و duplicate_distance می‌گیرند؛ پس on_result
+        اندیس‌ها را لزوماً به ترتیب نمی‌بیند.
+        """
+        members = {}
+        for index, (representative, distance) in sorted(duplicates.items()):
+            members.setdefault(representative, []).append((index, distance))
+        representatives = [i for i in range(len(image_paths)) if i not in duplicates]
+        results = [None] * len(image_paths) if collect else None
+        
+        def deliver(index, result):
+            if collect:
+                results[index] = result
+            if on_result:
+                on_result(index, result)
+        
+        def emit(position, result):
+            index = representatives[position]
+            deliver(index, result)
+            for member, distance in members.get(index, ()):
+                deliver(member, self.duplicate_result(
+                    image_paths[member], result, image_paths[index], distance
+                ))
+        
+        self.run_batch(
+            [image_paths[i] for i in representatives], dict(config, dedup=False),
+            workers, emit, collect=False
+        )
+        
+        if not collect:
+            return None
+        return [r for r in results if r is not None]
+    
+    def duplicate_result(self, image_path, result, representative, distance):
+        """نتیجه عضو تکراری خوشه: کپی نتیجه نماینده با مسیر این تصویر"""
+        excluded = ('trace', 'timings', 'cached', 'resumed', 'path', 'filename', 'page')
+        duplicate = {k: v for k, v in result.items() if k not in excluded}
+        duplicate.update(source_fields(image_path))
+        duplicate['duplicate_of'] = representative
+        duplicate['duplicate_distance'] = distance
+        return duplicate
+    
+    def process_pipelined(self, image_paths, config, on_result=None, collect=True):
+        """پردازش ترتیبی با خط لوله خواندن، پیش‌پردازش، OCR و پس‌پردازش
+        
+        هر مرحله در رشته خودش اجرا می‌شود و صف‌های PIPELINE_DEPTH تایی بین
+        مراحل قرار دارند؛ پس در حین OCR یک تصویر، فایل‌های بعدی خوانده و
+        پیش‌پردازش می‌شوند. مرحله خواندن فایل را در حافظه نهان سیستم عامل
+        می‌آورد تا باز کردن با مسیر (و draft و mmap) بدون انتظار برای دیسک
+        یا شبکه انجام شود. پس‌پردازش و on_result در رشته فراخواننده اجرا
+        می‌شوند و ترتیب نتایج همان ترتیب ورودی است. آمار مراحل و عمق صف‌ها
+        پس از اجرا در self.pipeline_stats است. self.processing فقط خوانده
+        می‌شود (start_batch).
+        """
+        batch_size = max(1, int(config.get('engine_batch_size', 1)))
+        read_queue = queue.Queue(PIPELINE_DEPTH)
+        prepare_queue = queue.Queue(PIPELINE_DEPTH)
+        ocr_queue = queue.Queue(PIPELINE_DEPTH)
+        stats = PipelineStats(
+            ('read', 'prepare', 'ocr', 'post'),
+            {'read': PIPELINE_DEPTH, 'prepare': PIPELINE_DEPTH, 'ocr': PIPELINE_DEPTH}
+        )
+        self.pipeline_stats = stats
+        aborted = threading.Event()
+        errors = []
+        
+        def put(q, item):
+            while not aborted.is_set():
+                try:
+                    q.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        
+        def get(q, name):
+            while not aborted.is_set():
+                try:
+                    item = q.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if item is not _END:
+                    stats.sample(name, q.qsize())
+                return item
+            return _END
+        
+        def read():
+            buffer = bytearray(1024 * 1024)
+            last_path = None
+            for index, image_path in enumerate(image_paths):
+                if not self.processing:
+                    return
+                start = time.perf_counter()
+                path, _ = split_page(image_path)
+                if path != last_path:
+                    # صفحه‌های یک فایل فقط یک بار خوانده می‌شوند
+                    last_path = path
+                    try:
+                        if os.path.getsize(path) <= PREFETCH_MAX_BYTES:
+                            prefetch_file(path, buffer)
+                    except OSError:
+                        # خطای خواندن فایل در مرحله باز کردن گزارش می‌شود
+                        pass
+                elapsed = time.perf_counter() - start
+                stats.record('read', elapsed)
+                if not put(read_queue, (index, elapsed)):
+                    return
+        
+        def prepare():
+            while True:
+                item = get(read_queue, 'read')
+                if item is _END:
+                    return
+                if not self.processing:
+                    continue
+                index, read_time = item
+                start = time.perf_counter()
+                timer = self.new_timer(config)
+                timer.timings['read'] = read_time
+                key, result, img = self.prepare_image(image_paths[index], config, timer)
+                stats.record('prepare', time.perf_counter() - start)
+                if not put(prepare_queue, (index, timer, key, result, img)):
+                    return
+        
+        def recognize():
+            held = None
+            while True:
+                item = held if held is not None else get(prepare_queue, 'prepare')
+                held = None
+                if item is _END:
+                    return
+                if not self.processing:
+                    continue
+                if item[4] is None:
+                    # نتیجه آماده (حافظه نهان، صفحه ردشده یا خطا)
+                    if not put(ocr_queue, [item]):
+                        return
+                    continue
+                
+                # تصاویر بعدی تا اندازه بسته با یک بار اجرای موتور خوانده می‌شوند
+                batch = [item]
+                while len(batch) < batch_size:
+                    item = get(prepare_queue, 'prepare')
+                    if item is _END or item[4] is None:
+                        held = item
+                        break
+                    batch.append(item)
+                
+                start = time.perf_counter()
+                texts = self.recognize_prepared(
+                    [entry[4] for entry in batch], config, [entry[1] for entry in batch]
+                )
+                stats.record('ocr', time.perf_counter() - start, len(batch))
+                if not self.processing:
+                    # اجرای لغوشده با cancel
+                    continue
+                done = [(index, timer, key, None, text) for (index, timer, key, _, _), text in zip(batch, texts)]
+                if not put(ocr_queue, done):
+                    return
+        
+        def stage(target, output):
+            def run():
+                try:
+                    target()
+                except Exception as e:
+                    errors.append(e)
+                finally:
+                    put(output, _END)
+            return threading.Thread(target=run, name=f"pipeline-{target.__name__}", daemon=True)
+        
+        threads = [stage(read, read_queue), stage(prepare, prepare_queue), stage(recognize, ocr_queue)]
+        for thread in threads:
+            thread.start()
+        
+        results = []
+        try:
+            while True:
+                entries = get(ocr_queue, 'ocr')
+                if entries is _END:
+                    break
+                for index, timer, key, result, text in entries:
+                    if result is None:
+                        # خروجی موتور (متن یا استثنا)
+                        start = time.perf_counter()
+                        result = self.finish_result(image_paths[index], text, timer, key)
+                        stats.record('post', time.perf_counter() - start)
+                    if on_result:
+                        on_result(index, result)
+                    if collect:
+                        results.append(result)
+        finally:
+            aborted.set()
+            for thread in threads:
+                thread.join()
+            stats.finish()
+        
+        if errors:
+            raise errors[0]
+        return results if collect else None
+    
+    def resume_batch(self, image_paths, config, journal, workers=1, on_result=None,
+                     collect=True, restart=False):
+        """پردازش دسته‌ای قابل ادامه با دفترچه کار (job_journal.JobJournal)
+        
+        نتایج موفق ثبت‌شده در اجرای قبلی همین فهرست و تنظیمات با
+        result['resumed'] به on_result داده می‌شوند و بقیه تصاویر پردازش و
+        در دفترچه ثبت می‌شوند. اگر همه تصاویر انجام شوند کار تمام‌شده
+        علامت می‌خورد. اندیس‌ها و collect مانند process_batch هستند.
+        """
+        self.start_batch()
+        job = journal.open_job(image_paths, config, TESSERACT_CONFIG, restart)
+        done = job.completed_indexes()
+        results = [None] * len(image_paths) if collect else None
+        
+        # نتایج قبلی صفحه‌به‌صفحه از دفترچه خوانده و تحویل داده می‌شوند
+        for index, result in job.completed():
+            if not self.processing:
+                break
+            result = dict(result, resumed=True)
+            if collect:
+                results[index] = result
+            if on_result:
+                on_result(index, result)
+        
+        if not self.processing:
+            # توقف در حین بازپخش؛ کار برای ادامه بعدی باز می‌ماند
+            return [r for r in results if r is not None] if collect else None
+        
+        remaining = [i for i in range(len(image_paths)) if i not in done]
+        finished = len(done)
+        
+        def record(position, result):
+            nonlocal finished
+            index = remaining[position]
+            job.record(index, result)
+            finished += 1
+            if collect:
+                results[index] = result
+            if on_result:
+                on_result(index, result)
+        
+        try:
+            self.run_batch(
+                [image_paths[i] for i in remaining], config, workers, record, collect=False
+            )
+        finally:
+            job.flush()
+        
+        if finished == len(image_paths):
+            job.finish()
+        
+        if not collect:
+            return None
+        return [r for r in results if r is not None]
+    
+    def process_batch_parallel(self, image_paths, config, workers=None, on_result=None, collect=True):
+        """پردازش موازی تصاویر با مجموعه‌ای از فرایندهای کارگر
+        
+        تصاویر در بسته‌های config['engine_batch_size'] تایی به کارگرها داده
+        می‌شوند. نتایج به ترتیب اتمام به on_result(index, result) داده می‌شوند
+        و خروجی نهایی به ترتیب ورودی است. با False شدن self.processing
+        کارهای در صف لغو می‌شوند. حافظه نهان فقط در این فرایند خوانده و
+        نوشته می‌شود؛ جستجوی آن هم‌زمان با کار کارگرها انجام می‌شود و هر
+        بسته پس از پر شدن فرستاده می‌شود. collect مانند process_batch است.
+        self.processing فقط خوانده می‌شود (start_batch).
+        """
+        # multiprocessing فقط در حالت موازی بارگذاری می‌شود
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        from concurrent.futures.process import BrokenProcessPool
+        
+        self.pipeline_stats = None
+        batch_size = max(1, int(config.get('engine_batch_size', 1)))
+        results = [None] * len(image_paths)
+        attempts = [0] * len(image_paths)
+        keys = [None] * len(image_paths)
+        
+        def deliver(i, result):
+            if collect:
+                results[i] = result
+            if on_result:
+                on_result(i, result)
+        
+        def misses():
+            """اندیس تصاویری که در حافظه نهان نیستند؛ نتایج موجود همین‌جا تحویل می‌شوند"""
+            for i, image_path in enumerate(image_paths):
+                if not self.processing:
+                    return
+                keys[i], result = self.lookup_cache(image_path, config, self.new_timer(config))
+                if result is None:
+                    yield i
+                else:
+                    deliver(i, result)
+        
+        executor = None
+        futures = {}
+        pending_indexes = []
+        
+        def submit(indexes):
+            nonlocal executor
+            if executor is None:
+                cancel_event = multiprocessing.Event()
+                executor = ProcessPoolExecutor(
+                    max_workers=workers, initializer=_init_worker,
+                    initargs=(cancel_event, Image.MAX_IMAGE_PIXELS)
+                )
+                self.cancel_event = cancel_event
+            future = executor.submit(_process_images_worker, [image_paths[i] for i in indexes], config)
+            futures[future] = indexes
+        
+        def finish(done):
+            for future in done:
+                if not self.processing:
+                    # نتیجه کارهای لغوشده گزارش نمی‌شود
+                    return
+                indexes = futures.pop(future)
+                try:
+                    batch_results = future.result()
+                except BrokenProcessPool as e:
+                    # فرایند کارگر از کار افتاد؛ تصاویر یک بار دیگر در مجموعه جدید امتحان می‌شوند
+                    batch_results = []
+                    for i in indexes:
+                        attempts[i] += 1
+                        if attempts[i] < 2:
+                            pending_indexes.append(i)
+                            batch_results.append(None)
+                        else:
+                            batch_results.append(self.error_result(image_paths[i], e))
+                except Exception as e:
+                    batch_results = [self.error_result(image_paths[i], e) for i in indexes]
+                
+                for i, result in zip(indexes, batch_results):
+                    if result is None:
+                        continue
+                    if not result.get('fallback'):
+                        # نتیجه تلاش ارزان‌تر مانند finish_result نگه داشته نمی‌شود
+                        self.store_cache(keys[i], result)
+                    deliver(i, result)
+        
+        source = misses()
+        while self.processing:
+            try:
+                batch = []
+                for i in source:
+                    batch.append(i)
+                    if len(batch) == batch_size:
+                        submit(batch)
+                        batch = []
+                        # نتایج آماده در حین جستجوی حافظه نهان تحویل می‌شوند
+                        finish([future for future in futures if future.done()])
+                if batch and self.processing:
+                    submit(batch)
+                
+                while futures and self.processing:
+                    done, _ = wait(futures, timeout=0.2, return_when=FIRST_COMPLETED)
+                    finish(done)
+            finally:
+                # لغو کارهای در صف در صورت توقف
+                self.cancel_event = None
+                if executor is not None:
+                    executor.shutdown(wait=True, cancel_futures=True)
+                executor = None
+                futures.clear()
+            
+            if not pending_indexes:
+                break
+            source = iter(sorted(pending_indexes))
+            pending_indexes.clear()
+        
+        if not collect:
+            return None
+        return [r for r in results if r is not None]
+    
+    def clean_text(self, text):
+        """پاکسازی متن"""
+        # حذف کاراکترهای غیر انگلیسی و غیر عددی
+        lines = [line.strip() for line in text.split('\n') if line.strip()]
+        cleaned_lines = []
+        
+        for line in lines:
+            # فقط کاراکترهای انگلیسی، اعداد و علائم نگارشی مجاز
+            line = re.sub(r'[^\x00-\x7F]+', '', line)
+            line = re.sub(r'\s+', ' ', line)
+            if line.strip():
+                cleaned_lines.append(line)
+        
+        return '\n'.join(cleaned_lines)
+    
+    def extract_codes(self, text):
+        """استخراج کدهای مختلف از متن"""
+        return extract_codes(text)
+    
+    def find_codes(self, text):
+        """استخراج کدها همراه با دسته و موقعیت در متن"""
+        return find_codes(text)
@@ -0,0 +1,95 @@
+"""دقت و سرعت تشخیص تصاویر تکراری روی فرم‌های هم‌قالب
+
+برای هر صفحه ساختگی چند نسخه ساخته می‌شود: ذخیره دوباره JPEG و تغییر
+اندازه (باید تکراری شمرده شوند) و همان قالب با کد متفاوت (نباید تکراری
+شمرده شود، وگرنه نتیجه یک سند روی سند دیگر کپی می‌شود). فاصله هش هر
+نسخه و نتیجه find_duplicates گزارش می‌شود؛ اگر سند هم‌قالبی تکراری شمرده
+شود کد خروج ۱ است.
+
+    python benchmarks/bench_dedup.py --pages 10
+    python benchmarks/bench_dedup.py --distance 12
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from PIL import Image
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from corpus import render_page  # noqa: E402
+from image_dedup import DEDUP_DISTANCE, find_duplicates, hamming, image_hash  # noqa: E402
+
+# نسخه‌ها: (نام، تکراری بودن مورد انتظار)
+VARIANTS = (
+    ('resave', True),
+    ('scaled', True),
+    ('template', False),
+)
+
+
+def build_pages(directory, pages):
+    """ساخت صفحه‌ها و نسخه‌هایشان؛ خروجی فهرست (مسیر، اندیس اصل یا None، نام نسخه)"""
+    items = []
+    for seed in range(pages):
+        original, _, _ = render_page('clean', seed)
+        template, _, _ = render_page('clean', seed, variant=1)
+        base = len(items)
+        path = os.path.join(directory, f"page_{seed:03d}.png")
+        original.save(path)
+        items.append((path, None, 'original'))
+
+        path = os.path.join(directory, f"page_{seed:03d}_resave.jpg")
+        original.save(path, quality=60)
+        items.append((path, base, 'resave'))
+
+        path = os.path.join(directory, f"page_{seed:03d}_scaled.png")
+        original.resize((original.width * 4 // 5, original.height * 4 // 5), Image.LANCZOS).save(path)
+        items.append((path, base, 'scaled'))
+
+        path = os.path.join(directory, f"page_{seed:03d}_template.png")
+        template.save(path)
+        items.append((path, base, 'template'))
+    return items
+
+
+def main():
+    parser = argparse.ArgumentParser(description="دقت تشخیص تکراری روی فرم‌های هم‌قالب")
+    parser.add_argument('--pages', type=int, default=5, help="تعداد صفحه‌های اصلی")
+    parser.add_argument('--distance', type=int, default=DEDUP_DISTANCE, help="فاصله همینگ نامزدها")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        items = build_pages(directory, args.pages)
+        paths = [path for path, _, _ in items]
+        hashes = [image_hash(path) for path in paths]
+
+        start = time.perf_counter()
+        duplicates = find_duplicates(paths, args.distance)
+        elapsed = time.perf_counter() - start
+
+    expected = dict(VARIANTS)
+    wrong_merges = 0
+    print(f"{'نسخه':<10} {'فاصله هش':>10} {'تکراری':>8} {'انتظار':>8}")
+    for position, (path, original, name) in enumerate(items):
+        if original is None:
+            continue
+        distance = hamming(hashes[position], hashes[original])
+        merged = duplicates.get(position, (None,))[0] == original
+        if merged and not expected[name]:
+            wrong_merges += 1
+        print(f"{name:<10} {distance:>10} {str(merged):>8} {str(expected[name]):>8}")
+
+    found = sum(1 for position, (_, original, name) in enumerate(items)
+                if expected.get(name) and duplicates.get(position, (None,))[0] == original)
+    print(f"تکراری‌های یافته: {found} از {2 * args.pages} | "
+          f"ادغام نادرست هم‌قالب: {wrong_merges} | زمان: {elapsed:.2f}s")
+    return 1 if wrong_merges else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
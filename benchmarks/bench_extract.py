@@ -0,0 +1,120 @@
+"""مقایسه سرعت و یکسانی خروجی استخراج کدها
+
+پیاده‌سازی قبلی (هفت بار re.findall) با code_extractor روی متن‌های بزرگ
+ساختگی مقایسه می‌شود. در صورت تفاوت خروجی، اسکریپت با کد ۱ خارج می‌شود.
+
+    python benchmarks/bench_extract.py --pages 200 --repeat 5
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from code_extractor import PATTERNS, extract_codes, find_codes  # noqa: E402
+
+
+def legacy_extract_codes(text):
+    """پیاده‌سازی قبلی BatchProcessor.extract_codes"""
+    codes = []
+    for pattern in PATTERNS:
+        matches = re.findall(pattern, text, re.IGNORECASE)
+        codes.extend(matches)
+
+    unique_codes = []
+    seen = set()
+    for code in codes:
+        if code not in seen:
+            seen.add(code)
+            unique_codes.append(code)
+    return unique_codes
+
+
+def random_token(rng):
+    """یک کلمه یا کد تصادفی شبیه خروجی OCR"""
+    letters = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
+    digits = '0123456789'
+    kind = rng.random()
+    if kind < 0.45:
+        return ''.join(rng.choice(letters) for _ in range(rng.randint(1, 11)))
+    if kind < 0.6:
+        return ''.join(rng.choice(digits) for _ in range(rng.randint(1, 12)))
+    if kind < 0.7:
+        return (''.join(rng.choice(letters) for _ in range(rng.randint(1, 6))) +
+                ''.join(rng.choice(digits) for _ in range(rng.randint(1, 9))))
+    if kind < 0.78:
+        return ''.join(rng.choice(letters + digits) for _ in range(rng.randint(5, 14)))
+    if kind < 0.82:
+        return f"user{rng.randint(1, 999)}.{rng.choice(['x', 'ops'])}@mail{rng.randint(1, 9)}.com"
+    if kind < 0.85:
+        return f"https://example{rng.randint(1, 99)}.org/p/{rng.randint(1, 9999)}?q=a"
+    if kind < 0.88:
+        return '.'.join(str(rng.randint(0, 999)) for _ in range(rng.choice([3, 4, 5])))
+    if kind < 0.92:
+        return rng.choice(['_id', 'A_B12345', '۱۲۳۴۵', 'Kelvin', 'ſtate', 'naïve', 'x-y', '1.5'])
+    return rng.choice([',', '.', ';', ':', '-', '(', ')', '#', '!', '|'])
+
+
+def make_text(rng, pages, words_per_page=400):
+    """متن ساختگی بزرگ با کدها، ایمیل‌ها، لینک‌ها و آی‌پی‌ها"""
+    page_texts = []
+    for _ in range(pages):
+        words = []
+        for i in range(words_per_page):
+            words.append(random_token(rng))
+            words.append('\n' if i % 12 == 11 else rng.choice([' ', ' ', '  ', ', ']))
+        page_texts.append(''.join(words))
+    return '\n\f'.join(page_texts)
+
+
+def best_time(func, text, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(text)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="مقایسه استخراج کدها")
+    parser.add_argument('--pages', type=int, default=200, help="تعداد صفحات متن ساختگی")
+    parser.add_argument('--repeat', type=int, default=5, help="تعداد تکرار هر اندازه‌گیری")
+    parser.add_argument('--seed', type=int, default=1234)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+
+    # بررسی یکسانی روی متن‌های کوچک متنوع
+    mismatches = 0
+    for _ in range(300):
+        sample = make_text(rng, 1, rng.randint(1, 60))
+        if extract_codes(sample) != legacy_extract_codes(sample):
+            mismatches += 1
+
+    text = make_text(rng, args.pages)
+    same = extract_codes(text) == legacy_extract_codes(text)
+
+    # بررسی موقعیت‌ها
+    offsets_ok = all(text.startswith(m['code'], m['offset']) for m in find_codes(text))
+
+    legacy_time = best_time(legacy_extract_codes, text, args.repeat)
+    new_time = best_time(extract_codes, text, args.repeat)
+
+    print(f"اندازه متن: {len(text):,} کاراکتر، {args.pages} صفحه")
+    print(f"روش قبلی:  {legacy_time * 1000:8.2f} ms")
+    print(f"روش جدید:  {new_time * 1000:8.2f} ms")
+    print(f"تسریع:     {legacy_time / new_time:8.2f}x")
+    print(f"یکسانی خروجی: {'بله' if same and not mismatches else 'خیر'} "
+          f"({mismatches} تفاوت در ۳۰۰ نمونه کوچک)")
+    print(f"موقعیت‌ها درست: {'بله' if offsets_ok else 'خیر'}")
+
+    return 0 if same and not mismatches and offsets_ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
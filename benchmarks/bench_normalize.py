@@ -0,0 +1,86 @@
+"""اثر نرمال‌سازی وضوح و رمزگشایی کاهش‌یافته JPEG روی زمان و حافظه
+
+هر حالت در یک فرایند جدا اجرا می‌شود تا بیشینه حافظه (RSS) هر کدام
+جداگانه اندازه‌گیری شود (فقط روی لینوکس و مک).
+
+    python benchmarks/bench_normalize.py --images 5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from PIL import Image, ImageDraw, ImageFont
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from preprocessing import preprocess  # noqa: E402
+
+
+def make_photo(path, scale, seed):
+    """عکس ساختگی با متن درشت (مانند عکس گوشی از یک سند)"""
+    img = Image.new('L', (1000, 750), 230)
+    draw = ImageDraw.Draw(img)
+    font = ImageFont.load_default()
+    for row, y in enumerate(range(10, 740, 18)):
+        draw.text((10, y), f"INVOICE AB{seed:02d}{row:03d}45 TOTAL {row}.10 REF 777", fill=25, font=font)
+    img = img.resize((1000 * scale, 750 * scale), Image.BICUBIC).convert('RGB')
+    img.save(path, quality=90)
+
+
+def run_child(paths, normalize):
+    """اجرای پیش‌پردازش و گزارش زمان، اندازه خروجی و بیشینه حافظه"""
+    config = {'enhance_contrast': True, 'denoise': True, 'binary': True, 'normalize': normalize}
+    start = time.perf_counter()
+    sizes = []
+    for path in paths:
+        sizes.append(preprocess(Image.open(path), config).size)
+    elapsed = time.perf_counter() - start
+
+    peak_mb = None
+    try:
+        import resource
+        peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak_mb = peak_kb / 1024 if sys.platform != 'darwin' else peak_kb / 1024 / 1024
+    except ImportError:
+        pass
+    print(json.dumps({'seconds': elapsed, 'peak_mb': peak_mb, 'size': sizes[0]}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="زمان‌سنجی نرمال‌سازی وضوح")
+    parser.add_argument('--images', type=int, default=5)
+    parser.add_argument('--scale', type=int, default=6, help="بزرگ‌نمایی عکس‌های ساختگی")
+    parser.add_argument('--child', choices=['plain', 'normalize'], help=argparse.SUPPRESS)
+    parser.add_argument('paths', nargs='*', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.paths, args.child == 'normalize')
+        return
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        paths = []
+        for i in range(args.images):
+            path = os.path.join(temp_dir, f'photo_{i}.jpg')
+            make_photo(path, args.scale, i)
+            paths.append(path)
+
+        print(f"{args.images} عکس JPEG {1000 * args.scale}x{750 * args.scale}")
+        print(f"{'حالت':<10} {'ms/تصویر':>10} {'RSS (MB)':>10}  اندازه خروجی")
+        for mode in ('plain', 'normalize'):
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--child', mode] + paths,
+                stdout=subprocess.PIPE, check=True
+            ).stdout
+            report = json.loads(output)
+            peak = f"{report['peak_mb']:.0f}" if report['peak_mb'] else '-'
+            print(f"{mode:<10} {report['seconds'] * 1000 / args.images:>10.1f} {peak:>10}  {report['size']}")
+
+
+if __name__ == '__main__':
+    main()
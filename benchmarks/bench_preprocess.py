@@ -0,0 +1,110 @@
+"""زمان هر مرحله پیش‌پردازش و مقایسه با زنجیره قبلی PIL
+
+    python benchmarks/bench_preprocess.py --size 2480x3508 --repeat 3
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+from PIL import Image, ImageDraw, ImageEnhance, ImageFilter, ImageFont
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from preprocessing import THRESHOLD_METHODS, preprocess  # noqa: E402
+
+
+def legacy_preprocess(img, config):
+    """زنجیره قبلی BatchProcessor.process_image"""
+    if img.mode != 'L':
+        img = img.convert('L')
+    if config['enhance_contrast']:
+        img = ImageEnhance.Contrast(img).enhance(2.0)
+    if config['denoise']:
+        img = img.filter(ImageFilter.MedianFilter(size=3))
+    if config['binary']:
+        img = img.point(lambda x: 0 if x < 180 else 255, '1')
+    return img
+
+
+def make_page(width, height, seed, background=235):
+    """صفحه ساختگی با متن، نویز و روشنایی ناهموار"""
+    rng = random.Random(seed)
+    img = Image.new('RGB', (width, height), (background,) * 3)
+    draw = ImageDraw.Draw(img)
+    font = ImageFont.load_default()
+
+    # سایه ملایم برای شبیه‌سازی اسکن کم‌نور
+    for x in range(0, width, 8):
+        shade = int(background - 60 * x / width)
+        draw.rectangle((x, 0, x + 8, height), fill=(shade,) * 3)
+
+    for y in range(10, height - 20, 18):
+        line = ' '.join(
+            ''.join(rng.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789') for _ in range(rng.randint(3, 10)))
+            for _ in range(width // 70)
+        )
+        draw.text((10, y), line, fill=(rng.randint(0, 80),) * 3, font=font)
+
+    for _ in range(width * height // 400):
+        x, y = rng.randrange(width), rng.randrange(height)
+        draw.point((x, y), fill=(rng.randint(0, 255),) * 3)
+    return img
+
+
+def time_it(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="زمان‌سنجی پیش‌پردازش")
+    parser.add_argument('--size', default='2480x3508', help="اندازه تصویر WxH")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.lower().split('x'))
+    page = make_page(width, height, seed=1)
+    full = {'enhance_contrast': True, 'denoise': True, 'binary': True}
+
+    # یکسانی خروجی روش fixed با زنجیره قبلی در همه ترکیب‌ها
+    small = make_page(400, 300, seed=2)
+    identical = True
+    for contrast in (False, True):
+        for denoise in (False, True):
+            for binary in (False, True):
+                config = {'enhance_contrast': contrast, 'denoise': denoise, 'binary': binary}
+                new = preprocess(small.copy(), config)
+                old = legacy_preprocess(small.copy(), config)
+                if new.mode != old.mode or new.tobytes() != old.tobytes():
+                    identical = False
+                    print(f"تفاوت در {config}")
+
+    legacy_time, legacy_page = time_it(lambda: legacy_preprocess(page.copy(), full), args.repeat)
+    if preprocess(page.copy(), full).tobytes() != legacy_page.tobytes():
+        identical = False
+        print("تفاوت در تصویر بزرگ")
+    print(f"تصویر {width}x{height}")
+    print(f"{'روش':<10} {'کل (ms)':>9}  مراحل (ms)")
+    print(f"{'legacy':<10} {legacy_time * 1000:>9.1f}")
+
+    for method in THRESHOLD_METHODS:
+        config = dict(full, threshold_method=method)
+        timings = {}
+        elapsed, _ = time_it(lambda: preprocess(page.copy(), config, {}), args.repeat)
+        preprocess(page.copy(), config, timings)
+        stages = '  '.join(f"{stage}={seconds * 1000:.1f}" for stage, seconds in timings.items())
+        print(f"{method:<10} {elapsed * 1000:>9.1f}  {stages}")
+
+    print(f"خروجی fixed با روش قبلی یکسان است: {'بله' if identical else 'خیر'}")
+    return 0 if identical else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
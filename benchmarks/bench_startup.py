@@ -0,0 +1,105 @@
+"""زمان راه‌اندازی سرد هر حالت برنامه (خط فرمان، سرویس، رابط گرافیکی)
+
+هر حالت چند بار در یک مفسر تازه اجرا و کمینه و میانه زمان گزارش می‌شود؛
+اجرای خالی python مبنای مقایسه است. خواندن نسخه و زبان‌های tesseract یک
+بار بدون حافظه نهان و یک بار با آن اندازه‌گیری می‌شود. با --top کندترین
+ماژول‌های هر حالت (بر اساس python -X importtime) هم چاپ می‌شوند و با
+--budget اگر میانه حالت cli از این مقدار (میلی‌ثانیه) بیشتر باشد کد خروج ۱ است.
+
+    python benchmarks/bench_startup.py --repeat 20 --top 5
+    python benchmarks/bench_startup.py --budget 400
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# حالت‌ها: (نام، آرگومان‌های مفسر)
+MODES = (
+    ('python', ['-c', 'pass']),
+    ('cli', [os.path.join(ROOT, 'ocr_cli.py'), '--help']),
+    ('service', ['-c', 'import ocr_server']),
+    ('gui', ['-c', 'import p']),
+)
+
+
+def run_once(args, env):
+    start = time.perf_counter()
+    subprocess.run([sys.executable] + args, cwd=ROOT, env=env, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def measure(args, repeat, env, prepare=None):
+    """زمان‌های اجرا (ثانیه)؛ prepare پیش از هر اجرا فراخوانی می‌شود"""
+    times = []
+    for _ in range(repeat):
+        if prepare is not None:
+            prepare()
+        times.append(run_once(args, env))
+    return times
+
+
+def slowest_imports(args, env, count):
+    """کندترین ماژول‌ها بر اساس زمان خود ماژول: فهرست (میکروثانیه، نام)"""
+    proc = subprocess.run([sys.executable, '-X', 'importtime'] + args, cwd=ROOT, env=env,
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        rows.append((int(self_us), name.strip()))
+    return sorted(rows, reverse=True)[:count]
+
+
+def report(name, times):
+    print(f"{name:<16} min {min(times) * 1000:7.1f} ms | median {statistics.median(times) * 1000:7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="اندازه‌گیری زمان راه‌اندازی سرد")
+    parser.add_argument('--repeat', type=int, default=10, help="تعداد اجرای هر حالت")
+    parser.add_argument('--top', type=int, default=0, help="چاپ این تعداد از کندترین ماژول‌ها")
+    parser.add_argument('--budget', type=float, default=0,
+                        help="بیشترین میانه مجاز حالت cli (میلی‌ثانیه)")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    medians = {}
+    for name, mode_args in MODES:
+        times = measure(mode_args, args.repeat, env)
+        medians[name] = statistics.median(times)
+        report(name, times)
+        if args.top and name != 'python':
+            for self_us, module in slowest_imports(mode_args, env, args.top):
+                print(f"    {self_us / 1000:7.1f} ms  {module}")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        info_path = os.path.join(temp_dir, 'tesseract.json')
+        discovery = [os.path.join(ROOT, 'tesseract_discovery.py'), '--info-path', info_path]
+
+        def clear():
+            if os.path.exists(info_path):
+                os.remove(info_path)
+
+        # کد خروج ۱ یعنی tesseract پیدا نشد
+        try:
+            report('tesseract cold', measure(discovery, args.repeat, env, clear))
+            report('tesseract cached', measure(discovery, args.repeat, env))
+        except subprocess.CalledProcessError:
+            print("tesseract پیدا نشد؛ زمان خواندن نسخه اندازه‌گیری نشد")
+
+    if args.budget and medians['cli'] * 1000 > args.budget:
+        print(f"میانه راه‌اندازی cli بیش از {args.budget:.0f} ms است", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,247 @@
+"""مجموعه بنچمارک تکرارپذیر کل زنجیره پردازش
+
+روی مجموعه تصاویر ساختگی benchmarks/corpus.py (متن با کد، ایمیل و آی‌پی،
+نویز، تاری، چرخش، اسکن بزرگ، عکس JPEG و صفحه خالی) هر مرحله در یک
+فرایند جدا اجرا می‌شود تا بیشینه حافظه هر کدام جداگانه اندازه‌گیری شود:
+
+    pipeline    کل BatchProcessor (پیش‌پردازش، OCR و استخراج کد)
+    preprocess  فقط پیش‌پردازش
+    classify    فقط تشخیص صفحه خالی
+    extract     فقط استخراج کد از متن واقعی رسم‌شده
+
+برای هر مرحله تصویر/ثانیه، صدک‌های تأخیر، بیشینه حافظه و جدول زمان
+زیرمراحل گزارش می‌شود و برای pipeline و extract بازیابی کدها (recall)
+نسبت به کدهای رسم‌شده. با --baseline نتیجه با اجرای ذخیره‌شده قبلی مقایسه
+می‌شود و اگر افت از --threshold بیشتر باشد اسکریپت با کد ۱ خارج می‌شود.
+
+    python benchmarks/bench_suite.py --save-baseline baseline.json
+    python benchmarks/bench_suite.py --baseline baseline.json --threshold 0.15
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+from corpus import build_corpus  # noqa: E402
+from tracing import StageStats, percentile  # noqa: E402
+
+STAGES = ('pipeline', 'preprocess', 'classify', 'extract')
+DEFAULT_CORPUS_DIR = os.path.join(tempfile.gettempdir(), 'ocr_offline_corpus')
+
+# معیارهای مقایسه با خط پایه: (کلید، True اگر مقدار بیشتر بهتر باشد)
+COMPARED_METRICS = (
+    ('images_per_sec', True),
+    ('p95_ms', False),
+    ('peak_rss_mb', False),
+    ('recall', True),
+)
+
+PIPELINE_CONFIG = {
+    'enhance_contrast': True,
+    'denoise': True,
+    'binary': True,
+    'skip_blank': True,
+}
+
+
+def peak_rss_mb():
+    """بیشینه حافظه این فرایند (فقط لینوکس و مک)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+
+def code_recall(images, found_codes):
+    """نسبت کدهای رسم‌شده‌ای که پیدا شده‌اند"""
+    expected = found = 0
+    for image, codes in zip(images, found_codes):
+        # تصویری که OCR آن خطا داده در recall حساب نمی‌شود
+        if codes is None:
+            continue
+        expected += len(image['codes'])
+        found += sum(1 for code in image['codes'] if code in codes)
+    return found / expected if expected else None
+
+
+def run_stage(stage, corpus_dir, manifest, engine, batch_size):
+    """اجرای یک مرحله روی کل مجموعه؛ خروجی (تأخیرها، زمان‌ها، کدهای پیداشده، خطاها)"""
+    from PIL import Image
+    from batch_processor import BatchProcessor
+    from code_extractor import extract_codes
+    from preprocessing import blank_page_reason, preprocess
+
+    images = manifest['images']
+    paths = [os.path.join(corpus_dir, image['path']) for image in images]
+    latencies = []
+    stage_stats = StageStats()
+    found_codes = []
+    errors = 0
+
+    if stage == 'pipeline':
+        processor = BatchProcessor()
+        config = dict(PIPELINE_CONFIG, engine=engine, engine_batch_size=batch_size)
+        for start in range(0, len(paths), batch_size):
+            for result in processor.process_images(paths[start:start + batch_size], config):
+                latencies.append(result['timings']['total'])
+                stage_stats.add(result['timings'])
+                found_codes.append(set(result.get('codes', ())) if result['success'] else None)
+                errors += not result['success']
+        if processor.engine is not None:
+            processor.engine.close()
+
+    elif stage == 'preprocess':
+        config = dict(PIPELINE_CONFIG)
+        for path in paths:
+            timings = {}
+            start = time.perf_counter()
+            preprocess(Image.open(path), config, timings)
+            latencies.append(time.perf_counter() - start)
+            stage_stats.add(timings)
+
+    elif stage == 'classify':
+        for image, path in zip(images, paths):
+            start = time.perf_counter()
+            reason = blank_page_reason(Image.open(path), {})
+            latencies.append(time.perf_counter() - start)
+            # صفحه خالی باید رد شود و بقیه نه
+            errors += (reason == 'blank') != (image['kind'] == 'blank')
+
+    elif stage == 'extract':
+        for image in images:
+            start = time.perf_counter()
+            codes = extract_codes(image['text'])
+            latencies.append(time.perf_counter() - start)
+            found_codes.append(set(codes))
+
+    return latencies, stage_stats, found_codes, errors
+
+
+def run_child(stage, corpus_dir, engine, batch_size):
+    """اجرای یک مرحله در همین فرایند و چاپ گزارش JSON"""
+    with open(os.path.join(corpus_dir, 'manifest.json'), encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    start = time.perf_counter()
+    latencies, stage_stats, found_codes, errors = run_stage(
+        stage, corpus_dir, manifest, engine, batch_size
+    )
+    elapsed = time.perf_counter() - start
+
+    values = sorted(latencies)
+    report = {
+        'images': len(values),
+        'seconds': elapsed,
+        'images_per_sec': len(values) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(values, 0.5) * 1000,
+        'p95_ms': percentile(values, 0.95) * 1000,
+        'max_ms': values[-1] * 1000 if values else 0.0,
+        'peak_rss_mb': peak_rss_mb(),
+        'errors': errors,
+        'recall': code_recall(manifest['images'], found_codes) if found_codes else None,
+        'stages': {
+            name: {'count': count, 'p50_ms': p50 * 1000, 'p95_ms': p95 * 1000, 'max_ms': peak * 1000}
+            for name, count, p50, p95, peak, _ in stage_stats.rows()
+        },
+    }
+    print(json.dumps(report))
+
+
+def compare(report, baseline, threshold):
+    """فهرست افت‌های بیشتر از threshold نسبت به خط پایه"""
+    regressions = []
+    for stage, current in report['stages'].items():
+        previous = baseline.get('stages', {}).get(stage)
+        if not previous:
+            continue
+        for key, higher_is_better in COMPARED_METRICS:
+            old, new = previous.get(key), current.get(key)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (-change if higher_is_better else change) > threshold:
+                regressions.append(f"{stage}.{key}: {old:.3g} → {new:.3g} ({change:+.1%})")
+    return regressions
+
+
+def format_value(value, pattern):
+    return '-' if value is None else format(value, pattern)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="مجموعه بنچمارک زنجیره پردازش")
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS_DIR, help="پوشه مجموعه تصاویر")
+    parser.add_argument('--per-kind', type=int, default=5, help="تعداد تصویر از هر نوع")
+    parser.add_argument('--stages', default=','.join(STAGES), help="مراحل اجرا (با کاما)")
+    parser.add_argument('--engine', default='pytesseract', help="موتور OCR مرحله pipeline")
+    parser.add_argument('--batch-size', type=int, default=1, help="اندازه بسته موتور")
+    parser.add_argument('--output', help="ذخیره گزارش JSON")
+    parser.add_argument('--save-baseline', help="ذخیره این اجرا به عنوان خط پایه")
+    parser.add_argument('--baseline', help="مقایسه با خط پایه ذخیره‌شده")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="بیشترین افت مجاز نسبت به خط پایه (۰.۱ یعنی ۱۰٪)")
+    parser.add_argument('--child', choices=STAGES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.corpus, args.engine, args.batch_size)
+        return 0
+
+    manifest = build_corpus(args.corpus, args.per_kind)
+    stages = [s for s in args.stages.split(',') if s]
+    report = {'corpus_images': len(manifest['images']), 'per_kind': args.per_kind, 'stages': {}}
+
+    print(f"مجموعه: {len(manifest['images'])} تصویر در {args.corpus}")
+    print(f"{'مرحله':<11} {'تصویر/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} "
+          f"{'RSS MB':>8} {'recall':>7} {'خطا':>5}")
+    for stage in stages:
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child', stage, '--corpus', args.corpus,
+             '--engine', args.engine, '--batch-size', str(args.batch_size)],
+            stdout=subprocess.PIPE, check=True
+        ).stdout
+        result = json.loads(output)
+        report['stages'][stage] = result
+        print(f"{stage:<11} {result['images_per_sec']:>9.1f} {result['p50_ms']:>9.1f} "
+              f"{result['p95_ms']:>9.1f} {result['max_ms']:>9.1f} "
+              f"{format_value(result['peak_rss_mb'], '>8.0f')} "
+              f"{format_value(result['recall'], '>7.1%')} {result['errors']:>5}")
+
+    for stage in stages:
+        sub_stages = report['stages'][stage]['stages']
+        if sub_stages:
+            print(f"\nزیرمراحل {stage} (ms):")
+            print(f"  {'مرحله':<14} {'p50':>9} {'p95':>9} {'max':>9}")
+            for name, row in sub_stages.items():
+                print(f"  {name:<14} {row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['max_ms']:>9.1f}")
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"\nافت بیش از {args.threshold:.0%} نسبت به خط پایه:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\nبدون افت بیش از {args.threshold:.0%} نسبت به خط پایه")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,154 @@
+"""ساخت مجموعه تصاویر ساختگی و تکرارپذیر برای بنچمارک
+
+هر تصویر از روی یک seed ثابت ساخته می‌شود و فهرست کدهای رسم‌شده در آن
+(کد، ایمیل و آی‌پی) در manifest.json ذخیره می‌شود تا دقت استخراج قابل
+اندازه‌گیری باشد.
+
+    python benchmarks/corpus.py /tmp/ocr_corpus --per-kind 5
+"""
+import argparse
+import json
+import os
+import random
+import sys
+
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+# نسخه قالب مجموعه؛ با تغییر روش ساخت افزایش می‌یابد تا مجموعه قدیمی بازسازی شود
+CORPUS_VERSION = 1
+
+# نوع تصویر: (عرض، ارتفاع، اندازه قلم، پسوند)
+KINDS = {
+    'clean': (1240, 1754, 28, '.png'),
+    'noisy': (1240, 1754, 28, '.png'),
+    'blurred': (1240, 1754, 30, '.png'),
+    'rotated': (1240, 1754, 28, '.png'),
+    'large': (2480, 3508, 40, '.png'),
+    'photo': (3000, 2250, 64, '.jpg'),
+    'blank': (1240, 1754, 28, '.png'),
+}
+
+WORDS = ('TOTAL', 'ORDER', 'SHIP', 'DATE', 'ITEM', 'PRICE', 'QTY', 'NOTE', 'PAID', 'REF',
+         'customer', 'invoice', 'delivery', 'warehouse', 'account', 'number', 'the', 'and')
+LETTERS = 'ABCDEFGHJKLMNPQRSTUVWXYZ'
+DIGITS = '0123456789'
+
+
+def load_font(size):
+    """قلم پیش‌فرض در اندازه دلخواه (در Pillow قدیمی اندازه ثابت)"""
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        return ImageFont.load_default()
+
+
+def random_code(rng):
+    """یکی از انواع کدهایی که code_extractor پیدا می‌کند"""
+    kind = rng.random()
+    if kind < 0.5:
+        return ''.join(rng.choice(LETTERS) for _ in range(rng.randint(2, 4))) + \
+            ''.join(rng.choice(DIGITS) for _ in range(rng.randint(5, 7)))
+    if kind < 0.7:
+        return f"user{rng.randint(10, 99)}@example{rng.randint(1, 9)}.com"
+    if kind < 0.85:
+        return '.'.join(str(rng.randint(10, 250)) for _ in range(4))
+    return ''.join(rng.choice(DIGITS) for _ in range(rng.randint(6, 9)))
+
+
+def render_page(kind, seed, variant=0):
+    """ساخت یک صفحه؛ خروجی (تصویر، متن رسم‌شده، کدهای رسم‌شده)
+
+    با variant غیرصفر همان قالب (چیدمان، کلمات و سایه) ساخته می‌شود و فقط
+    اولین کد صفحه عوض می‌شود؛ مانند دو فاکتور هم‌قالب با شماره متفاوت.
+    """
+    width, height, font_size, _ = KINDS[kind]
+    rng = random.Random(f"{kind}-{seed}")
+    alternate = random.Random(f"{kind}-{seed}-{variant}") if variant else None
+    background = rng.randint(225, 245)
+    img = Image.new('L', (width, height), background)
+    draw = ImageDraw.Draw(img)
+
+    # سایه ملایم مانند اسکن کم‌نور
+    for x in range(0, width, 16):
+        shade = int(background - 40 * x / width)
+        draw.rectangle((x, 0, x + 16, height), fill=shade)
+
+    lines = []
+    codes = []
+    if kind != 'blank':
+        font = load_font(font_size)
+        line_height = int(font_size * 1.6)
+        margin = font_size
+        max_lines = (height - 2 * margin) // line_height
+        for row in range(min(max_lines, rng.randint(max_lines // 2, max_lines))):
+            words = [rng.choice(WORDS) for _ in range(rng.randint(2, 4))]
+            if rng.random() < 0.5:
+                code = random_code(rng)
+                if alternate is not None and not codes:
+                    code = random_code(alternate)
+                codes.append(code)
+                words.insert(rng.randint(0, len(words)), code)
+            line = ' '.join(words)
+            lines.append(line)
+            draw.text((margin, margin + row * line_height), line, fill=rng.randint(0, 60), font=font)
+
+    if kind == 'noisy' or kind == 'blank':
+        # نقطه‌های پراکنده (گرد و غبار اسکنر)
+        for _ in range(width * height // 500):
+            draw.point((rng.randrange(width), rng.randrange(height)), fill=rng.randint(0, 255))
+    if kind == 'blurred':
+        img = img.filter(ImageFilter.GaussianBlur(1.2))
+    if kind == 'rotated':
+        img = img.rotate(rng.uniform(-4, 4), resample=Image.BICUBIC, expand=False, fillcolor=background)
+    if kind == 'photo':
+        img = img.convert('RGB')
+
+    return img, '\n'.join(lines), list(dict.fromkeys(codes))
+
+
+def build_corpus(directory, per_kind=5, kinds=None):
+    """ساخت مجموعه در directory (در صورت وجود مجموعه یکسان، همان استفاده می‌شود)
+
+    خروجی manifest: {'version', 'per_kind', 'images': [{'path', 'kind',
+    'text', 'codes'}]} با مسیرهای نسبی.
+    """
+    kinds = list(kinds or KINDS)
+    manifest_path = os.path.join(directory, 'manifest.json')
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        if (manifest.get('version') == CORPUS_VERSION and manifest.get('per_kind') == per_kind
+                and manifest.get('kinds') == kinds):
+            return manifest
+
+    os.makedirs(directory, exist_ok=True)
+    images = []
+    for kind in kinds:
+        for seed in range(per_kind):
+            img, text, codes = render_page(kind, seed)
+            name = f"{kind}_{seed:03d}{KINDS[kind][3]}"
+            if name.endswith('.jpg'):
+                img.save(os.path.join(directory, name), quality=90)
+            else:
+                img.save(os.path.join(directory, name))
+            images.append({'path': name, 'kind': kind, 'text': text, 'codes': codes})
+
+    manifest = {'version': CORPUS_VERSION, 'per_kind': per_kind, 'kinds': kinds, 'images': images}
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ساخت مجموعه تصاویر بنچمارک")
+    parser.add_argument('directory')
+    parser.add_argument('--per-kind', type=int, default=5, help="تعداد تصویر از هر نوع")
+    args = parser.parse_args()
+
+    manifest = build_corpus(args.directory, args.per_kind)
+    print(f"{len(manifest['images'])} تصویر در {args.directory}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
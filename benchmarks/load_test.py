@@ -0,0 +1,161 @@
+"""آزمون بار سرویس HTTP محلی (ocr_server.py)
+
+چند رشته هم‌زمان تصاویر مجموعه بنچمارک را به /ocr می‌فرستند و توان عملیاتی،
+صدک‌های تأخیر و تعداد پاسخ‌های 429/503 گزارش می‌شود. با --spawn سرویس در
+یک فرایند جدا روی درگاه آزاد اجرا و در پایان بسته می‌شود.
+
+    python benchmarks/load_test.py --spawn --concurrency 16 --duration 30
+    python benchmarks/load_test.py --url http://127.0.0.1:8765 --requests 500
+"""
+import argparse
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlparse
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+from corpus import build_corpus  # noqa: E402
+from tracing import percentile  # noqa: E402
+
+DEFAULT_CORPUS_DIR = os.path.join(tempfile.gettempdir(), 'ocr_offline_corpus')
+LOAD_KINDS = ('clean', 'noisy', 'rotated', 'blank')
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def spawn_server(port, server_args):
+    """اجرای سرویس و انتظار تا پاسخ /health"""
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, 'ocr_server.py'), '--port', str(port)] + server_args
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/health')
+            if conn.getresponse().status == 200:
+                return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError("سرویس آماده نشد")
+
+
+def run_load(host, port, bodies, query, concurrency, total_requests, duration):
+    """ارسال درخواست‌ها؛ خروجی (تأخیرها به ترتیب شروع، شمارش وضعیت‌ها، مدت)"""
+    latencies = []
+    statuses = Counter()
+    lock = threading.Lock()
+    counter = iter(range(total_requests)) if total_requests else None
+    stop_at = time.perf_counter() + duration if duration else None
+
+    def client():
+        conn = http.client.HTTPConnection(host, port, timeout=120)
+        n = 0
+        while True:
+            if counter is not None:
+                with lock:
+                    n = next(counter, None)
+                if n is None:
+                    return
+            elif time.perf_counter() >= stop_at:
+                return
+            else:
+                n += 1
+            body = bodies[n % len(bodies)]
+            start = time.perf_counter()
+            try:
+                conn.request('POST', '/ocr?' + query, body,
+                             {'Content-Type': 'application/octet-stream'})
+                response = conn.getresponse()
+                response.read()
+                status = response.status
+            except OSError:
+                conn.close()
+                conn = http.client.HTTPConnection(host, port, timeout=120)
+                status = 'error'
+            elapsed = time.perf_counter() - start
+            with lock:
+                statuses[status] += 1
+                if status in (200, 422):
+                    latencies.append(elapsed)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, statuses, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="آزمون بار سرویس OCR")
+    parser.add_argument('--url', default='http://127.0.0.1:8765', help="نشانی سرویس")
+    parser.add_argument('--spawn', action='store_true', help="اجرای سرویس روی درگاه آزاد")
+    parser.add_argument('--server-args', default='', help="آرگومان‌های اضافه سرویس (با --spawn)")
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS_DIR, help="پوشه مجموعه تصاویر")
+    parser.add_argument('--concurrency', type=int, default=8, help="تعداد درخواست‌های هم‌زمان")
+    parser.add_argument('--requests', type=int, default=0, help="تعداد کل درخواست‌ها")
+    parser.add_argument('--duration', type=float, default=20.0,
+                        help="مدت آزمون در صورت صفر بودن --requests (ثانیه)")
+    parser.add_argument('--query', default='skip_blank=1', help="پارامترهای config درخواست‌ها")
+    args = parser.parse_args()
+
+    manifest = build_corpus(args.corpus, 2, LOAD_KINDS)
+    bodies = []
+    for image in manifest['images']:
+        with open(os.path.join(args.corpus, image['path']), 'rb') as f:
+            bodies.append(f.read())
+
+    proc = None
+    if args.spawn:
+        port = free_port()
+        host = '127.0.0.1'
+        proc = spawn_server(port, args.server_args.split())
+    else:
+        url = urlparse(args.url)
+        host, port = url.hostname, url.port or 80
+
+    try:
+        latencies, statuses, elapsed = run_load(
+            host, port, bodies, args.query, args.concurrency, args.requests, args.duration
+        )
+        conn = http.client.HTTPConnection(host, port, timeout=5)
+        conn.request('GET', '/stats')
+        stats = conn.getresponse().read().decode('utf-8')
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    values = sorted(latencies)
+    total = sum(statuses.values())
+    print(f"درخواست‌ها: {total} در {elapsed:.1f}s با {args.concurrency} اتصال هم‌زمان")
+    print(f"توان: {len(values) / elapsed:.1f} پاسخ/s")
+    print(f"تأخیر (ms): p50 {percentile(values, 0.5) * 1000:.0f} | "
+          f"p95 {percentile(values, 0.95) * 1000:.0f} | "
+          f"p99 {percentile(values, 0.99) * 1000:.0f} | "
+          f"max {(values[-1] if values else 0) * 1000:.0f}")
+    print("وضعیت‌ها: " + ', '.join(f"{status}: {count}" for status, count in sorted(
+        statuses.items(), key=lambda item: str(item[0]))))
+    print(f"آمار سرویس: {stats}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
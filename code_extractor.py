@@ -0,0 +1,159 @@
+"""استخراج کدها از متن با الگوهای از پیش کامپایل‌شده
+
+چهار دسته اول (کد حرف و عدد، عدد، پیشوند حرفی با عدد و کلمه حرفی) همگی
+یک کلمه کامل (بین دو \\b) هستند؛ پس به جای چهار جستجوی جدا، متن یک بار
+کلمه‌به‌کلمه پیمایش و هر کلمه دسته‌بندی می‌شود. ایمیل، لینک و آی‌پی هیچ‌وقت
+از یک خط فراتر نمی‌روند، پس الگوی آن‌ها فقط روی خطوطی اجرا می‌شود که
+نشانه‌شان (@، :// یا رقم.رقم) را دارند.
+
+ترتیب خروجی دقیقاً همان ترتیب پیاده‌سازی قبلی است: ابتدا همه موارد دسته
+اول به ترتیب ظاهر شدن، سپس دسته دوم و ... و در پایان حذف تکراری‌ها.
+"""
+import re
+
+# دسته هر الگو به همان ترتیب PATTERNS
+CATEGORIES = ('alphanumeric', 'numeric', 'prefix_number', 'letters', 'email', 'url', 'ip')
+
+# الگوهای اصلی با re.IGNORECASE (برای مرجع و بررسی یکسانی خروجی)
+PATTERNS = (
+    r'\b[A-Z0-9]{6,12}\b',  # کدهای ۶-۱۲ کاراکتری حروف و اعداد
+    r'\b\d{4,10}\b',         # اعداد ۴-۱۰ رقمی
+    r'\b[A-Z]{2,5}\d{3,8}\b',  # ترکیب حروف و اعداد
+    r'\b[A-Z]{3,8}\b',       # حروف بزرگ
+    r'\b[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}\b',  # ایمیل
+    r'\bhttps?://\S+\b',     # لینک‌ها
+    r'\b(?:\d{1,3}\.){3}\d{1,3}\b',  # آی‌پی آدرس
+)
+
+_WORD = re.compile(r'\w+')
+
+# بررسی کامل کلمه برای کلمات غیر ASCII (حفظ رفتار IGNORECASE و \d یونیکد)
+_ALNUM_WORD = re.compile(r'[A-Z0-9]{6,12}', re.IGNORECASE).fullmatch
+_NUMERIC_WORD = re.compile(r'\d{4,10}').fullmatch
+_PREFIX_WORD = re.compile(r'[A-Z]{2,5}\d{3,8}', re.IGNORECASE).fullmatch
+_LETTERS_WORD = re.compile(r'[A-Z]{3,8}', re.IGNORECASE).fullmatch
+_WORD_CHECKS = (_ALNUM_WORD, _NUMERIC_WORD, _PREFIX_WORD, _LETTERS_WORD)
+
+_EMAIL = re.compile(PATTERNS[4], re.IGNORECASE)
+_URL = re.compile(PATTERNS[5], re.IGNORECASE)
+_IP = re.compile(PATTERNS[6], re.IGNORECASE)
+
+# هر آی‌پی حداقل یک رقم، نقطه و رقم پشت سر هم دارد
+_IP_HINT = re.compile(r'\d\.\d')
+
+
+def _classify_words(text, found):
+    """پیمایش یک‌باره کلمات و افزودن (کد، موقعیت) به دسته‌های ۰ تا ۳"""
+    alnum_codes, alnum_offsets = found[0]
+    numeric_codes, numeric_offsets = found[1]
+    prefix_codes, prefix_offsets = found[2]
+    letters_codes, letters_offsets = found[3]
+
+    for match in _WORD.finditer(text):
+        word = match.group()
+        n = len(word)
+        if n < 3 or n > 13:
+            continue
+
+        if word.isascii():
+            # مسیر سریع: متدهای رشته روی ASCII دقیقاً معادل کلاس‌های الگو هستند
+            if not word.isalnum():
+                continue
+            start = match.start()
+            if n >= 6 and n <= 12:
+                alnum_codes.append(word)
+                alnum_offsets.append(start)
+            if word.isdigit():
+                if n >= 4 and n <= 10:
+                    numeric_codes.append(word)
+                    numeric_offsets.append(start)
+            elif word.isalpha():
+                if n <= 8:
+                    letters_codes.append(word)
+                    letters_offsets.append(start)
+            elif n >= 5 and word[-1].isdigit() and _PREFIX_WORD(word):
+                prefix_codes.append(word)
+                prefix_offsets.append(start)
+        else:
+            for (codes, offsets), check in zip(found, _WORD_CHECKS):
+                if check(word):
+                    codes.append(word)
+                    offsets.append(match.start())
+
+
+def _anchored_lines(text, find):
+    """بازه خطوطی از متن که find(pos) در آن‌ها نشانه‌ای پیدا می‌کند"""
+    pos = find(0)
+    while pos != -1:
+        start = text.rfind('\n', 0, pos) + 1
+        end = text.find('\n', pos)
+        if end == -1:
+            end = len(text)
+        yield start, end
+        pos = find(end)
+
+
+def _search_lines(regex, text, find, target):
+    """اجرای الگو فقط روی خطوط دارای نشانه
+
+    کاراکتر پیش و پس از هر خط '\\n' است، پس \\b در لبه‌ها همان رفتار
+    جستجو روی کل متن را دارد.
+    """
+    for start, end in _anchored_lines(text, find):
+        for match in regex.finditer(text, start, end):
+            target[0].append(match.group())
+            target[1].append(match.start())
+
+
+def _ip_hint(text):
+    def find(pos):
+        match = _IP_HINT.search(text, pos)
+        return match.start() if match else -1
+    return find
+
+
+def _collect(text):
+    """همه موارد پیداشده به ترتیب دسته و موقعیت: (کدها، موقعیت‌ها، دسته‌ها)"""
+    found = [([], []) for _ in CATEGORIES]
+    _classify_words(text, found)
+    _search_lines(_EMAIL, text, lambda pos: text.find('@', pos), found[4])
+    _search_lines(_URL, text, lambda pos: text.find('://', pos), found[5])
+    _search_lines(_IP, text, _ip_hint(text), found[6])
+
+    codes = []
+    offsets = []
+    categories = []
+    for category, (category_codes, category_offsets) in zip(CATEGORIES, found):
+        codes += category_codes
+        offsets += category_offsets
+        categories += [category] * len(category_codes)
+    return codes, offsets, categories
+
+
+def find_codes(text):
+    """یافتن کدها همراه با دسته و موقعیت اولین ظاهر شدن
+
+    خروجی فهرستی از دیکشنری‌های {'code', 'category', 'offset'} است.
+    """
+    codes, offsets, categories = _collect(text)
+
+    # اولین اندیس هر کد (ساخت dict از انتها، اولین مورد را نگه می‌دارد)
+    first_index = dict(zip(reversed(codes), range(len(codes) - 1, -1, -1)))
+
+    matches = []
+    for code in dict.fromkeys(codes):
+        i = first_index[code]
+        matches.append({'code': code, 'category': categories[i], 'offset': offsets[i]})
+    return matches
+
+
+def code_occurrences(text):
+    """همه موارد پیداشده با تکرار: فهرست (کد، دسته، موقعیت) به ترتیب دسته"""
+    codes, offsets, categories = _collect(text)
+    return list(zip(codes, categories, offsets))
+
+
+def extract_codes(text):
+    """استخراج کدهای مختلف از متن (بدون تکرار، به ترتیب قبلی)"""
+    # حذف موارد تکراری با حفظ ترتیب
+    return list(dict.fromkeys(_collect(text)[0]))
@@ -0,0 +1,271 @@
+"""نمایه دائمی کدها و متن نتایج همه اجراها
+
+هر نتیجه موفق به صورت یک سند (مسیر فایل و شماره صفحه) ثبت می‌شود. همه
+موارد کدهای متن خام همراه با دسته و موقعیت در جدول codes و متن پاک‌شده در
+جدول FTS5 ذخیره می‌شوند تا جستجوی دقیق کد، پیشوند، دسته و کلمات متن بدون
+گشتن در فایل‌های خروجی ممکن باشد. نوشتن در یک رشته جدا و به صورت دسته‌ای
+(هر COMMIT_EVERY سند یا COMMIT_INTERVAL ثانیه) انجام می‌شود تا add هرگز
+منتظر دیسک نماند (مگر صف MAX_QUEUE تایی پر باشد). خطای ثبت یک دسته (مثلاً
+قفل بودن فایل توسط فرایند دیگر یا پر بودن دیسک) در stderr و last_error
+گزارش می‌شود و آن دسته کنار گذاشته می‌شود؛ رشته نویسنده از کار نمی‌افتد.
+نمایه‌گذاری دوباره همان فایل و صفحه جایگزین قبلی می‌شود.
+
+    python code_index.py AB12345
+    python code_index.py AB12 --prefix --category prefix_number
+    python code_index.py --text "invoice total"
+"""
+import argparse
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+
+from code_extractor import CATEGORIES, code_occurrences
+
+DEFAULT_INDEX_PATH = os.path.join(os.path.expanduser('~'), '.ocr_offline', 'index.sqlite')
+
+# ثبت روی دیسک پس از این تعداد سند یا این مدت (ثانیه)
+COMMIT_EVERY = 500
+COMMIT_INTERVAL = 2.0
+
+# بیشترین نتیجه در انتظار ثبت؛ پس از آن add منتظر نویسنده می‌ماند
+MAX_QUEUE = 5000
+
+# انتظار برای قفل فایل نمایه که فرایند دیگری گرفته است (ثانیه)
+LOCK_TIMEOUT = 30.0
+
+# بیشترین انتظار flush برای نویسنده (ثانیه)
+FLUSH_TIMEOUT = 10.0
+
+DEFAULT_LIMIT = 100
+
+# بزرگ‌ترین کاراکتر برای جستجوی پیشوند با بازه روی شاخص
+_PREFIX_END = '\U0010ffff'
+
+_STOP = object()
+
+
+class CodeIndex:
+    """نمایه کدها و متن با نوشتن دسته‌ای در پس‌زمینه"""
+
+    def __init__(self, path=DEFAULT_INDEX_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.last_error = None
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self.conn = sqlite3.connect(path, timeout=LOCK_TIMEOUT, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(
+            'CREATE TABLE IF NOT EXISTS docs ('
+            ' doc_id INTEGER PRIMARY KEY, path TEXT NOT NULL, filename TEXT NOT NULL,'
+            ' page INTEGER NOT NULL DEFAULT 0, indexed_at REAL NOT NULL, UNIQUE (path, page));'
+            'CREATE TABLE IF NOT EXISTS codes ('
+            ' key TEXT NOT NULL, code TEXT NOT NULL, category TEXT NOT NULL,'
+            ' doc_id INTEGER NOT NULL, offset INTEGER NOT NULL);'
+            'CREATE INDEX IF NOT EXISTS codes_key ON codes (key);'
+            'CREATE INDEX IF NOT EXISTS codes_category ON codes (category, key);'
+            'CREATE INDEX IF NOT EXISTS codes_doc ON codes (doc_id);'
+            "CREATE VIRTUAL TABLE IF NOT EXISTS text_fts USING fts5(text, prefix='2 3');"
+        )
+        self.conn.commit()
+
+        self.queue = queue.Queue(MAX_QUEUE)
+        self.writer = threading.Thread(target=self._write_loop, name='code-index', daemon=True)
+        self.writer.start()
+
+    def add(self, result):
+        """افزودن یک نتیجه به صف نمایه‌گذاری (بدون انتظار)"""
+        if result.get('success') and not result.get('skipped') and result.get('path'):
+            self.queue.put(result)
+
+    def _write_loop(self):
+        """رشته نویسنده: جمع کردن نتایج صف و ثبت دسته‌ای آن‌ها"""
+        pending = []
+        last_commit = time.monotonic()
+        while True:
+            try:
+                wait = COMMIT_INTERVAL - (time.monotonic() - last_commit) if pending else None
+                item = self.queue.get(timeout=max(0.0, wait) if wait is not None else None)
+            except queue.Empty:
+                item = None
+
+            # فرمان‌ها (flush یا close) و پایان مهلت، نتایج معوق را ثبت می‌کنند
+            command = item is _STOP or isinstance(item, threading.Event)
+            if item is not None and not command:
+                pending.append(item)
+                if len(pending) < COMMIT_EVERY and time.monotonic() - last_commit < COMMIT_INTERVAL:
+                    continue
+            if pending:
+                try:
+                    self._write(pending)
+                except Exception as e:
+                    # دسته کنار گذاشته می‌شود تا فرمان‌های بعدی (flush) پاسخ بگیرند
+                    self.last_error = e
+                    print(f"خطا در ثبت {len(pending)} سند در نمایه: {e}", file=sys.stderr, flush=True)
+                pending = []
+            last_commit = time.monotonic()
+
+            if item is _STOP:
+                return
+            if command:
+                item.set()
+
+    def _write(self, results):
+        """ثبت چند نتیجه در یک تراکنش"""
+        now = time.time()
+        with self.lock:
+            try:
+                cursor = self.conn.cursor()
+                for result in results:
+                    path = os.path.abspath(result['path'])
+                    page = result.get('page') or 0
+                    row = cursor.execute(
+                        'SELECT doc_id FROM docs WHERE path = ? AND page = ?', (path, page)
+                    ).fetchone()
+                    if row:
+                        doc_id = row[0]
+                        cursor.execute('DELETE FROM codes WHERE doc_id = ?', (doc_id,))
+                        cursor.execute('DELETE FROM text_fts WHERE rowid = ?', (doc_id,))
+                        cursor.execute('UPDATE docs SET indexed_at = ? WHERE doc_id = ?', (now, doc_id))
+                    else:
+                        cursor.execute(
+                            'INSERT INTO docs (path, filename, page, indexed_at) VALUES (?, ?, ?, ?)',
+                            (path, result['filename'], page, now)
+                        )
+                        doc_id = cursor.lastrowid
+
+                    cursor.executemany(
+                        'INSERT INTO codes (key, code, category, doc_id, offset) VALUES (?, ?, ?, ?, ?)',
+                        [(code.upper(), code, category, doc_id, offset)
+                         for code, category, offset in code_occurrences(result.get('raw_text', ''))]
+                    )
+                    cursor.execute(
+                        'INSERT INTO text_fts (rowid, text) VALUES (?, ?)',
+                        (doc_id, result.get('cleaned_text', ''))
+                    )
+                self.conn.commit()
+            except Exception:
+                # تراکنش نیمه‌کاره دسته ناموفق باطل می‌شود
+                self.conn.rollback()
+                raise
+
+    def flush(self, timeout=FLUSH_TIMEOUT):
+        """انتظار تا ثبت همه نتایج صف روی دیسک؛ False اگر در timeout ثانیه تمام نشود"""
+        if not self.writer.is_alive():
+            return False
+        done = threading.Event()
+        try:
+            self.queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self):
+        if self.writer.is_alive():
+            self.queue.put(_STOP)
+            self.writer.join()
+        with self.lock:
+            self.conn.close()
+
+    def lookup(self, code, prefix=False, category=None, limit=DEFAULT_LIMIT):
+        """جستجوی کد (بدون حساسیت به حروف بزرگ و کوچک)، دقیق یا با پیشوند
+
+        خروجی فهرست {'code', 'category', 'path', 'filename', 'page', 'offset'}.
+        """
+        key = code.upper()
+        if prefix:
+            where, params = 'codes.key >= ? AND codes.key < ?', [key, key + _PREFIX_END]
+        else:
+            where, params = 'codes.key = ?', [key]
+        if category:
+            where += ' AND codes.category = ?'
+            params.append(category)
+        return self._code_rows(where, params, limit)
+
+    def by_category(self, category, limit=DEFAULT_LIMIT):
+        """آخرین کدهای ثبت‌شده یک دسته"""
+        return self._code_rows('codes.category = ?', [category], limit)
+
+    def _code_rows(self, where, params, limit):
+        with self.lock:
+            rows = self.conn.execute(
+                'SELECT codes.code, codes.category, docs.path, docs.filename, docs.page, codes.offset '
+                'FROM codes JOIN docs ON docs.doc_id = codes.doc_id '
+                f'WHERE {where} ORDER BY docs.indexed_at DESC, codes.offset LIMIT ?',
+                params + [limit]
+            ).fetchall()
+        return [
+            {'code': code, 'category': category, 'path': path, 'filename': filename,
+             'page': page or None, 'offset': offset}
+            for code, category, path, filename, page, offset in rows
+        ]
+
+    def search_text(self, query, limit=DEFAULT_LIMIT):
+        """جستجوی کلمات متن پاک‌شده (نحو FTS5، مثلاً invoice* یا "total paid")
+
+        خروجی فهرست {'path', 'filename', 'page', 'snippet'} به ترتیب تطابق.
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT docs.path, docs.filename, docs.page, "
+                "snippet(text_fts, 0, '[', ']', '…', 12) "
+                'FROM text_fts JOIN docs ON docs.doc_id = text_fts.rowid '
+                'WHERE text_fts MATCH ? ORDER BY rank LIMIT ?',
+                (query, limit)
+            ).fetchall()
+        return [
+            {'path': path, 'filename': filename, 'page': page or None, 'snippet': snippet}
+            for path, filename, page, snippet in rows
+        ]
+
+    def stats(self):
+        with self.lock:
+            docs = self.conn.execute('SELECT COUNT(*) FROM docs').fetchone()[0]
+            codes = self.conn.execute('SELECT COUNT(*) FROM codes').fetchone()[0]
+        return {'docs': docs, 'codes': codes}
+
+
+def format_location(row):
+    location = row['path']
+    if row['page']:
+        location += f" (صفحه {row['page']})"
+    return location
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="جستجو در نمایه کدها و متن نتایج")
+    parser.add_argument('code', nargs='?', help="کد مورد جستجو")
+    parser.add_argument('--prefix', action='store_true', help="جستجوی کدهای با این پیشوند")
+    parser.add_argument('--category', choices=CATEGORIES, help="فقط کدهای این دسته")
+    parser.add_argument('--text', help="جستجوی کلمات متن (نحو FTS5)")
+    parser.add_argument('--limit', type=int, default=DEFAULT_LIMIT)
+    parser.add_argument('--index-path', default=DEFAULT_INDEX_PATH, help="مسیر فایل نمایه")
+    args = parser.parse_args(argv)
+
+    if not (args.code or args.text or args.category):
+        parser.error("کد، --category یا --text لازم است")
+
+    index = CodeIndex(args.index_path)
+    try:
+        if args.text:
+            for row in index.search_text(args.text, args.limit):
+                print(f"{format_location(row)}\t{row['snippet']}")
+        elif args.code:
+            for row in index.lookup(args.code, args.prefix, args.category, args.limit):
+                print(f"{row['code']}\t{row['category']}\t{format_location(row)}\t{row['offset']}")
+        else:
+            for row in index.by_category(args.category, args.limit):
+                print(f"{row['code']}\t{format_location(row)}\t{row['offset']}")
+    finally:
+        index.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,324 @@
+"""پوشه ورودی داغ: پردازش خودکار فایل‌هایی که اسکنر در پوشه می‌گذارد
+
+پوشه‌ها به صورت دوره‌ای پیمایش می‌شوند (بدون وابستگی اضافه). هر فایل وقتی
+آماده شمرده می‌شود که اندازه و زمان تغییرش به مدت SETTLE_TIME ثابت بماند؛
+تا آن موقع پیمایش سریع‌تر انجام می‌شود و در زمان بیکاری فقط هر
+POLL_INTERVAL ثانیه یک بار. فایل‌های آماده با هش محتوا بررسی می‌شوند تا
+فایل تکراری (حتی با نام دیگر) دوباره پردازش نشود و از صفی با عمق محدود به
+کارگرها می‌رسند. نتیجه هر تصویر (یا هر صفحه فایل چندصفحه‌ای) به صورت یک
+فایل JSON با همان مسیر نسبی فایل در پوشه خروجی نوشته می‌شود؛ نتیجه فایل
+تکراری کپی نتیجه فایل اصلی با فیلد duplicate_of است.
+"""
+import json
+import os
+import queue
+import threading
+import time
+
+from batch_processor import BatchProcessor, IMAGE_EXTENSIONS
+from page_source import close_file, expand_pages, page_ref, split_page
+from result_cache import file_digest
+
+POLL_INTERVAL = 1.0
+SETTLE_TIME = 1.0
+SETTLE_POLL_INTERVAL = 0.25
+QUEUE_DEPTH = 32
+
+# هش و مسیر فایل‌های پردازش‌شده (هش<TAB>مسیر در هر خط) در پوشه خروجی
+SEEN_FILE = '.seen_hashes'
+
+
+def result_filename(result, root):
+    """نام فایل JSON نتیجه نسبت به پوشه خروجی
+
+    مسیر فایل نسبت به root (پوشه پایه همه پوشه‌های پایش‌شده) با همان
+    زیرپوشه‌ها حفظ می‌شود تا فایل‌های هم‌نام پوشه‌های مختلف نتیجه یکدیگر
+    را بازنویسی نکنند. root برابر None یعنی پوشه‌ها روی درایوهای مختلف‌اند
+    و نام درایو اولین زیرپوشه می‌شود.
+    """
+    path = os.path.abspath(result['path'])
+    if root is None:
+        drive, rest = os.path.splitdrive(path)
+        drive = drive.strip('\\/').replace(':', '').replace('\\', '_').replace('/', '_')
+        name = os.path.join(drive, rest.lstrip('\\/'))
+    else:
+        name = os.path.relpath(path, root)
+    if result.get('page'):
+        return f"{name}.p{result['page']:04d}.json"
+    return f"{name}.json"
+
+
+class HotFolder:
+    """پایش پوشه‌ها و پردازش پیوسته فایل‌های جدید
+
+    on_result(result) پس از نوشتن هر نتیجه (از جمله نتیجه کپی‌شده فایل
+    تکراری)، on_duplicate(path) هنگام یافتن فایل تکراری و on_error(path, error) برای خطای پردازش یا نوشتن یک فایل در
+    رشته کارگر یا پیمایشگر اجرا می‌شوند. خطای یک فایل رشته کارگر را متوقف
+    نمی‌کند.
+    """
+
+    def __init__(self, directories, output_dir, config, workers=1, recursive=False,
+                 on_result=None, on_duplicate=None, on_error=None, poll_interval=POLL_INTERVAL,
+                 settle_time=SETTLE_TIME, queue_depth=QUEUE_DEPTH):
+        self.directories = list(directories)
+        # نام نتایج نسبت به پوشه پایه مشترک پوشه‌های پایش‌شده است
+        roots = [os.path.abspath(directory) for directory in self.directories]
+        try:
+            self.root = os.path.commonpath(roots)
+        except ValueError:
+            # درایوهای مختلف در ویندوز پوشه پایه مشترک ندارند
+            self.root = None
+        self.output_dir = output_dir
+        self.config = config
+        self.workers = max(1, workers)
+        self.recursive = recursive
+        self.on_result = on_result
+        self.on_duplicate = on_duplicate
+        self.on_error = on_error
+        self.poll_interval = poll_interval
+        self.settle_time = settle_time
+        self.queue = queue.Queue(maxsize=queue_depth)
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+
+        # فایل‌های در حال نوشتن: مسیر -> ((اندازه، زمان تغییر)، زمان اولین مشاهده)
+        self.candidates = {}
+        # فایل‌های برداشته‌شده: مسیر -> (اندازه، زمان تغییر)
+        self.known = {}
+        # فایل‌های در حال پردازش: هش -> مسیر فایل‌های تکراری منتظر نتیجه آن
+        self.in_flight = {}
+
+        os.makedirs(output_dir, exist_ok=True)
+        self.seen_path = os.path.join(output_dir, SEEN_FILE)
+        # هش -> مسیر فایل اصلی (None برای خط‌های قدیمی بدون مسیر)
+        self.seen = {}
+        if os.path.exists(self.seen_path):
+            with open(self.seen_path, encoding='utf-8') as f:
+                for line in f:
+                    digest, _, original = line.rstrip('\n').partition('\t')
+                    if digest:
+                        self.seen[digest] = original or None
+
+    def list_files(self):
+        """(مسیر، stat) فایل‌های تصویری پوشه‌ها"""
+        stack = list(self.directories)
+        while stack:
+            directory = stack.pop()
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                try:
+                    if entry.is_dir():
+                        if self.recursive:
+                            stack.append(entry.path)
+                    elif entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                        yield entry.path, entry.stat()
+                except OSError:
+                    continue
+
+    def scan(self):
+        """یک پیمایش؛ خروجی مسیر فایل‌هایی که نوشتنشان تمام شده است"""
+        now = time.monotonic()
+        ready = []
+        present = set()
+        for path, stat in self.list_files():
+            present.add(path)
+            signature = (stat.st_size, stat.st_mtime_ns)
+            if self.known.get(path) == signature:
+                continue
+            previous = self.candidates.get(path)
+            if previous is None or previous[0] != signature:
+                # فایل جدید یا هنوز در حال نوشتن
+                self.candidates[path] = (signature, now)
+                continue
+            if stat.st_size and now - previous[1] >= self.settle_time:
+                del self.candidates[path]
+                self.known[path] = signature
+                ready.append(path)
+
+        # فراموش کردن فایل‌های حذف‌شده یا جابه‌جاشده
+        for table in (self.candidates, self.known):
+            for path in [p for p in table if p not in present]:
+                del table[path]
+        return sorted(ready)
+
+    def enqueue(self, path):
+        """افزودن فایل آماده به صف (در صورت پر بودن صف منتظر می‌ماند)"""
+        try:
+            digest = file_digest(path)
+        except OSError:
+            # فایل در این فاصله حذف یا قفل شده؛ در پیمایش بعدی دوباره دیده می‌شود
+            self.known.pop(path, None)
+            return
+        original = None
+        with self.lock:
+            if digest in self.in_flight:
+                # نتیجه پس از پایان پردازش فایل اصلی کپی می‌شود (mark_done)
+                self.in_flight[digest].append(path)
+                waiting = True
+            else:
+                waiting = False
+                # فایل اصلی خط‌های قدیمی نامعلوم است؛ فایل دوباره پردازش می‌شود
+                original = self.seen.get(digest)
+                if original is None:
+                    self.in_flight[digest] = []
+                elif original == os.path.abspath(path):
+                    # خود فایل اصلی در اجرای قبلی
+                    original = None
+                    waiting = True
+        if self.on_duplicate and (waiting or original is not None):
+            self.on_duplicate(path)
+        if waiting:
+            return
+        while not self.stop_event.is_set():
+            try:
+                self.queue.put((path, digest, original), timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def run(self):
+        """پایش تا فراخوانی stop (یا KeyboardInterrupt)"""
+        threads = [
+            threading.Thread(target=self.worker, name=f"hot-folder-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            while not self.stop_event.is_set():
+                for path in self.scan():
+                    self.enqueue(path)
+                # تا آماده شدن فایل‌های در حال نوشتن پیمایش سریع‌تر است
+                interval = SETTLE_POLL_INTERVAL if self.candidates else self.poll_interval
+                self.stop_event.wait(interval)
+        finally:
+            self.stop_event.set()
+            for thread in threads:
+                thread.join()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def worker(self):
+        """پردازش فایل‌های صف با یک پردازشگر گرم برای این رشته"""
+        processor = BatchProcessor()
+        batch_size = max(1, int(self.config.get('engine_batch_size', 1)))
+        while not self.stop_event.is_set():
+            try:
+                path, digest, original = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if original is not None:
+                self.copy_duplicate(processor, path, original, batch_size)
+                close_file()
+                self.queue.task_done()
+                continue
+            success = False
+            try:
+                success = self.process_file(processor, path, batch_size)
+            except Exception as e:
+                self.report_error(path, e)
+            finally:
+                # هش فایل همیشه از in_flight خارج می‌شود
+                for duplicate in self.mark_done(digest, path, success):
+                    self.copy_duplicate(processor, duplicate, path, batch_size)
+                # فایل ورودی باز نمی‌ماند تا مصرف‌کننده بتواند آن را جابه‌جا کند
+                close_file()
+                self.queue.task_done()
+        if processor.engine is not None:
+            processor.engine.close()
+
+    def process_file(self, processor, path, batch_size):
+        """پردازش و نوشتن نتیجه همه صفحه‌های یک فایل؛ خروجی موفقیت همه صفحه‌ها"""
+        success = True
+        pages = expand_pages([path])
+        while True:
+            refs = [ref for _, ref in zip(range(batch_size), pages)]
+            if not refs:
+                break
+            for result in processor.process_images(refs, self.config):
+                self.write_result(result)
+                success = success and result['success']
+                if self.on_result:
+                    self.on_result(result)
+        return success
+
+    def copy_duplicate(self, processor, path, original, batch_size):
+        """نوشتن نتیجه فایل تکراری از روی نتایج نوشته‌شده فایل اصلی
+
+        اگر نتیجه فایل اصلی در پوشه خروجی نباشد (مثلاً پاک شده باشد) فایل
+        دوباره پردازش می‌شود.
+        """
+        try:
+            if self.has_result(path):
+                return
+            originals = []
+            for ref in expand_pages([path]):
+                page = split_page(ref)[1]
+                source = {'path': original, 'page': page}
+                name = os.path.join(self.output_dir, result_filename(source, self.root))
+                try:
+                    with open(name, encoding='utf-8') as f:
+                        originals.append((ref, json.load(f), page_ref(original, page) if page else original))
+                except (OSError, ValueError):
+                    self.process_file(processor, path, batch_size)
+                    return
+            for ref, result, representative in originals:
+                result = processor.duplicate_result(ref, result, representative, 0)
+                self.write_result(result)
+                if self.on_result:
+                    self.on_result(result)
+        except Exception as e:
+            self.report_error(path, e)
+
+    def has_result(self, path):
+        """نتیجه (صفحه اول) فایل پس از آخرین تغییر آن نوشته شده است"""
+        ref = next(expand_pages([path]), path)
+        source = {'path': path, 'page': split_page(ref)[1]}
+        name = os.path.join(self.output_dir, result_filename(source, self.root))
+        try:
+            return os.stat(name).st_mtime_ns >= os.stat(path).st_mtime_ns
+        except OSError:
+            return False
+
+    def report_error(self, path, error):
+        if self.on_error:
+            try:
+                self.on_error(path, error)
+            except Exception:
+                pass
+
+    def write_result(self, result):
+        """نوشتن اتمی نتیجه تا مصرف‌کننده پوشه خروجی فایل نیمه‌کاره نبیند"""
+        result = {k: v for k, v in result.items() if k != 'trace'}
+        path = os.path.join(self.output_dir, result_filename(result, self.root))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = path + '.tmp'
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(result, f, ensure_ascii=False, indent=2, default=str)
+            os.replace(temp_path, path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def mark_done(self, digest, path, success):
+        """ثبت هش و مسیر فایل؛ خروجی مسیر فایل‌های تکراری منتظر آن
+
+        فایل ناموفق پس از اجرای دوباره امتحان می‌شود.
+        """
+        with self.lock:
+            waiting = self.in_flight.pop(digest, [])
+            if success:
+                original = os.path.abspath(path)
+                self.seen[digest] = original
+                try:
+                    with open(self.seen_path, 'a', encoding='utf-8') as f:
+                        f.write(f"{digest}\t{original}\n")
+                except OSError as e:
+                    self.report_error(path, e)
+        return waiting
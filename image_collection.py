@@ -0,0 +1,68 @@
+"""مجموعه مرتب مسیر تصاویر با افزودن، حذف و بررسی عضویت در زمان ثابت
+
+هر مسیر یک شناسه یکتا و پایدار (رشته عددی) دارد که رابط گرافیکی از آن
+به عنوان شناسه ردیف Treeview استفاده می‌کند.
+"""
+import itertools
+
+
+class ImageCollection:
+    """فهرست بدون تکرار مسیرها به ترتیب افزودن"""
+
+    def __init__(self, paths=()):
+        # dict ترتیب افزودن را حفظ می‌کند و حذف از آن O(1) است
+        self._ids = {}
+        self._paths = {}
+        self._counter = itertools.count()
+        self.add_many(paths)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __bool__(self):
+        return bool(self._ids)
+
+    def __contains__(self, path):
+        return path in self._ids
+
+    def __iter__(self):
+        return iter(self._ids)
+
+    def add(self, path):
+        """افزودن یک مسیر؛ خروجی شناسه جدید یا None اگر تکراری باشد"""
+        if path in self._ids:
+            return None
+        item_id = str(next(self._counter))
+        self._ids[path] = item_id
+        self._paths[item_id] = path
+        return item_id
+
+    def add_many(self, paths):
+        """افزودن چند مسیر؛ خروجی فهرست (شناسه، مسیر) موارد جدید"""
+        added = []
+        for path in paths:
+            item_id = self.add(path)
+            if item_id is not None:
+                added.append((item_id, path))
+        return added
+
+    def remove(self, path):
+        """حذف یک مسیر؛ خروجی شناسه آن یا None اگر وجود نداشته باشد"""
+        item_id = self._ids.pop(path, None)
+        if item_id is not None:
+            del self._paths[item_id]
+        return item_id
+
+    def clear(self):
+        self._ids = {}
+        self._paths = {}
+
+    def id_of(self, path):
+        return self._ids.get(path)
+
+    def path_of(self, item_id):
+        return self._paths.get(item_id)
+
+    def paths(self):
+        """کپی فهرست مسیرها به ترتیب افزودن"""
+        return list(self._ids)
@@ -0,0 +1,204 @@
+"""تشخیص تصاویر تقریباً یکسان در یک دسته با هش ادراکی (pHash)
+
+نسخه کوچک هر تصویر (رمزگشایی کاهش‌یافته JPEG) به ۶۴×۶۴ خانه تبدیل و
+ضرایب بسامد پایین تبدیل DCT آن با میانه‌شان مقایسه می‌شوند؛ هش
+PHASH_SIZE×PHASH_SIZE بیتی حاصل در برابر فشرده‌سازی دوباره، تغییر اندازه و
+جابه‌جایی و چرخش جزئی اسکن دوباره پایدار است. خوشه‌بندی حریصانه است: هر
+تصویر به نزدیک‌ترین نماینده با فاصله همینگ حداکثر distance می‌پیوندد و در
+غیر این صورت خودش نماینده می‌شود. جستجوی نماینده‌ها با شاخص چندبخشی
+انجام می‌شود و هزینه آن برخلاف مقایسه دوبه‌دو با تعداد تصاویر مربعی
+نمی‌شود.
+
+فرم‌های هم‌قالب که فقط در چند عدد تفاوت دارند هش بسیار نزدیکی دارند؛ پس
+هر جفت نامزد پیش از یکی شمردن با confirm_duplicate تأیید می‌شود: جوهر دو
+تصویر در نسخه‌ای با وضوح CONFIRM_SIDE مقایسه می‌شود و اگر در هیچ بلوک
+کوچکی (اندازه چند نویسه) جوهر فقط در یکی از دو تصویر نباشد، تکراری‌اند.
+جابه‌جایی بیش از CONFIRM_SHIFT پیکسل (اسکن دوباره) این بررسی را رد می‌کند
+و تصویر جداگانه پردازش می‌شود؛ یعنی خطا فقط هزینه OCR دارد و نتیجه غلط
+کپی نمی‌شود. این مرحله اختیاری است.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from page_source import open_page
+from preprocessing import page_sample, otsu_threshold
+
+# اندازه بلوک ضرایب بسامد پایین (هش ۲۵۶ بیتی)
+PHASH_SIZE = 16
+HASH_BITS = PHASH_SIZE * PHASH_SIZE
+
+# اندازه نمونه خاکستری پیش از DCT
+DCT_SIZE = 64
+SAMPLE_SIDE = 512
+
+# بیشترین فاصله همینگ نامزدهای تکراری (فرم‌های هم‌قالب در فاصله ۴ هم دیده شده‌اند؛
+# تشخیص نهایی با confirm_duplicate است)
+DEDUP_DISTANCE = 4
+
+# تأیید جفت نامزد: وضوح نمونه، بیشترین جابه‌جایی مجاز (پیکسل نمونه)، ضلع
+# بلوک و بیشترین تعداد پیکسل جوهر ناهمخوان در یک بلوک (کمتر از یک رقم)
+CONFIRM_SIDE = 2048
+CONFIRM_SHIFT = 2
+CONFIRM_BLOCK = 32
+MAX_BLOCK_DIFF = 8
+
+# نسبت ابعاد دو تصویر تکراری بیش از این تفاوت ندارد
+MAX_ASPECT_DIFF = 0.01
+
+# تصاویر تقریباً یکنواخت (صفحه سفید با چند نویسه کوچک) هش معناداری ندارند
+MIN_DETAIL = 2.0
+
+
+def _dct_matrix(n):
+    k = np.arange(n)[:, None]
+    x = np.arange(n)[None, :]
+    return np.cos(np.pi * (2 * x + 1) * k / (2 * n))
+
+
+DCT_MATRIX = _dct_matrix(DCT_SIZE)
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+def phash(img, size=PHASH_SIZE):
+    """هش ادراکی تصویر به صورت عدد صحیح size×size بیتی یا None برای تصویر یکنواخت"""
+    sample = page_sample(img, side=SAMPLE_SIDE).resize((DCT_SIZE, DCT_SIZE), Image.BOX)
+    pixels = np.asarray(sample, dtype=np.float64)
+    if pixels.std() < MIN_DETAIL:
+        return None
+    low = (DCT_MATRIX @ pixels @ DCT_MATRIX.T)[:size, :size].ravel()
+    # ضریب DC فقط روشنایی کل است
+    bits = low > np.median(low[1:])
+    bits[0] = False
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def image_hash(image_path):
+    """هش تصویر یا صفحه؛ None برای فایل خراب (خطا هنگام پردازش گزارش می‌شود)"""
+    try:
+        with open_page(image_path) as img:
+            return phash(img)
+    except Exception:
+        return None
+
+
+def ink_mask(img, size=None):
+    """نقشه جوهر (آرایه بولی) نسخه CONFIRM_SIDE تصویر، در صورت نیاز به اندازه size"""
+    sample = page_sample(img, side=CONFIRM_SIDE)
+    if size is not None and sample.size != size:
+        sample = sample.resize(size, Image.BILINEAR)
+    return np.asarray(sample) < otsu_threshold(sample.histogram())
+
+
+def unmatched_ink(mask, other):
+    """بیشترین تعداد پیکسل جوهر mask در یک بلوک که در همسایگی CONFIRM_SHIFT آن در other نیست"""
+    # گسترش جداپذیر other به اندازه CONFIRM_SHIFT در هر راستا
+    shift = CONFIRM_SHIFT
+    padded = np.pad(other, shift)
+    rows = np.zeros_like(padded)
+    for offset in range(2 * shift + 1):
+        rows[shift:-shift] |= padded[offset:offset + other.shape[0]]
+    near = np.zeros_like(other)
+    for offset in range(2 * shift + 1):
+        near |= rows[shift:-shift, offset:offset + other.shape[1]]
+    lone = mask & ~near
+    height, width = lone.shape
+    rows, cols = -(-height // CONFIRM_BLOCK), -(-width // CONFIRM_BLOCK)
+    padded = np.zeros((rows * CONFIRM_BLOCK, cols * CONFIRM_BLOCK), dtype=np.int32)
+    padded[:height, :width] = lone
+    blocks = padded.reshape(rows, CONFIRM_BLOCK, cols, CONFIRM_BLOCK).sum(axis=(1, 3))
+    return int(blocks.max())
+
+
+def confirm_duplicate(first_path, second_path):
+    """آیا دو تصویر نامزد (هش نزدیک) واقعاً یک سند هستند؟
+
+    برای هر بلوک CONFIRM_BLOCK پیکسلی، جوهری که فقط در یکی از دو تصویر است
+    شمرده می‌شود؛ یک رقم یا کلمه متفاوت از MAX_BLOCK_DIFF بیشتر است.
+    """
+    try:
+        with open_page(first_path) as first, open_page(second_path) as second:
+            first_ratio = first.width / first.height
+            if abs(second.width / second.height - first_ratio) > MAX_ASPECT_DIFF * first_ratio:
+                return False
+            first_ink = ink_mask(first)
+            second_ink = ink_mask(second, (first_ink.shape[1], first_ink.shape[0]))
+    except Exception:
+        return False
+    return max(unmatched_ink(first_ink, second_ink),
+               unmatched_ink(second_ink, first_ink)) <= MAX_BLOCK_DIFF
+
+
+class HashIndex:
+    """جستجوی نزدیک‌ترین هش با شاخص چندبخشی
+
+    هش به distance+1 بخش تقسیم می‌شود؛ طبق اصل لانه کبوتری دو هش با
+    فاصله حداکثر distance دست‌کم در یک بخش یکسان‌اند، پس فقط هش‌های
+    هم‌سطل در یکی از بخش‌ها مقایسه می‌شوند.
+    """
+
+    def __init__(self, distance=DEDUP_DISTANCE, bits=HASH_BITS):
+        self.distance = distance
+        chunks = min(distance + 1, bits)
+        self.spans = [(bits * i // chunks, bits * (i + 1) // chunks) for i in range(chunks)]
+        self.tables = [{} for _ in self.spans]
+        self.values = []
+
+    def chunk_keys(self, value):
+        return [(value >> start) & ((1 << (end - start)) - 1) for start, end in self.spans]
+
+    def add(self, value):
+        """افزودن هش؛ خروجی شماره آن"""
+        item = len(self.values)
+        self.values.append(value)
+        for table, key in zip(self.tables, self.chunk_keys(value)):
+            table.setdefault(key, []).append(item)
+        return item
+
+    def matches(self, value):
+        """فهرست (شماره، فاصله) هش‌های در محدوده distance، نزدیک‌ترین اول"""
+        found = []
+        checked = set()
+        for table, key in zip(self.tables, self.chunk_keys(value)):
+            for item in table.get(key, ()):
+                if item in checked:
+                    continue
+                checked.add(item)
+                distance = hamming(value, self.values[item])
+                if distance <= self.distance:
+                    found.append((item, distance))
+        return sorted(found, key=lambda match: match[1])
+
+
+def find_duplicates(image_paths, distance=DEDUP_DISTANCE, workers=None):
+    """تصاویر تکراری دسته: {اندیس تکراری: (اندیس نماینده، فاصله)}
+
+    نماینده هر خوشه اولین عضو آن به ترتیب ورودی است و هر تصویر فقط پس از
+    تأیید با confirm_duplicate به یک نماینده می‌پیوندد. هش‌ها به صورت
+    موازی در رشته‌ها محاسبه می‌شوند (رمزگشایی PIL قفل GIL را آزاد می‌کند).
+    """
+    workers = workers or os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        hashes = list(executor.map(image_hash, image_paths))
+
+    index = HashIndex(distance)
+    representatives = []
+    duplicates = {}
+    for position, value in enumerate(hashes):
+        if value is None:
+            continue
+        match = next((
+            (representatives[item], distance) for item, distance in index.matches(value)
+            if confirm_duplicate(image_paths[representatives[item]], image_paths[position])
+        ), None)
+        if match is not None:
+            duplicates[position] = match
+        else:
+            index.add(value)
+            representatives.append(position)
+    return duplicates
@@ -0,0 +1,189 @@
+"""دفترچه کارهای دسته‌ای برای ادامه پردازش پس از توقف یا خرابی
+
+هر کار با هش فهرست مرتب تصاویر و تنظیمات شناخته می‌شود؛ پس اجرای دوباره
+همان فهرست با همان تنظیمات، کار نیمه‌تمام قبلی را پیدا می‌کند و تصاویر
+انجام‌شده را دوباره پردازش نمی‌کند. نتایج دسته‌ای (هر COMMIT_EVERY نتیجه
+یا COMMIT_INTERVAL ثانیه) در SQLite ثبت می‌شوند تا نوشتن دفترچه گلوگاه
+نشود؛ در بدترین حالت فقط نتایج ثبت‌نشده آخرین دسته دوباره پردازش می‌شوند.
+نتایج ناموفق ثبت می‌شوند ولی هنگام ادامه دوباره امتحان می‌شوند. هنگام
+ادامه فقط اندیس‌های انجام‌شده در حافظه نگه داشته می‌شوند و نتایج صفحه‌به‌صفحه
+خوانده می‌شوند. کار تمام‌شده حذف می‌شود و کار نیمه‌تمامی که STALE_JOB_AGE
+ثانیه تغییر نکرده هنگام باز کردن دفترچه پاک می‌شود.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from result_cache import config_digest
+
+DEFAULT_JOURNAL_PATH = os.path.join(os.path.expanduser('~'), '.ocr_offline', 'jobs.sqlite')
+
+# ثبت روی دیسک پس از این تعداد نتیجه یا این مدت (ثانیه)
+COMMIT_EVERY = 100
+COMMIT_INTERVAL = 2.0
+
+# کار نیمه‌تمامی که این مدت (ثانیه) تغییر نکرده کنار گذاشته شده است
+STALE_JOB_AGE = 30 * 24 * 3600
+
+# تعداد نتایجی که هنگام ادامه در هر نوبت از دفترچه خوانده می‌شود
+READ_PAGE = 256
+
+
+def job_digest(image_paths, config, tesseract_config):
+    """شناسه کار از فهرست تصاویر و تنظیمات"""
+    digest = hashlib.blake2b(digest_size=20)
+    for image_path in image_paths:
+        digest.update(os.path.abspath(image_path).encode('utf-8', 'surrogatepass'))
+        digest.update(b'\0')
+    digest.update(config_digest(config, tesseract_config).encode('ascii'))
+    return digest.hexdigest()
+
+
+class JobJournal:
+    """دفترچه کارها روی دیسک"""
+
+    def __init__(self, path=DEFAULT_JOURNAL_PATH, max_age=STALE_JOB_AGE):
+        self.path = path
+        self.lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            'job_id TEXT PRIMARY KEY, config_hash TEXT NOT NULL, total INTEGER NOT NULL, '
+            'created REAL NOT NULL, updated REAL NOT NULL, finished INTEGER NOT NULL DEFAULT 0)'
+        )
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS items ('
+            'job_id TEXT NOT NULL, idx INTEGER NOT NULL, path TEXT NOT NULL, '
+            'success INTEGER NOT NULL, result TEXT NOT NULL, PRIMARY KEY (job_id, idx))'
+        )
+        self.conn.commit()
+        self.prune(max_age)
+
+    def open_job(self, image_paths, config, tesseract_config, restart=False):
+        """کار این فهرست و تنظیمات؛ کار تمام‌شده (یا با restart) از نو شروع می‌شود"""
+        job_id = job_digest(image_paths, config, tesseract_config)
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT finished FROM jobs WHERE job_id = ?', (job_id,)
+            ).fetchone()
+            if row is None or row[0] or restart:
+                self.conn.execute('DELETE FROM items WHERE job_id = ?', (job_id,))
+                self.conn.execute(
+                    'INSERT OR REPLACE INTO jobs (job_id, config_hash, total, created, updated, finished) '
+                    'VALUES (?, ?, ?, ?, ?, 0)',
+                    (job_id, config_digest(config, tesseract_config), len(image_paths), now, now)
+                )
+                self.conn.commit()
+        return Job(self, job_id, len(image_paths))
+
+    def unfinished(self):
+        """کارهای نیمه‌تمام: فهرست (شناسه، تعداد کل، تعداد انجام‌شده، زمان آخرین تغییر)"""
+        with self.lock:
+            return self.conn.execute(
+                'SELECT jobs.job_id, total, COUNT(items.idx), updated FROM jobs '
+                'LEFT JOIN items ON items.job_id = jobs.job_id AND items.success = 1 '
+                'WHERE finished = 0 GROUP BY jobs.job_id ORDER BY updated DESC'
+            ).fetchall()
+
+    def prune(self, max_age=STALE_JOB_AGE):
+        """حذف کارهای تمام‌شده و کارهای نیمه‌تمامی که max_age ثانیه تغییر نکرده‌اند؛ خروجی تعداد کارها"""
+        with self.lock:
+            job_ids = [row[0] for row in self.conn.execute(
+                'SELECT job_id FROM jobs WHERE finished = 1 OR updated < ?', (time.time() - max_age,)
+            )]
+            for job_id in job_ids:
+                self.conn.execute('DELETE FROM items WHERE job_id = ?', (job_id,))
+                self.conn.execute('DELETE FROM jobs WHERE job_id = ?', (job_id,))
+            self.conn.commit()
+        return len(job_ids)
+
+    def close(self):
+        with self.lock:
+            self.conn.commit()
+            self.conn.close()
+
+
+class Job:
+    """یک کار در دفترچه؛ record نتایج را دسته‌ای ثبت می‌کند"""
+
+    def __init__(self, journal, job_id, total):
+        self.journal = journal
+        self.job_id = job_id
+        self.total = total
+        self.pending = []
+        self.last_commit = time.monotonic()
+
+    def completed_indexes(self):
+        """اندیس تصاویری که نتیجه موفق ثبت‌شده دارند"""
+        journal = self.journal
+        with journal.lock:
+            rows = journal.conn.execute(
+                'SELECT idx FROM items WHERE job_id = ? AND success = 1', (self.job_id,)
+            ).fetchall()
+        return {idx for idx, in rows}
+
+    def completed(self):
+        """نتایج موفق ثبت‌شده به ترتیب اندیس: (اندیس، نتیجه)
+
+        نتایج READ_PAGE تایی خوانده می‌شوند تا متن همه صفحه‌های یک کار بزرگ
+        هم‌زمان در حافظه نباشد.
+        """
+        journal = self.journal
+        last = -1
+        while True:
+            with journal.lock:
+                rows = journal.conn.execute(
+                    'SELECT idx, result FROM items WHERE job_id = ? AND success = 1 AND idx > ? '
+                    'ORDER BY idx LIMIT ?', (self.job_id, last, READ_PAGE)
+                ).fetchall()
+            for idx, result in rows:
+                yield idx, json.loads(result)
+            if len(rows) < READ_PAGE:
+                return
+            last = rows[-1][0]
+
+    def record(self, index, result):
+        """ثبت نتیجه یک تصویر (در نوبت بعدی commit نوشته می‌شود)"""
+        if 'trace' in result:
+            result = {k: v for k, v in result.items() if k != 'trace'}
+        self.pending.append((
+            self.job_id, index, result.get('path', ''), 1 if result.get('success') else 0,
+            json.dumps(result, ensure_ascii=False, default=str)
+        ))
+        if len(self.pending) >= COMMIT_EVERY or time.monotonic() - self.last_commit >= COMMIT_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        """نوشتن نتایج معوق روی دیسک"""
+        journal = self.journal
+        with journal.lock:
+            if self.pending:
+                journal.conn.executemany(
+                    'INSERT OR REPLACE INTO items (job_id, idx, path, success, result) '
+                    'VALUES (?, ?, ?, ?, ?)', self.pending
+                )
+                journal.conn.execute(
+                    'UPDATE jobs SET updated = ? WHERE job_id = ?', (time.time(), self.job_id)
+                )
+                self.pending = []
+            journal.conn.commit()
+        self.last_commit = time.monotonic()
+
+    def finish(self):
+        """پایان کار؛ کار و نتایج آن دیگر لازم نیستند و حذف می‌شوند"""
+        self.pending = []
+        journal = self.journal
+        with journal.lock:
+            journal.conn.execute('DELETE FROM items WHERE job_id = ?', (self.job_id,))
+            journal.conn.execute('DELETE FROM jobs WHERE job_id = ?', (self.job_id,))
+            journal.conn.commit()
@@ -0,0 +1,372 @@
+"""اجرای پردازش دسته‌ای از خط فرمان بدون رابط گرافیکی
+
+نتیجه هر تصویر به محض آماده شدن به صورت یک خط JSON (JSON Lines) در
+خروجی استاندارد یا فایل نوشته می‌شود (با پسوند .json، .csv یا .txt در
+-o همان قالب‌های رابط گرافیکی) و پیشرفت و خلاصه کار در stderr چاپ می‌شود.
+فایل‌های TIFF و PDF چندصفحه‌ای صفحه‌به‌صفحه پردازش می‌شوند و نتیجه هر
+صفحه فیلد page دارد. پیشرفت در دفترچه کار ثبت می‌شود و اجرای دوباره همان
+ورودی‌ها پس از توقف یا خرابی از همان‌جا ادامه می‌یابد (--restart برای شروع از نو).
+با --watch پوشه‌های ورودی پیوسته پایش می‌شوند و نتیجه هر فایل جدید در
+پوشه -o نوشته می‌شود. کدها و متن نتایج به نمایه جستجو افزوده می‌شوند
+(جستجو با code_index.py).
+
+    python ocr_cli.py scans/ "inbox/**/*.png" -o results.jsonl --workers 8
+    python ocr_cli.py --watch //scanner/share -o ocr_results/
+
+کدهای خروج: ۰ همه موفق، ۱ خطا در برخی تصاویر، ۲ ورودی نامعتبر،
+۱۳۰ توقف توسط کاربر.
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+from batch_processor import (
+    BatchProcessor, IMAGE_EXTENSIONS, CASCADE_MIN_CONFIDENCE, IMAGE_TIME_LIMIT
+)
+from result_sinks import JsonlSink, open_sink
+from tracing import StageStats, TraceWriter
+from page_source import expand_pages, display_name, allow_large_images
+from tesseract_engine import ENGINES, DEFAULT_ENGINE
+from preprocessing import (
+    THRESHOLD_METHODS, DEFAULT_THRESHOLD_METHOD, FIXED_THRESHOLD,
+    TARGET_TEXT_HEIGHT, MIN_SCALE, MAX_SCALE, BLANK_THRESHOLD
+)
+
+EXIT_OK = 0
+EXIT_FAILURES = 1
+EXIT_USAGE = 2
+EXIT_INTERRUPTED = 130
+
+
+def is_image(path):
+    return path.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def expand_inputs(inputs, recursive=True):
+    """تبدیل فایل‌ها، پوشه‌ها و الگوهای glob به فهرست مرتب و بدون تکرار تصاویر"""
+    paths = []
+    seen = set()
+
+    def add(path):
+        if path not in seen:
+            seen.add(path)
+            paths.append(path)
+
+    for item in inputs:
+        if os.path.isdir(item):
+            if recursive:
+                for dirpath, dirnames, filenames in os.walk(item):
+                    dirnames.sort()
+                    for filename in sorted(filenames):
+                        if is_image(filename):
+                            add(os.path.join(dirpath, filename))
+            else:
+                for filename in sorted(os.listdir(item)):
+                    path = os.path.join(item, filename)
+                    if os.path.isfile(path) and is_image(filename):
+                        add(path)
+        elif glob.has_magic(item):
+            for path in sorted(glob.glob(item, recursive=True)):
+                if os.path.isfile(path) and is_image(path):
+                    add(path)
+        elif os.path.isfile(item):
+            # فایل‌های صریحاً ذکرشده بدون بررسی پسوند پردازش می‌شوند
+            add(item)
+        else:
+            print(f"هشدار: ورودی پیدا نشد: {item}", file=sys.stderr)
+
+    return paths
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="استخراج متن و کد از تصاویر بدون رابط گرافیکی (خروجی JSON Lines)"
+    )
+    parser.add_argument('inputs', nargs='+', help="فایل، پوشه یا الگوی glob")
+    parser.add_argument('-o', '--output',
+                        help="فایل خروجی؛ قالب از پسوند (.jsonl، .json، .csv، .txt)، پیش‌فرض JSONL در stdout")
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 1,
+                        help="تعداد فرایندهای موازی")
+    parser.add_argument('--engine', choices=sorted(ENGINES), default=DEFAULT_ENGINE,
+                        help="موتور OCR")
+    parser.add_argument('--batch-size', type=int, default=None,
+                        help="تعداد تصاویر در هر اجرای موتور")
+    parser.add_argument('--no-contrast', action='store_true', help="بدون بهبود کنتراست")
+    parser.add_argument('--no-denoise', action='store_true', help="بدون حذف نویز")
+    parser.add_argument('--no-binary', action='store_true', help="بدون باینری کردن")
+    parser.add_argument('--threshold-method', choices=THRESHOLD_METHODS,
+                        default=DEFAULT_THRESHOLD_METHOD, help="روش باینری کردن")
+    parser.add_argument('--threshold', type=int, default=FIXED_THRESHOLD,
+                        help="آستانه روش fixed")
+    parser.add_argument('--normalize', action='store_true',
+                        help="کوچک کردن تصاویر پرجزئیات تا ارتفاع متن هدف")
+    parser.add_argument('--target-text-height', type=int, default=TARGET_TEXT_HEIGHT,
+                        help="ارتفاع هدف خطوط متن به پیکسل")
+    parser.add_argument('--min-scale', type=float, default=MIN_SCALE, help="کمترین ضریب مقیاس")
+    parser.add_argument('--max-scale', type=float, default=MAX_SCALE, help="بیشترین ضریب مقیاس")
+    parser.add_argument('--skip-blank', action='store_true',
+                        help="رد کردن صفحات خالی و بدون متن بدون اجرای OCR")
+    parser.add_argument('--blank-threshold', type=float, default=BLANK_THRESHOLD,
+                        help="کمترین نسبت پیکسل‌های جوهر برای صفحه غیرخالی")
+    parser.add_argument('--cascade', action='store_true',
+                        help="خواندن دوباره بخش‌های کم‌اطمینان با روش‌های دیگر پیش‌پردازش")
+    parser.add_argument('--min-confidence', type=float, default=CASCADE_MIN_CONFIDENCE,
+                        help="کمترین اطمینان قابل قبول هر خط در حالت --cascade")
+    parser.add_argument('--time-limit', type=float, default=IMAGE_TIME_LIMIT,
+                        help="مهلت OCR هر تصویر به ثانیه (۰ بدون مهلت)")
+    parser.add_argument('--no-fallback', action='store_true',
+                        help="بدون تلاش ارزان‌تر برای تصاویری که مهلتشان تمام شده")
+    parser.add_argument('--no-tile', action='store_true',
+                        help="بدون OCR کاشی‌کاری‌شده تصاویر بسیار بزرگ")
+    # پیش‌فرض کاشی‌کاری، تکراری‌یابی و پایش در ماژول خودشان است (tiling،
+    # image_dedup و hot_folder) تا این ماژول‌ها فقط در همان حالت‌ها وارد شوند
+    parser.add_argument('--tile-size', type=int, help="ضلع کاشی به پیکسل")
+    parser.add_argument('--tile-overlap', type=int,
+                        help="هم‌پوشانی کاشی‌ها به پیکسل (بیشتر از بلندترین کلمه)")
+    parser.add_argument('--dedup', action='store_true',
+                        help="OCR فقط یک نسخه از تصاویر تقریباً یکسان؛ بقیه نتیجه آن را می‌گیرند")
+    parser.add_argument('--dedup-distance', type=int,
+                        help="بیشترین فاصله همینگ هش ادراکی (از ۲۵۶ بیت) نامزدهای تکراری؛ "
+                             "هر جفت با مقایسه جوهر تأیید می‌شود")
+    parser.add_argument('--no-recursive', action='store_true',
+                        help="عدم پیمایش زیرپوشه‌ها")
+    parser.add_argument('--no-cache', action='store_true', help="بدون حافظه نهان نتایج")
+    parser.add_argument('--cache-path', help="مسیر فایل حافظه نهان")
+    parser.add_argument('--no-journal', action='store_true',
+                        help="بدون دفترچه کار (اجرای متوقف‌شده قابل ادامه نیست)")
+    parser.add_argument('--journal-path', help="مسیر فایل دفترچه کار")
+    parser.add_argument('--no-index', action='store_true',
+                        help="بدون افزودن نتایج به نمایه جستجوی کدها (code_index.py)")
+    parser.add_argument('--index-path', help="مسیر فایل نمایه کدها")
+    parser.add_argument('--restart', action='store_true',
+                        help="شروع از نو به جای ادامه اجرای نیمه‌تمام قبلی")
+    parser.add_argument('--trace', metavar='PATH',
+                        help="نوشتن خط زمانی مراحل در قالب Chrome Trace (برای Perfetto)")
+    parser.add_argument('--watch', action='store_true',
+                        help="پایش پیوسته پوشه‌های ورودی و نوشتن نتیجه هر فایل در پوشه -o")
+    parser.add_argument('--settle-time', type=float,
+                        help="مدت ثابت ماندن اندازه فایل پیش از پردازش در حالت --watch (ثانیه)")
+    parser.add_argument('-q', '--quiet', action='store_true',
+                        help="بدون نمایش پیشرفت و جدول زمان مراحل")
+    return parser
+
+
+def open_index(args):
+    """نمایه کدها؛ فقط در صورت نیاز وارد می‌شود"""
+    if args.no_index:
+        return None
+    from code_index import CodeIndex, DEFAULT_INDEX_PATH
+    return CodeIndex(args.index_path or DEFAULT_INDEX_PATH)
+
+
+def watch(args, config):
+    """حالت پوشه داغ: پردازش فایل‌های جدید تا توقف با Ctrl+C"""
+    directories = [item for item in args.inputs if os.path.isdir(item)]
+    if len(directories) != len(args.inputs) or not args.output:
+        print("خطا: در حالت --watch ورودی‌ها باید پوشه باشند و -o پوشه خروجی است", file=sys.stderr)
+        return EXIT_USAGE
+
+    # hot_folder فقط در حالت پایش وارد می‌شود
+    from hot_folder import HotFolder, SETTLE_TIME
+    code_index = open_index(args)
+
+    def on_result(result):
+        if code_index is not None:
+            code_index.add(result)
+        if not args.quiet:
+            status = result.get('error') or result.get('skipped') or f"{result['code_count']} کد"
+            print(f"{display_name(result)}: {status}", file=sys.stderr, flush=True)
+
+    def on_duplicate(path):
+        if not args.quiet:
+            print(f"{os.path.basename(path)}: تکراری", file=sys.stderr, flush=True)
+
+    def on_error(path, error):
+        print(f"{path}: خطا: {error}", file=sys.stderr, flush=True)
+
+    folder = HotFolder(
+        directories, args.output, config, workers=args.workers,
+        recursive=not args.no_recursive, on_result=on_result, on_duplicate=on_duplicate,
+        on_error=on_error,
+        settle_time=SETTLE_TIME if args.settle_time is None else args.settle_time
+    )
+    print(f"پایش {', '.join(directories)} (توقف با Ctrl+C)", file=sys.stderr)
+    try:
+        folder.run()
+    except KeyboardInterrupt:
+        folder.stop()
+        return EXIT_INTERRUPTED
+    finally:
+        if code_index is not None:
+            code_index.close()
+    return EXIT_OK
+
+
+def main(argv=None):
+    """تابع اصلی خط فرمان"""
+    args = build_parser().parse_args(argv)
+    # ورودی‌ها فایل‌های خود کاربر هستند؛ نقشه‌های بسیار بزرگ کاشی‌کاری می‌شوند
+    allow_large_images()
+
+    batch_size = args.batch_size
+    if batch_size is None:
+        batch_size = 1 if args.engine == 'pytesseract' else 16
+
+    config = {
+        'enhance_contrast': not args.no_contrast,
+        'denoise': not args.no_denoise,
+        'binary': not args.no_binary,
+        'threshold_method': args.threshold_method,
+        'threshold': args.threshold,
+        'normalize': args.normalize,
+        'target_text_height': args.target_text_height,
+        'min_scale': args.min_scale,
+        'max_scale': args.max_scale,
+        'skip_blank': args.skip_blank,
+        'blank_threshold': args.blank_threshold,
+        'cascade': args.cascade,
+        'min_confidence': args.min_confidence,
+        'time_limit': args.time_limit,
+        'timeout_fallback': not args.no_fallback,
+        'tile': not args.no_tile,
+        'tile_workers': max(1, (os.cpu_count() or 1) // max(1, args.workers)),
+        'dedup': args.dedup,
+        'trace': bool(args.trace),
+        'engine': args.engine,
+        'engine_batch_size': max(1, batch_size)
+    }
+    # بدون گزینه صریح پیش‌فرض tiling و image_dedup به کار می‌رود
+    for key in ('tile_size', 'tile_overlap', 'dedup_distance'):
+        if getattr(args, key) is not None:
+            config[key] = getattr(args, key)
+
+    if args.watch:
+        return watch(args, config)
+
+    # هر صفحه فایل‌های چندصفحه‌ای (TIFF و PDF) یک کار جداست
+    image_paths = list(expand_pages(expand_inputs(args.inputs, recursive=not args.no_recursive)))
+    if not image_paths:
+        print("خطا: هیچ تصویری برای پردازش پیدا نشد", file=sys.stderr)
+        return EXIT_USAGE
+
+    cache = None
+    if not args.no_cache:
+        # حافظه نهان فقط در صورت نیاز وارد می‌شود
+        from result_cache import ResultCache, DEFAULT_CACHE_PATH
+        cache = ResultCache(args.cache_path or DEFAULT_CACHE_PATH)
+
+    journal = None
+    if not args.no_journal:
+        from job_journal import JobJournal, DEFAULT_JOURNAL_PATH
+        journal = JobJournal(args.journal_path or DEFAULT_JOURNAL_PATH)
+
+    code_index = open_index(args)
+
+    processor = BatchProcessor(cache=cache)
+    if args.output:
+        sink = open_sink(args.output, default='.jsonl')
+    else:
+        # خروجی استاندارد خط‌به‌خط برای مصرف‌کننده‌های زنده
+        sink = JsonlSink(sys.stdout, flush_every=1)
+    counts = sink.summary
+    stage_stats = StageStats()
+    tracer = TraceWriter('ocr_cli') if args.trace else None
+    total = len(image_paths)
+    progress_tty = sys.stderr.isatty()
+    start_time = time.time()
+    resumed = 0
+    duplicates = 0
+    timeouts = 0
+
+    def on_result(index, result):
+        nonlocal resumed, duplicates, timeouts
+        if result.get('duplicate_of'):
+            duplicates += 1
+        if result.get('timeout') or result.get('fallback'):
+            timeouts += 1
+        if result.get('resumed'):
+            # نتیجه اجرای قبلی؛ در آمار زمان این اجرا حساب نمی‌شود
+            resumed += 1
+        else:
+            stage_stats.add(result.get('timings'))
+            if code_index is not None:
+                code_index.add(result)
+        if 'trace' in result:
+            tracer.add_result(result, index)
+            result = {k: v for k, v in result.items() if k != 'trace'}
+        sink.write(result, index)
+
+        if not args.quiet:
+            message = f"پردازش {counts['total_images']} از {total} - {display_name(result)}"
+            if progress_tty:
+                print('\r\033[K' + message, end='', file=sys.stderr, flush=True)
+            else:
+                print(message, file=sys.stderr, flush=True)
+
+    def run():
+        if journal is not None:
+            processor.resume_batch(image_paths, config, journal, args.workers, on_result,
+                                   collect=False, restart=args.restart)
+        else:
+            processor.process_batch(image_paths, config, args.workers, on_result, collect=False)
+
+    interrupted = False
+    try:
+        if tracer:
+            with tracer.span('batch', images=total, workers=args.workers):
+                run()
+        else:
+            run()
+    except KeyboardInterrupt:
+        processor.cancel()
+        interrupted = True
+    finally:
+        sink.close()
+        if cache is not None:
+            cache.close()
+        if journal is not None:
+            journal.close()
+        if code_index is not None:
+            code_index.close()
+
+    elapsed = time.time() - start_time
+    if not args.quiet and progress_tty:
+        print(file=sys.stderr)
+
+    done = counts['total_images']
+    summary = (
+        f"تصاویر: {done} از {total} | موفق: {counts['processed_images']} | "
+        f"خطا: {counts['failed_images']} | ردشده: {counts['skipped_images']} | "
+        f"کدها: {counts['total_codes']} | کلمات: {counts['total_words']} | "
+        f"زمان: {elapsed:.1f}s ({done / elapsed if elapsed else 0:.1f} تصویر/s)"
+    )
+    if resumed:
+        summary += f" | ادامه از اجرای قبلی: {resumed}"
+    if duplicates:
+        summary += f" | تکراری: {duplicates}"
+    if timeouts:
+        summary += f" | پایان مهلت: {timeouts}"
+    if cache is not None:
+        summary += f" | حافظه نهان: {cache.hits} موفق، {cache.misses} ناموفق"
+    print(summary, file=sys.stderr)
+    if not args.quiet and stage_stats.durations:
+        print("زمان مراحل (ms):", file=sys.stderr)
+        print(stage_stats.table(), file=sys.stderr)
+    if not args.quiet and processor.pipeline_stats is not None:
+        print("خط لوله پردازش:", file=sys.stderr)
+        print(processor.pipeline_stats.table(), file=sys.stderr)
+    if tracer:
+        tracer.write(args.trace)
+        print(f"خط زمانی در {args.trace} نوشته شد", file=sys.stderr)
+
+    if interrupted:
+        return EXIT_INTERRUPTED
+    if counts['failed_images']:
+        return EXIT_FAILURES
+    return EXIT_OK
+
+
+if __name__ == '__main__':
+    sys.exit(main())
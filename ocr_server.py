@@ -0,0 +1,456 @@
+"""سرویس HTTP محلی OCR با دسته‌بندی درخواست‌ها و کنترل فشار
+
+درخواست‌ها در صفی با ظرفیت محدود قرار می‌گیرند و هر رشته کارگر (با
+پردازشگر و موتور گرم خودش) درخواست‌های رسیده با تنظیمات یکسان را تا
+--batch-window میلی‌ثانیه جمع می‌کند و با یک بار اجرای موتور پردازش
+می‌کند. اگر صف پر باشد پاسخ 429 و اگر سرویس در حال توقف باشد یا نتیجه در
+مهلت آماده نشود پاسخ 503 داده می‌شود.
+
+    python ocr_server.py --port 8765 --workers 4
+
+    POST /ocr?skip_blank=1&threshold_method=sauvola&name=scan.png   (بدنه: بایت‌های تصویر)
+    POST /ocr?path=/data/scan.png                                   (فایل محلی)
+    GET  /health
+    GET  /stats
+
+پارامترهای کوئری با همان نام کلیدهای config پردازش هستند. پارامتر path
+فقط فایل‌های زیر پوشه‌های --path-root را می‌پذیرد؛ بدون --path-root فقط وقتی
+پذیرفته می‌شود که سرویس روی نشانی محلی (loopback) شنود کند.
+"""
+import argparse
+import ipaddress
+import json
+import os
+import queue
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from batch_processor import BatchProcessor, CASCADE_MIN_CONFIDENCE, IMAGE_TIME_LIMIT
+from tesseract_engine import ENGINES, available_engines
+from tesseract_discovery import tesseract_info
+from page_source import allow_large_images
+from preprocessing import (
+    THRESHOLD_METHODS, DEFAULT_THRESHOLD_METHOD, FIXED_THRESHOLD,
+    TARGET_TEXT_HEIGHT, MIN_SCALE, MAX_SCALE, BLANK_THRESHOLD
+)
+
+DEFAULT_PORT = 8765
+QUEUE_DEPTH = 64
+BATCH_SIZE = 8
+BATCH_WINDOW = 0.01
+REQUEST_TIMEOUT = 60.0
+MAX_UPLOAD_BYTES = 64 * 1024 * 1024
+RETRY_AFTER = 1
+
+# تبدیل پارامترهای کوئری به کلیدهای config
+CONFIG_TYPES = {
+    'enhance_contrast': bool,
+    'denoise': bool,
+    'binary': bool,
+    'threshold_method': str,
+    'threshold': int,
+    'normalize': bool,
+    'target_text_height': int,
+    'min_scale': float,
+    'max_scale': float,
+    'skip_blank': bool,
+    'blank_threshold': float,
+    'cascade': bool,
+    'tile': bool,
+    'time_limit': float,
+    'min_confidence': float,
+    'engine': str,
+}
+
+DEFAULT_CONFIG = {
+    'enhance_contrast': True,
+    'denoise': True,
+    'binary': True,
+    'threshold_method': DEFAULT_THRESHOLD_METHOD,
+    'threshold': FIXED_THRESHOLD,
+    'normalize': False,
+    'target_text_height': TARGET_TEXT_HEIGHT,
+    'min_scale': MIN_SCALE,
+    'max_scale': MAX_SCALE,
+    'skip_blank': False,
+    'blank_threshold': BLANK_THRESHOLD,
+    'cascade': False,
+    'tile': True,
+    # تصویر کند نباید از مهلت پاسخ درخواست بیشتر طول بکشد
+    'time_limit': min(IMAGE_TIME_LIMIT, REQUEST_TIMEOUT / 2),
+    'min_confidence': CASCADE_MIN_CONFIDENCE,
+}
+
+
+def default_engine():
+    """موتوری که هزینه راه‌اندازی را بین تصاویر یک دسته تقسیم می‌کند"""
+    return 'tesserocr' if 'tesserocr' in available_engines() else 'list'
+
+
+def parse_bool(value):
+    if value.lower() in ('1', 'true', 'yes', 'on'):
+        return True
+    if value.lower() in ('0', 'false', 'no', 'off'):
+        return False
+    raise ValueError(value)
+
+
+def build_config(params, defaults):
+    """config پردازش از پارامترهای کوئری؛ کلید یا مقدار نامعتبر ValueError می‌دهد"""
+    config = dict(defaults)
+    for key, values in params.items():
+        if key in ('name', 'path'):
+            continue
+        if key not in CONFIG_TYPES:
+            raise ValueError(f"پارامتر ناشناخته: {key}")
+        kind = CONFIG_TYPES[key]
+        try:
+            config[key] = parse_bool(values[-1]) if kind is bool else kind(values[-1])
+        except ValueError:
+            raise ValueError(f"مقدار نامعتبر برای {key}: {values[-1]}")
+    if config['threshold_method'] not in THRESHOLD_METHODS:
+        raise ValueError(f"روش باینری ناشناخته: {config['threshold_method']}")
+    if config['engine'] not in ENGINES:
+        raise ValueError(f"موتور ناشناخته: {config['engine']}")
+    return config
+
+
+class Job:
+    """یک درخواست در صف؛ نتیجه با event به رشته HTTP برمی‌گردد"""
+
+    def __init__(self, image_path, config, name=None, temporary=False):
+        self.image_path = image_path
+        self.config = config
+        self.config_key = json.dumps(config, sort_keys=True)
+        self.name = name
+        self.temporary = temporary
+        self.queued_at = time.perf_counter()
+        self.done = threading.Event()
+        self.cancelled = False
+        self.result = None
+
+
+class OCRService:
+    """صف محدود درخواست‌ها و رشته‌های کارگر دسته‌ساز"""
+
+    def __init__(self, workers=2, queue_depth=QUEUE_DEPTH, batch_size=BATCH_SIZE,
+                 batch_window=BATCH_WINDOW, defaults=None):
+        self.jobs = queue.Queue(maxsize=queue_depth)
+        self.batch_size = max(1, batch_size)
+        self.batch_window = batch_window
+        self.defaults = dict(defaults or DEFAULT_CONFIG)
+        self.defaults.setdefault('engine', default_engine())
+        self.stopping = threading.Event()
+        self.lock = threading.Lock()
+        self.stats = {
+            'processed': 0, 'rejected': 0, 'timed_out': 0,
+            'batches': 0, 'batched_images': 0, 'busy_workers': 0
+        }
+        self.threads = [
+            threading.Thread(target=self.worker, name=f"ocr-worker-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, job):
+        """افزودن به صف؛ False اگر صف پر یا سرویس در حال توقف باشد"""
+        if self.stopping.is_set():
+            return False
+        try:
+            self.jobs.put_nowait(job)
+            return True
+        except queue.Full:
+            with self.lock:
+                self.stats['rejected'] += 1
+            return False
+
+    def next_batch(self, carry):
+        """یک دسته درخواست با تنظیمات یکسان؛ بقیه برای دسته بعد در carry می‌مانند"""
+        if carry:
+            first = carry.popleft()
+        else:
+            try:
+                first = self.jobs.get(timeout=0.5)
+            except queue.Empty:
+                return []
+        batch = [first]
+        deadline = time.perf_counter() + self.batch_window
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                job = self.jobs.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if job.config_key == first.config_key:
+                batch.append(job)
+            else:
+                carry.append(job)
+        for job in batch:
+            if job.cancelled:
+                # پاسخ داده شده است؛ فقط فایل موقت آزاد می‌شود
+                job.done.set()
+        return [job for job in batch if not job.cancelled]
+
+    def worker(self):
+        processor = BatchProcessor()
+        carry = deque()
+        while not self.stopping.is_set():
+            batch = self.next_batch(carry)
+            if not batch:
+                continue
+            with self.lock:
+                self.stats['busy_workers'] += 1
+            started = time.perf_counter()
+            try:
+                results = processor.process_images([job.image_path for job in batch], batch[0].config)
+            except Exception as e:
+                results = [processor.error_result(job.image_path, e) for job in batch]
+
+            for job, result in zip(batch, results):
+                result.setdefault('timings', {})['queue'] = started - job.queued_at
+                if job.temporary:
+                    result['filename'] = job.name or 'upload'
+                    result.pop('path', None)
+                job.result = result
+                job.done.set()
+            with self.lock:
+                self.stats['busy_workers'] -= 1
+                self.stats['processed'] += len(batch)
+                self.stats['batches'] += 1
+                self.stats['batched_images'] += len(batch)
+
+        # پاسخ 503 به درخواست‌های باقی‌مانده در صف
+        for job in list(carry):
+            job.done.set()
+        if processor.engine is not None:
+            processor.engine.close()
+
+    def snapshot(self):
+        with self.lock:
+            stats = dict(self.stats)
+        stats['queue_depth'] = self.jobs.qsize()
+        stats['queue_capacity'] = self.jobs.maxsize
+        stats['workers'] = len(self.threads)
+        stats['mean_batch_size'] = (
+            stats['batched_images'] / stats['batches'] if stats['batches'] else 0.0
+        )
+        return stats
+
+    def close(self):
+        self.stopping.set()
+        while True:
+            try:
+                self.jobs.get_nowait().done.set()
+            except queue.Empty:
+                break
+        for thread in self.threads:
+            thread.join()
+
+
+class OCRRequestHandler(BaseHTTPRequestHandler):
+    """پاسخ‌گوی HTTP؛ سرویس در server.service است"""
+
+    protocol_version = 'HTTP/1.1'
+    server_version = 'OCR_OFFLINE'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        service = self.server.service
+        path = urlparse(self.path).path
+        if path == '/health':
+            status = 503 if service.stopping.is_set() else 200
+            info = tesseract_info()
+            self.send_json(status, {'ok': status == 200, 'tesseract': info['version'],
+                                    'languages': info['languages']})
+        elif path == '/stats':
+            self.send_json(200, service.snapshot())
+        else:
+            self.send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        service = self.server.service
+        url = urlparse(self.path)
+        if url.path != '/ocr':
+            self.send_json(404, {'error': 'not found'})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.send_json(400, {'error': "Content-Length نامعتبر است"}, {'Connection': 'close'})
+            self.close_connection = True
+            return
+        if length > MAX_UPLOAD_BYTES:
+            self.send_json(413, {'error': "حجم تصویر بیش از حد مجاز است"},
+                           {'Connection': 'close'})
+            self.close_connection = True
+            return
+        body = self.rfile.read(length) if length else b''
+
+        params = parse_qs(url.query)
+        try:
+            config = build_config(params, service.defaults)
+        except ValueError as e:
+            self.send_json(400, {'error': str(e)})
+            return
+
+        if 'path' in params:
+            path = params['path'][-1]
+            if self.server.path_roots is None or (
+                    self.server.path_roots and not path_allowed(path, self.server.path_roots)):
+                self.send_json(403, {'error': "خواندن این مسیر از سرویس مجاز نیست"})
+                return
+            job = Job(path, config)
+        elif body:
+            fd, temp_path = tempfile.mkstemp(prefix='ocr_upload_')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(body)
+            job = Job(temp_path, config, params.get('name', ['upload'])[-1], temporary=True)
+        else:
+            self.send_json(400, {'error': "بدنه درخواست یا پارامتر path لازم است"})
+            return
+
+        try:
+            if not service.submit(job):
+                if service.stopping.is_set():
+                    self.send_json(503, {'error': "سرویس در حال توقف است"})
+                else:
+                    self.send_json(429, {'error': "صف پر است"}, {'Retry-After': str(RETRY_AFTER)})
+                return
+
+            if not job.done.wait(self.server.request_timeout) or job.result is None:
+                job.cancelled = True
+                with service.lock:
+                    service.stats['timed_out'] += 1
+                self.send_json(503, {'error': "نتیجه در مهلت آماده نشد"},
+                               {'Retry-After': str(RETRY_AFTER)})
+                return
+            self.send_json(200 if job.result['success'] else 422, job.result)
+        finally:
+            if job.temporary:
+                if job.cancelled and not job.done.is_set():
+                    # کارگر ممکن است هنوز فایل را بخواند؛ پس از اتمام حذف می‌شود
+                    threading.Thread(target=remove_when_done, args=(job,), daemon=True).start()
+                else:
+                    os.remove(job.image_path)
+
+
+def is_loopback(host):
+    """نشانی شنود فقط از همین رایانه در دسترس است"""
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def path_allowed(path, roots):
+    """فایل محلی path زیر یکی از پوشه‌های roots (مسیرهای واقعی) است"""
+    path = os.path.realpath(path)
+    for root in roots:
+        try:
+            if os.path.commonpath([path, root]) == root:
+                return True
+        except ValueError:
+            # درایوهای متفاوت در ویندوز
+            continue
+    return False
+
+
+def remove_when_done(job):
+    job.done.wait()
+    os.remove(job.image_path)
+
+
+def create_server(host='127.0.0.1', port=DEFAULT_PORT, service=None,
+                  request_timeout=REQUEST_TIMEOUT, verbose=False, path_roots=None):
+    """ساخت سرور HTTP (اجرا با serve_forever)
+
+    پارامتر path فقط فایل‌های زیر پوشه‌های path_roots را می‌خواند؛ بدون
+    path_roots هر فایل محلی فقط روی نشانی loopback پذیرفته می‌شود.
+    """
+    server = ThreadingHTTPServer((host, port), OCRRequestHandler)
+    server.daemon_threads = True
+    if path_roots:
+        # None یعنی path پذیرفته نمی‌شود و فهرست خالی یعنی هر مسیری
+        server.path_roots = [os.path.realpath(root) for root in path_roots]
+    else:
+        server.path_roots = [] if is_loopback(host) else None
+    server.service = service or OCRService()
+    server.request_timeout = request_timeout
+    server.verbose = verbose
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="سرویس HTTP محلی استخراج متن و کد")
+    parser.add_argument('--host', default='127.0.0.1',
+                        help="نشانی شنود؛ جز نشانی محلی، path= فقط با --path-root پذیرفته می‌شود")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 1,
+                        help="تعداد رشته‌های کارگر")
+    parser.add_argument('--queue-depth', type=int, default=QUEUE_DEPTH,
+                        help="ظرفیت صف؛ پس از آن پاسخ 429")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                        help="بیشترین تعداد تصویر در هر اجرای موتور")
+    parser.add_argument('--batch-window', type=float, default=BATCH_WINDOW * 1000,
+                        help="مدت انتظار برای تکمیل دسته (میلی‌ثانیه)")
+    parser.add_argument('--engine', choices=sorted(ENGINES), default=None,
+                        help="موتور پیش‌فرض OCR")
+    parser.add_argument('--timeout', type=float, default=REQUEST_TIMEOUT,
+                        help="مهلت آماده شدن نتیجه؛ پس از آن پاسخ 503 (ثانیه)")
+    parser.add_argument('--max-image-pixels', type=int, default=0,
+                        help="پذیرش تصاویر بزرگ‌تر از حد پیش‌فرض PIL تا این تعداد پیکسل "
+                             "(فقط برای کاربران مورد اعتماد)")
+    parser.add_argument('--path-root', action='append', default=[],
+                        help="پوشه‌ای که پارامتر path فقط فایل‌های زیر آن را می‌خواند (تکرارپذیر)")
+    parser.add_argument('-v', '--verbose', action='store_true', help="ثبت هر درخواست")
+    args = parser.parse_args(argv)
+    if args.max_image_pixels:
+        allow_large_images(args.max_image_pixels)
+
+    # کاشی‌های تصویر بزرگ بین رشته‌های کارگر تقسیم می‌شوند، نه در هر کدام همه هسته‌ها
+    defaults = dict(DEFAULT_CONFIG, engine=args.engine or default_engine(),
+                    tile_workers=max(1, (os.cpu_count() or 1) // max(1, args.workers)))
+    service = OCRService(args.workers, args.queue_depth, args.batch_size,
+                         args.batch_window / 1000, defaults)
+    server = create_server(args.host, args.port, service, args.timeout, args.verbose,
+                           args.path_root)
+    print(f"سرویس OCR روی http://{args.host}:{server.server_port} "
+          f"({args.workers} کارگر، موتور {defaults['engine']})", file=sys.stderr, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,120 +1,21 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
-from PIL import Image, ImageTk, ImageEnhance, ImageFilter
-import pytesseract
-import re
+from batch_processor import BatchProcessor, IMAGE_TIME_LIMIT
+from tesseract_engine import available_engines, DEFAULT_ENGINE
+from preprocessing import THRESHOLD_METHODS, DEFAULT_THRESHOLD_METHOD
+from result_cache import ResultCache
+from image_collection import ImageCollection
+from tracing import StageStats
+from page_source import expand_pages, display_name, allow_large_images
 import os
-import threading
-import time
-from datetime import datetime
 import queue
-import json
+import threading
 
-# تنظیم مسیر Tesseract (ویندوز)
-try:
-    pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
-except:
-    pass
+# تعداد ردیف‌های قبل و بعد از ردیف انتخاب‌شده برای ساخت پیشاپیش بندانگشتی
+PREFETCH_ROWS = 5
 
-class BatchProcessor:
-    """پردازشگر دسته‌ای تصاویر"""
-    
-    def __init__(self):
-        self.queue = queue.Queue()
-        self.results = []
-        self.processing = False
-        
-    def process_image(self, image_path, config):
-        """پردازش یک تصویر"""
-        try:
-            img = Image.open(image_path)
-            
-            # پیش‌پردازش
-            if img.mode != 'L':
-                img = img.convert('L')
-            
-            if config['enhance_contrast']:
-                enhancer = ImageEnhance.Contrast(img)
-                img = enhancer.enhance(2.0)
-            
-            if config['denoise']:
-                img = img.filter(ImageFilter.MedianFilter(size=3))
-            
-            if config['binary']:
-                img = img.point(lambda x: 0 if x < 180 else 255, '1')
-            
-            # استخراج متن
-            custom_config = r'--psm 6 --oem 3 -c tessedit_char_whitelist=0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ.,!?@#$%^&*()_-+={{}}[]|\\:;"\'<>/ '
-            text = pytesseract.image_to_string(img, config=custom_config)
-            
-            # پاکسازی و استخراج کدها
-            cleaned_text = self.clean_text(text)
-            codes = self.extract_codes(text)
-            
-            return {
-                'filename': os.path.basename(image_path),
-                'path': image_path,
-                'raw_text': text,
-                'cleaned_text': cleaned_text,
-                'codes': codes,
-                'code_count': len(codes),
-                'word_count': len(cleaned_text.split()),
-                'char_count': len(cleaned_text),
-                'processing_time': time.time(),
-                'success': True
-            }
-            
-        except Exception as e:
-            return {
-                'filename': os.path.basename(image_path),
-                'path': image_path,
-                'error': str(e),
-                'success': False
-            }
-    
-    def clean_text(self, text):
-        """پاکسازی متن"""
-        # حذف کاراکترهای غیر انگلیسی و غیر عددی
-        lines = [line.strip() for line in text.split('\n') if line.strip()]
-        cleaned_lines = []
-        
-        for line in lines:
-            # فقط کاراکترهای انگلیسی، اعداد و علائم نگارشی مجاز
-            line = re.sub(r'[^\x00-\x7F]+', '', line)
-            line = re.sub(r'\s+', ' ', line)
-            if line.strip():
-                cleaned_lines.append(line)
-        
-        return '\n'.join(cleaned_lines)
-    
-    def extract_codes(self, text):
-        """استخراج کدهای مختلف از متن"""
-        codes = []
-        
-        # الگوهای مختلف برای کدها
-        patterns = [
-            r'\b[A-Z0-9]{6,12}\b',  # کدهای ۶-۱۲ کاراکتری حروف و اعداد
-            r'\b\d{4,10}\b',         # اعداد ۴-۱۰ رقمی
-            r'\b[A-Z]{2,5}\d{3,8}\b',  # ترکیب حروف و اعداد
-            r'\b[A-Z]{3,8}\b',       # حروف بزرگ
-            r'\b[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}\b',  # ایمیل
-            r'\bhttps?://\S+\b',     # لینک‌ها
-            r'\b(?:\d{1,3}\.){3}\d{1,3}\b',  # آی‌پی آدرس
-        ]
-        
-        for pattern in patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            codes.extend(matches)
-        
-        # حذف موارد تکراری
-        unique_codes = []
-        seen = set()
-        for code in codes:
-            if code not in seen:
-                seen.add(code)
-                unique_codes.append(code)
-        
-        return unique_codes
+# فاصله به‌روزرسانی رابط در حین پردازش (میلی‌ثانیه)
+UI_UPDATE_INTERVAL = 100
 
 class ModernOCRApp:
     def __init__(self, root):
@@ -123,9 +24,25 @@ class ModernOCRApp:
         self.root.geometry("1200x800")
         
         # متغیرها
-        self.image_paths = []
-        self.current_results = []
-        self.batch_processor = BatchProcessor()
+        self.image_paths = ImageCollection()
+        self.batch_paths = []
+        # دفترچه کار، نمایه کدها، بندانگشتی‌ها و result_sinks در اولین استفاده
+        # وارد و ساخته می‌شوند تا پنجره زودتر نمایش داده شود
+        self.result_summary = None
+        self.stage_stats = StageStats()
+        self.spool_path = None
+        self.ui_events = queue.Queue()
+        self.result_cache = None
+        try:
+            self.result_cache = ResultCache()
+        except Exception:
+            pass
+        self.job_journal = None
+        self.code_index = None
+        self.thumbnails = None
+        self.resumed_count = 0
+        self.duplicate_count = 0
+        self.batch_processor = BatchProcessor(cache=self.result_cache)
         self.processing = False
         
         # تنظیم استایل
@@ -134,6 +51,33 @@ class ModernOCRApp:
         # ایجاد رابط کاربری
         self.create_widgets()
         
+    def open_job_journal(self):
+        """دفترچه کار (در اولین اجرا ساخته می‌شود)؛ None اگر در دسترس نباشد"""
+        if self.job_journal is None:
+            try:
+                from job_journal import JobJournal
+                self.job_journal = JobJournal()
+            except Exception:
+                pass
+        return self.job_journal
+    
+    def open_code_index(self):
+        """نمایه کدها (در اولین اجرا یا جستجو ساخته می‌شود)؛ None اگر در دسترس نباشد"""
+        if self.code_index is None:
+            try:
+                from code_index import CodeIndex
+                self.code_index = CodeIndex()
+            except Exception:
+                pass
+        return self.code_index
+    
+    def open_thumbnails(self):
+        """حافظه نهان بندانگشتی‌ها (با اولین پیش‌نمایش ساخته می‌شود)"""
+        if self.thumbnails is None:
+            from thumbnails import ThumbnailCache, DEFAULT_THUMB_DIR
+            self.thumbnails = ThumbnailCache(disk_dir=DEFAULT_THUMB_DIR)
+        return self.thumbnails
+    
     def setup_styles(self):
         """تنظیم استایل‌ها"""
         self.colors = {
@@ -303,6 +247,83 @@ class ModernOCRApp:
             activeforeground='white'
         ).pack(anchor=tk.W)
         
+        # روش باینری کردن
+        threshold_frame = tk.Frame(settings_frame, bg=self.colors['sidebar'])
+        threshold_frame.pack(anchor=tk.W, pady=(0, 5))
+        
+        tk.Label(
+            threshold_frame,
+            text="روش آستانه:",
+            font=self.fonts['normal'],
+            bg=self.colors['sidebar'],
+            fg='white'
+        ).pack(side=tk.LEFT)
+        
+        self.threshold_var = tk.StringVar(value=DEFAULT_THRESHOLD_METHOD)
+        ttk.Combobox(
+            threshold_frame,
+            textvariable=self.threshold_var,
+            values=THRESHOLD_METHODS,
+            state='readonly',
+            width=10
+        ).pack(side=tk.LEFT, padx=5)
+        
+        # کوچک کردن تصاویر پرجزئیات پیش از OCR
+        self.normalize_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(
+            settings_frame,
+            text="نرمال‌سازی وضوح",
+            variable=self.normalize_var,
+            font=self.fonts['normal'],
+            bg=self.colors['sidebar'],
+            fg='white',
+            selectcolor=self.colors['primary'],
+            activebackground=self.colors['sidebar'],
+            activeforeground='white'
+        ).pack(anchor=tk.W)
+        
+        # رد کردن صفحات خالی بدون OCR
+        self.skip_blank_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(
+            settings_frame,
+            text="رد کردن صفحات خالی",
+            variable=self.skip_blank_var,
+            font=self.fonts['normal'],
+            bg=self.colors['sidebar'],
+            fg='white',
+            selectcolor=self.colors['primary'],
+            activebackground=self.colors['sidebar'],
+            activeforeground='white'
+        ).pack(anchor=tk.W)
+        
+        # خواندن دوباره بخش‌های کم‌اطمینان با روش‌های دیگر پیش‌پردازش
+        self.cascade_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(
+            settings_frame,
+            text="بهبود خودکار بخش‌های کم‌اطمینان",
+            variable=self.cascade_var,
+            font=self.fonts['normal'],
+            bg=self.colors['sidebar'],
+            fg='white',
+            selectcolor=self.colors['primary'],
+            activebackground=self.colors['sidebar'],
+            activeforeground='white'
+        ).pack(anchor=tk.W)
+        
+        # OCR فقط یک نسخه از تصاویر تقریباً یکسان (اسکن یا ذخیره دوباره)
+        self.dedup_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(
+            settings_frame,
+            text="حذف تصاویر تکراری مشابه",
+            variable=self.dedup_var,
+            font=self.fonts['normal'],
+            bg=self.colors['sidebar'],
+            fg='white',
+            selectcolor=self.colors['primary'],
+            activebackground=self.colors['sidebar'],
+            activeforeground='white'
+        ).pack(anchor=tk.W)
+        
         # استخراج کدهای خاص
         self.extract_codes_var = tk.BooleanVar(value=True)
         tk.Checkbutton(
@@ -317,6 +338,88 @@ class ModernOCRApp:
             activeforeground='white'
         ).pack(anchor=tk.W)
         
+        # حافظه نهان نتایج
+        self.cache_var = tk.BooleanVar(value=self.result_cache is not None)
+        tk.Checkbutton(
+            settings_frame,
+            text="حافظه نهان نتایج",
+            variable=self.cache_var,
+            font=self.fonts['normal'],
+            bg=self.colors['sidebar'],
+            fg='white',
+            selectcolor=self.colors['primary'],
+            activebackground=self.colors['sidebar'],
+            activeforeground='white'
+        ).pack(anchor=tk.W)
+        
+        # ادامه اجرای متوقف‌شده همین تصاویر از دفترچه کار
+        self.resume_var = tk.BooleanVar(value=True)
+        tk.Checkbutton(
+            settings_frame,
+            text="ادامه کار نیمه‌تمام",
+            variable=self.resume_var,
+            font=self.fonts['normal'],
+            bg=self.colors['sidebar'],
+            fg='white',
+            selectcolor=self.colors['primary'],
+            activebackground=self.colors['sidebar'],
+            activeforeground='white'
+        ).pack(anchor=tk.W)
+        
+        # تعداد فرایندهای موازی
+        workers_frame = tk.Frame(settings_frame, bg=self.colors['sidebar'])
+        workers_frame.pack(anchor=tk.W, pady=(5, 0))
+        
+        tk.Label(
+            workers_frame,
+            text="پردازش موازی:",
+            font=self.fonts['normal'],
+            bg=self.colors['sidebar'],
+            fg='white'
+        ).pack(side=tk.LEFT)
+        
+        self.workers_var = tk.IntVar(value=os.cpu_count() or 1)
+        tk.Spinbox(
+            workers_frame,
+            from_=1,
+            to=max(os.cpu_count() or 1, 1) * 2,
+            textvariable=self.workers_var,
+            width=4,
+            font=self.fonts['normal']
+        ).pack(side=tk.LEFT, padx=5)
+        
+        # موتور OCR
+        engine_frame = tk.Frame(settings_frame, bg=self.colors['sidebar'])
+        engine_frame.pack(anchor=tk.W, pady=(5, 0))
+        
+        tk.Label(
+            engine_frame,
+            text="موتور OCR:",
+            font=self.fonts['normal'],
+            bg=self.colors['sidebar'],
+            fg='white'
+        ).pack(side=tk.LEFT)
+        
+        self.engine_var = tk.StringVar(value=DEFAULT_ENGINE)
+        ttk.Combobox(
+            engine_frame,
+            textvariable=self.engine_var,
+            values=available_engines(),
+            state='readonly',
+            width=10
+        ).pack(side=tk.LEFT, padx=5)
+        
+        tk.Button(
+            settings_frame,
+            text="🧹 پاک کردن حافظه نهان",
+            font=self.fonts['normal'],
+            bg=self.colors['secondary'],
+            fg='white',
+            relief=tk.FLAT,
+            cursor='hand2',
+            command=self.clear_cache
+        ).pack(fill=tk.X, pady=(10, 0))
+        
         # آمار
         tk.Label(
             sidebar,
@@ -361,6 +464,26 @@ class ModernOCRApp:
         header_buttons = tk.Frame(header, bg='white')
         header_buttons.pack(side=tk.RIGHT, padx=20)
         
+        tk.Button(
+            header_buttons,
+            text="👁️ پیش‌نمایش",
+            font=self.fonts['normal'],
+            bg=self.colors['secondary'],
+            fg='white',
+            relief=tk.FLAT,
+            command=self.preview_selected
+        ).pack(side=tk.LEFT, padx=5)
+        
+        tk.Button(
+            header_buttons,
+            text="❌ حذف انتخاب‌شده",
+            font=self.fonts['normal'],
+            bg=self.colors['warning'],
+            fg='white',
+            relief=tk.FLAT,
+            command=self.remove_selected
+        ).pack(side=tk.LEFT, padx=5)
+        
         tk.Button(
             header_buttons,
             text="🗑️ پاک کردن همه",
@@ -395,20 +518,26 @@ class ModernOCRApp:
         images_frame = tk.Frame(main_area, bg='white', relief=tk.FLAT, bd=1)
         images_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
         
-        # کانواس برای نمایش تصاویر
-        self.canvas = tk.Canvas(images_frame, bg='white')
-        scrollbar = ttk.Scrollbar(images_frame, orient="vertical", command=self.canvas.yview)
-        self.scrollable_frame = tk.Frame(self.canvas, bg='white')
-        
-        self.scrollable_frame.bind(
-            "<Configure>",
-            lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all"))
+        # فهرست مجازی تصاویر (Treeview فقط ردیف‌های قابل مشاهده را رسم می‌کند)
+        self.images_tree = ttk.Treeview(
+            images_frame,
+            columns=('folder',),
+            selectmode='extended'
         )
-        
-        self.canvas.create_window((0, 0), window=self.scrollable_frame, anchor="nw")
-        self.canvas.configure(yscrollcommand=scrollbar.set)
-        
-        self.canvas.pack(side="left", fill="both", expand=True)
+        self.images_tree.heading('#0', text="نام فایل", anchor='w')
+        self.images_tree.heading('folder', text="مسیر", anchor='w')
+        self.images_tree.column('#0', width=250, stretch=False)
+        self.images_tree.column('folder', width=400)
+        scrollbar = ttk.Scrollbar(images_frame, orient="vertical", command=self.images_tree.yview)
+        self.images_tree.configure(yscrollcommand=scrollbar.set)
+        
+        # دوبار کلیک: پیش‌نمایش، Delete: حذف ردیف‌های انتخاب‌شده
+        self.images_tree.bind('<Double-1>', self.on_image_double_click)
+        self.images_tree.bind('<Return>', lambda e: self.preview_selected())
+        self.images_tree.bind('<Delete>', lambda e: self.remove_selected())
+        self.images_tree.bind('<<TreeviewSelect>>', self.prefetch_nearby)
+        
+        self.images_tree.pack(side="left", fill="both", expand=True)
         scrollbar.pack(side="right", fill="y")
         
         # فریم نتایج
@@ -455,6 +584,42 @@ class ModernOCRApp:
         )
         self.codes_display.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
+        # تب جستجو در نمایه کدها و متن همه اجراها
+        self.search_tab = tk.Frame(self.notebook, bg='white')
+        self.notebook.add(self.search_tab, text="جستجو")
+        
+        search_bar = tk.Frame(self.search_tab, bg='white')
+        search_bar.pack(fill=tk.X, padx=10, pady=(10, 0))
+        
+        self.search_var = tk.StringVar()
+        search_entry = tk.Entry(
+            search_bar,
+            textvariable=self.search_var,
+            font=self.fonts['mono']
+        )
+        search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        search_entry.bind('<Return>', lambda e: self.search_index())
+        
+        tk.Button(
+            search_bar,
+            text="🔍 جستجو",
+            font=self.fonts['normal'],
+            bg=self.colors['primary'],
+            fg='white',
+            relief=tk.FLAT,
+            command=self.search_index
+        ).pack(side=tk.LEFT, padx=(5, 0))
+        
+        self.search_display = scrolledtext.ScrolledText(
+            self.search_tab,
+            font=self.fonts['mono'],
+            bg='#f8fafc',
+            fg='#334155',
+            wrap=tk.WORD,
+            height=10
+        )
+        self.search_display.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
         # نوار پیشرفت
         self.progress_frame = tk.Frame(main_area, bg='white', relief=tk.FLAT, bd=1)
         self.progress_frame.pack(fill=tk.X, pady=(10, 0))
@@ -504,7 +669,7 @@ class ModernOCRApp:
     def select_images(self):
         """انتخاب چندین تصویر"""
         file_types = [
-            ("تصاویر", "*.png *.jpg *.jpeg *.bmp *.tiff *.webp"),
+            ("تصاویر", "*.png *.jpg *.jpeg *.bmp *.tiff *.tif *.webp *.pdf"),
             ("همه فایل‌ها", "*.*")
         ]
         
@@ -514,90 +679,52 @@ class ModernOCRApp:
         )
         
         if filenames:
-            # اضافه کردن تصاویر جدید
-            for filename in filenames:
-                if filename not in self.image_paths:
-                    self.image_paths.append(filename)
+            # اضافه کردن تصاویر جدید (تکراری‌ها نادیده گرفته می‌شوند)
+            added = self.image_paths.add_many(filenames)
+            self.insert_image_rows(added)
             
-            self.update_images_display()
             self.process_btn.config(state=tk.NORMAL)
             self.update_stats()
             self.status_text.set(f"{len(filenames)} تصویر انتخاب شد")
     
-    def update_images_display(self):
-        """به‌روزرسانی نمایش تصاویر"""
-        # پاک کردن نمایش قبلی
-        for widget in self.scrollable_frame.winfo_children():
-            widget.destroy()
-        
-        # نمایش تصاویر
-        for i, image_path in enumerate(self.image_paths):
-            self.add_image_card(image_path, i)
-    
-    def add_image_card(self, image_path, index):
-        """اضافه کردن کارت تصویر"""
-        card = tk.Frame(self.scrollable_frame, bg='white', relief=tk.GROOVE, bd=1)
-        card.pack(fill=tk.X, padx=5, pady=5)
-        
-        # اطلاعات تصویر
-        info_frame = tk.Frame(card, bg='white')
-        info_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=10, pady=10)
-        
-        # نام فایل
-        filename_label = tk.Label(
-            info_frame,
-            text=os.path.basename(image_path),
-            font=self.fonts['normal'],
-            bg='white',
-            fg=self.colors['dark'],
-            anchor='w'
-        )
-        filename_label.pack(fill=tk.X)
-        
-        # مسیر
-        path_label = tk.Label(
-            info_frame,
-            text=image_path[:50] + "..." if len(image_path) > 50 else image_path,
-            font=('Segoe UI', 8),
-            bg='white',
-            fg='#64748b',
-            anchor='w'
-        )
-        path_label.pack(fill=tk.X)
-        
-        # دکمه حذف
-        delete_btn = tk.Button(
-            card,
-            text="❌",
-            font=('Segoe UI', 10),
-            bg='white',
-            fg=self.colors['danger'],
-            relief=tk.FLAT,
-            bd=0,
-            cursor='hand2',
-            command=lambda p=image_path: self.remove_image(p)
-        )
-        delete_btn.pack(side=tk.RIGHT, padx=10)
-        
-        # دکمه پیش‌نمایش
-        preview_btn = tk.Button(
-            card,
-            text="👁️",
-            font=('Segoe UI', 10),
-            bg='white',
-            fg=self.colors['primary'],
-            relief=tk.FLAT,
-            bd=0,
-            cursor='hand2',
-            command=lambda p=image_path: self.show_preview(p)
-        )
-        preview_btn.pack(side=tk.RIGHT, padx=5)
+    def insert_image_rows(self, items):
+        """افزودن ردیف‌های جدید به انتهای فهرست بدون بازسازی ردیف‌های قبلی"""
+        for item_id, image_path in items:
+            self.images_tree.insert(
+                '', tk.END, iid=item_id,
+                text=os.path.basename(image_path),
+                values=(os.path.dirname(image_path),)
+            )
+    
+    def selected_paths(self):
+        """مسیر ردیف‌های انتخاب‌شده"""
+        return [self.image_paths.path_of(item_id) for item_id in self.images_tree.selection()]
+    
+    def on_image_double_click(self, event):
+        item_id = self.images_tree.identify_row(event.y)
+        if item_id:
+            self.show_preview(self.image_paths.path_of(item_id))
+    
+    def preview_selected(self):
+        """پیش‌نمایش اولین تصویر انتخاب‌شده"""
+        paths = self.selected_paths()
+        if paths:
+            self.show_preview(paths[0])
+    
+    def remove_selected(self):
+        """حذف تصاویر انتخاب‌شده"""
+        self.remove_images(self.selected_paths())
     
     def remove_image(self, image_path):
         """حذف یک تصویر"""
-        if image_path in self.image_paths:
-            self.image_paths.remove(image_path)
-            self.update_images_display()
+        self.remove_images([image_path])
+    
+    def remove_images(self, image_paths):
+        """حذف چند تصویر از مجموعه و فهرست"""
+        item_ids = [self.image_paths.remove(image_path) for image_path in image_paths]
+        item_ids = [item_id for item_id in item_ids if item_id is not None]
+        if item_ids:
+            self.images_tree.delete(*item_ids)
             self.update_stats()
             
             if not self.image_paths:
@@ -608,40 +735,63 @@ class ModernOCRApp:
         if self.image_paths:
             if messagebox.askyesno("تأیید", "آیا از حذف تمام تصاویر مطمئن هستید؟"):
                 self.image_paths.clear()
-                self.update_images_display()
+                self.images_tree.delete(*self.images_tree.get_children())
                 self.process_btn.config(state=tk.DISABLED)
                 self.update_stats()
                 self.status_text.set("همه تصاویر پاک شدند")
     
     def show_preview(self, image_path):
-        """نمایش پیش‌نمایش تصویر"""
+        """نمایش پیش‌نمایش تصویر (بندانگشتی در پس‌زمینه ساخته می‌شود)"""
         preview_window = tk.Toplevel(self.root)
         preview_window.title(f"پیش‌نمایش - {os.path.basename(image_path)}")
         preview_window.geometry("500x500")
         
-        try:
-            img = Image.open(image_path)
-            img.thumbnail((450, 450))
-            
-            photo = ImageTk.PhotoImage(img)
-            
-            label = tk.Label(preview_window, image=photo)
-            label.image = photo
-            label.pack(padx=10, pady=10)
-            
-            info_label = tk.Label(
-                preview_window,
-                text=f"{os.path.basename(image_path)} - {img.size[0]}×{img.size[1]}",
-                font=self.fonts['normal']
-            )
-            info_label.pack(pady=(0, 10))
-            
-        except Exception as e:
-            tk.Label(
-                preview_window,
-                text=f"خطا در نمایش تصویر: {str(e)}",
-                fg='red'
-            ).pack(pady=20)
+        label = tk.Label(preview_window, text="در حال بارگذاری...", font=self.fonts['normal'])
+        label.pack(padx=10, pady=10)
+        
+        def on_thumbnail(path, thumbnail, original_size, error):
+            # PhotoImage فقط در رشته اصلی Tk ساخته می‌شود
+            self.root.after(0, self.fill_preview, preview_window, label, path,
+                            thumbnail, original_size, error)
+        
+        self.open_thumbnails().request(image_path, on_thumbnail)
+    
+    def fill_preview(self, preview_window, label, image_path, thumbnail, original_size, error):
+        """نمایش بندانگشتی آماده در پنجره پیش‌نمایش"""
+        if not preview_window.winfo_exists():
+            return
+        
+        if error is not None:
+            label.config(text=f"خطا در نمایش تصویر: {str(error)}", fg='red')
+            return
+        
+        # ImageTk فقط با اولین پیش‌نمایش بارگذاری می‌شود
+        from PIL import ImageTk
+        photo = ImageTk.PhotoImage(thumbnail)
+        label.config(image=photo, text='')
+        label.image = photo
+        
+        info_label = tk.Label(
+            preview_window,
+            text=f"{os.path.basename(image_path)} - {original_size[0]}×{original_size[1]}",
+            font=self.fonts['normal']
+        )
+        info_label.pack(pady=(0, 10))
+    
+    def prefetch_nearby(self, event=None):
+        """ساخت پیشاپیش بندانگشتی ردیف انتخاب‌شده و ردیف‌های اطراف آن"""
+        item_id = self.images_tree.focus()
+        if not item_id:
+            return
+        
+        item_ids = [item_id]
+        before = after = item_id
+        for _ in range(PREFETCH_ROWS):
+            after = after and self.images_tree.next(after)
+            before = before and self.images_tree.prev(before)
+            item_ids += [i for i in (after, before) if i]
+        
+        self.open_thumbnails().prefetch(self.image_paths.path_of(i) for i in item_ids)
     
     def start_processing(self):
         """شروع پردازش تصاویر"""
@@ -651,15 +801,37 @@ class ModernOCRApp:
         if self.processing:
             return
         
+        from result_sinks import new_summary
+        
         self.processing = True
-        self.current_results = []
+        self.result_summary = new_summary()
+        self.stage_stats = StageStats()
+        self.spool_path = None
+        self.resumed_count = 0
+        self.duplicate_count = 0
         self.process_btn.config(state=tk.DISABLED)
+        
+        # حافظه نهان فقط در صورت فعال بودن گزینه
+        if self.result_cache is not None:
+            self.result_cache.reset_counters()
+        self.batch_processor.cache = self.result_cache if self.cache_var.get() else None
+        # ساخته شدن در رشته اصلی پیش از شروع رشته پردازش
+        self.open_job_journal()
+        self.open_code_index()
         self.stop_btn.config(state=tk.NORMAL)
         
         # پاک کردن نتایج قبلی
         self.text_display.delete(1.0, tk.END)
         self.codes_display.delete(1.0, tk.END)
         
+        # فهرست ثابت تصاویر این اجرا (فهرست اصلی در حین پردازش قابل تغییر است)؛
+        # هر صفحه فایل‌های چندصفحه‌ای یک مورد جداست
+        self.batch_paths = list(expand_pages(self.image_paths.paths()))
+        
+        # رویدادهای این اجرا با نرخ ثابت روی رابط اعمال می‌شوند
+        self.ui_events = queue.Queue()
+        self.root.after(UI_UPDATE_INTERVAL, self.flush_ui_events, self.ui_events, len(self.batch_paths))
+        
         # اجرای پردازش در thread جداگانه
         thread = threading.Thread(target=self.process_batch)
         thread.daemon = True
@@ -667,32 +839,114 @@ class ModernOCRApp:
     
     def process_batch(self):
         """پردازش دسته‌ای تصاویر"""
-        total = len(self.image_paths)
+        image_paths = self.batch_paths
+        
+        try:
+            workers = max(1, int(self.workers_var.get()))
+        except (tk.TclError, ValueError):
+            workers = 1
         
         # تنظیمات پردازش
         config = {
             'enhance_contrast': self.enhance_var.get(),
             'denoise': self.denoise_var.get(),
-            'binary': self.binary_var.get()
+            'binary': self.binary_var.get(),
+            'threshold_method': self.threshold_var.get(),
+            'normalize': self.normalize_var.get(),
+            'skip_blank': self.skip_blank_var.get(),
+            'cascade': self.cascade_var.get(),
+            'dedup': self.dedup_var.get(),
+            'tile': True,
+            # رشته‌های کاشی هر فرایند کارگر سهمی از هسته‌ها هستند
+            'tile_workers': max(1, (os.cpu_count() or 1) // workers),
+            'time_limit': IMAGE_TIME_LIMIT,
+            'engine': self.engine_var.get(),
+            'engine_batch_size': 1 if self.engine_var.get() == 'pytesseract' else 16
         }
         
-        for i, image_path in enumerate(self.image_paths):
-            if not self.processing:
-                break
-            
-            # به‌روزرسانی پیشرفت
-            progress = (i + 1) / total * 100
-            self.root.after(0, self.update_progress, progress, f"پردازش {i+1} از {total}")
+        from result_sinks import new_spool
+        
+        events = self.ui_events
+        
+        # نتایج به جای حافظه در فایل JSONL اجرا نوشته می‌شوند
+        try:
+            sink = new_spool()
+        except OSError as e:
+            self.root.after(0, messagebox.showerror, "خطا", f"خطا در ایجاد فایل نتایج: {str(e)}")
+            events.put(None)
+            return
+        
+        def on_result(index, result):
+            sink.write(result, index)
+            if self.code_index is not None and not result.get('resumed'):
+                self.code_index.add(result)
             
-            # پردازش تصویر
-            result = self.batch_processor.process_image(image_path, config)
-            self.current_results.append(result)
+            # نمایش در نوبت بعدی به‌روزرسانی رابط
+            events.put(result)
+        
+        try:
+            if not self.processing:
+                # توقف پیش از آغاز دسته (پس از آن cancel پردازشگر را متوقف می‌کند)
+                return
+            if self.job_journal is not None:
+                # تصاویر انجام‌شده در اجرای متوقف‌شده قبلی دوباره پردازش نمی‌شوند
+                self.batch_processor.resume_batch(
+                    image_paths, config, self.job_journal, workers, on_result,
+                    collect=False, restart=not self.resume_var.get()
+                )
+            else:
+                self.batch_processor.process_batch(
+                    image_paths, config, workers, on_result, collect=False
+                )
+        finally:
+            sink.close()
+            self.spool_path = sink.file.name
             
-            # نمایش نتایج
-            self.root.after(0, self.display_result, result)
+            # اتمام پردازش
+            events.put(None)
+    
+    def flush_ui_events(self, events, total):
+        """اعمال رویدادهای جمع‌شده با یک درج برای هر نمایشگر
         
-        # اتمام پردازش
-        self.root.after(0, self.processing_complete)
+        هر UI_UPDATE_INTERVAL میلی‌ثانیه یک بار اجرا می‌شود؛ پس نرخ
+        به‌روزرسانی رابط به سرعت رسیدن نتایج بستگی ندارد.
+        """
+        from result_sinks import update_summary
+        
+        text_parts = []
+        code_parts = []
+        finished = False
+        
+        while True:
+            try:
+                result = events.get_nowait()
+            except queue.Empty:
+                break
+            if result is None:
+                finished = True
+                break
+            update_summary(self.result_summary, result)
+            if result.get('duplicate_of'):
+                self.duplicate_count += 1
+            if result.get('resumed'):
+                self.resumed_count += 1
+            else:
+                self.stage_stats.add(result.get('timings'))
+            self.format_result(result, text_parts, code_parts)
+        
+        if text_parts:
+            self.text_display.insert(tk.END, ''.join(text_parts))
+        if code_parts:
+            self.codes_display.insert(tk.END, ''.join(code_parts))
+        
+        done = self.result_summary['total_images']
+        self.update_progress(done / total * 100 if total else 0, f"پردازش {done} از {total}")
+        self.update_stats()
+        
+        if not finished:
+            self.root.after(UI_UPDATE_INTERVAL, self.flush_ui_events, events, total)
+        elif events is self.ui_events:
+            self.processing_complete()
     
     def update_progress(self, value, message):
         """به‌روزرسانی نوار پیشرفت"""
@@ -700,22 +954,24 @@ class ModernOCRApp:
         self.progress_label.config(text=message)
         self.status_text.set(message)
     
-    def display_result(self, result):
-        """نمایش نتیجه یک تصویر"""
-        if result['success']:
+    def format_result(self, result, text_parts, code_parts):
+        """افزودن متن نمایشی یک نتیجه به بخش‌های متن و کدها"""
+        if result.get('skipped'):
+            reason = "صفحه خالی" if result['skipped'] == 'blank' else "بدون متن"
+            text_parts.append(f"\n⏭ {display_name(result)} رد شد ({reason})\n")
+        elif result['success']:
             # نمایش متن
-            self.text_display.insert(tk.END, f"\n{'='*50}\n")
-            self.text_display.insert(tk.END, f"📄 {result['filename']}\n")
-            self.text_display.insert(tk.END, f"{'='*50}\n")
-            self.text_display.insert(tk.END, f"{result['cleaned_text']}\n")
+            title = display_name(result)
+            if result.get('duplicate_of'):
+                title += f" (تکراری {os.path.basename(result['duplicate_of'])})"
+            text_parts.append(f"\n{'='*50}\n📄 {title}\n{'='*50}\n{result['cleaned_text']}\n")
             
             # نمایش کدها
             if self.extract_codes_var.get() and result['codes']:
-                self.codes_display.insert(tk.END, f"\n📌 {result['filename']}\n")
-                for code in result['codes']:
-                    self.codes_display.insert(tk.END, f"  • {code}\n")
+                code_parts.append(f"\n📌 {display_name(result)}\n")
+                code_parts.extend(f"  • {code}\n" for code in result['codes'])
         else:
-            self.text_display.insert(tk.END, f"\n❌ خطا در پردازش {result['filename']}: {result['error']}\n")
+            text_parts.append(f"\n❌ خطا در پردازش {display_name(result)}: {result['error']}\n")
     
     def processing_complete(self):
         """اتمام پردازش"""
@@ -724,17 +980,45 @@ class ModernOCRApp:
         self.stop_btn.config(state=tk.DISABLED)
         self.progress_var.set(0)
         
-        # محاسبه آمار
-        total_codes = sum(r.get('code_count', 0) for r in self.current_results if r['success'])
-        total_words = sum(r.get('word_count', 0) for r in self.current_results if r['success'])
+        summary = self.result_summary
+        if self.spool_path is None:
+            return
         
-        self.status_text.set(f"پردازش کامل شد - {len(self.current_results)} تصویر")
+        # آمار تجمعی نتایج
+        total_images = summary['total_images']
+        total_codes = summary['total_codes']
+        total_words = summary['total_words']
+        total_skipped = summary['skipped_images']
+        
+        self.status_text.set(f"پردازش کامل شد - {total_images} تصویر")
+        
+        # جدول زمان مراحل در پایان متن نتایج
+        if self.stage_stats.durations:
+            self.text_display.insert(
+                tk.END, f"\n{'='*50}\n⏱ زمان مراحل (ms)\n{self.stage_stats.table()}\n"
+            )
+        if self.batch_processor.pipeline_stats is not None:
+            self.text_display.insert(
+                tk.END, f"\n⏱ خط لوله پردازش\n{self.batch_processor.pipeline_stats.table()}\n"
+            )
+        
+        cache_text = ""
+        if self.batch_processor.cache is not None:
+            self.batch_processor.cache.flush()
+            stats = self.batch_processor.cache.stats()
+            cache_text = f"• حافظه نهان: {stats['hits']} موفق، {stats['misses']} ناموفق\n"
+        if self.resumed_count:
+            cache_text += f"• ادامه از اجرای قبلی: {self.resumed_count} تصویر\n"
+        if self.duplicate_count:
+            cache_text += f"• تصاویر تکراری بدون OCR: {self.duplicate_count}\n"
         
         messagebox.showinfo(
             "اتمام پردازش",
-            f"✅ پردازش {len(self.current_results)} تصویر کامل شد!\n\n"
+            f"✅ پردازش {total_images} تصویر کامل شد!\n\n"
             f"• تعداد کل کدها: {total_codes}\n"
             f"• تعداد کل کلمات: {total_words}\n"
+            f"• صفحات خالی ردشده: {total_skipped}\n"
+            f"{cache_text}"
             f"• نتایج در تب‌های مربوطه نمایش داده شدند."
         )
         
@@ -743,18 +1027,55 @@ class ModernOCRApp:
     def stop_processing(self):
         """توقف پردازش"""
         self.processing = False
+        # اجرای در حال انجام موتور هم کشته می‌شود
+        self.batch_processor.cancel()
         self.process_btn.config(state=tk.NORMAL)
         self.stop_btn.config(state=tk.DISABLED)
         self.status_text.set("پردازش متوقف شد")
     
+    def clear_cache(self):
+        """پاک کردن حافظه نهان نتایج"""
+        if self.result_cache is None:
+            messagebox.showwarning("هشدار", "حافظه نهان در دسترس نیست")
+            return
+        
+        if messagebox.askyesno("تأیید", "آیا از پاک کردن حافظه نهان نتایج مطمئن هستید؟"):
+            self.result_cache.invalidate()
+            self.status_text.set("حافظه نهان پاک شد")
+    
+    def search_index(self):
+        """جستجوی کد (دقیق یا پیشوند) و کلمات متن در نمایه همه اجراها"""
+        query = self.search_var.get().strip()
+        if not query:
+            return
+        if self.open_code_index() is None:
+            messagebox.showwarning("هشدار", "نمایه کدها در دسترس نیست")
+            return
+        from code_index import format_location
+        
+        # نتایج معوق نویسنده پس‌زمینه هم در جستجو دیده شوند؛ انتظار محدود است
+        if not self.code_index.flush():
+            self.status_text.set("نمایه هنوز در حال ثبت است؛ نتایج جستجو ممکن است کامل نباشند")
+        codes = self.code_index.lookup(query, prefix=True)
+        phrase = '"' + query.replace('"', '""') + '"'
+        texts = self.code_index.search_text(phrase)
+        
+        lines = [f"کدها ({len(codes)}):"]
+        lines += [f"  {row['code']} [{row['category']}] - {format_location(row)}" for row in codes]
+        lines.append(f"\nمتن ({len(texts)}):")
+        lines += [f"  {format_location(row)}: {row['snippet']}" for row in texts]
+        
+        self.search_display.delete(1.0, tk.END)
+        self.search_display.insert(tk.END, '\n'.join(lines) + '\n')
+    
     def update_stats(self):
         """به‌روزرسانی آمار"""
         image_count = len(self.image_paths)
         self.count_label.config(text=f"تصاویر: {image_count}")
         
-        if self.current_results:
-            total_codes = sum(r.get('code_count', 0) for r in self.current_results if r['success'])
-            total_words = sum(r.get('word_count', 0) for r in self.current_results if r['success'])
+        if self.result_summary and self.result_summary['total_images']:
+            total_codes = self.result_summary['total_codes']
+            total_words = self.result_summary['total_words']
             
             stats_text = f"تصاویر: {image_count}\nکدها: {total_codes}\nمتن: {total_words} کلمه"
         else:
@@ -764,16 +1085,18 @@ class ModernOCRApp:
     
     def copy_all_results(self):
         """کپی تمام نتایج به کلیپ‌بورد"""
-        if not self.current_results:
+        if not self.spool_path:
             messagebox.showwarning("هشدار", "نتیجه‌ای برای کپی کردن وجود ندارد")
             return
         
+        from result_sinks import read_results
+        
         all_text = ""
         
-        for result in self.current_results:
+        for result in read_results(self.spool_path):
             if result['success']:
                 all_text += f"\n{'='*50}\n"
-                all_text += f"📄 {result['filename']}\n"
+                all_text += f"📄 {display_name(result)}\n"
                 all_text += f"{'='*50}\n"
                 all_text += f"{result['cleaned_text']}\n\n"
                 
@@ -791,7 +1114,7 @@ class ModernOCRApp:
     
     def save_all_results(self):
         """ذخیره تمام نتایج در فایل"""
-        if not self.current_results:
+        if not self.spool_path:
             messagebox.showwarning("هشدار", "نتیجه‌ای برای ذخیره وجود ندارد")
             return
         
@@ -800,6 +1123,7 @@ class ModernOCRApp:
             filetypes=[
                 ("فایل متنی", "*.txt"),
                 ("فایل JSON", "*.json"),
+                ("فایل JSON Lines", "*.jsonl"),
                 ("فایل CSV", "*.csv"),
                 ("همه فایل‌ها", "*.*")
             ]
@@ -807,95 +1131,19 @@ class ModernOCRApp:
         
         if filename:
             try:
-                ext = os.path.splitext(filename)[1].lower()
-                
-                if ext == '.json':
-                    self.save_as_json(filename)
-                elif ext == '.csv':
-                    self.save_as_csv(filename)
-                else:
-                    self.save_as_txt(filename)
+                # تبدیل جریانی فایل نتایج اجرا به قالب انتخاب‌شده
+                from result_sinks import export_results
+                export_results(self.spool_path, filename)
                 
                 self.status_text.set(f"نتایج در {filename} ذخیره شد")
                 messagebox.showinfo("موفق", f"نتایج در {filename} ذخیره شد")
                 
             except Exception as e:
                 messagebox.showerror("خطا", f"خطا در ذخیره فایل: {str(e)}")
-    
-    def save_as_txt(self, filename):
-        """ذخیره به صورت TXT"""
-        with open(filename, 'w', encoding='utf-8') as f:
-            f.write("="*60 + "\n")
-            f.write("نتایج استخراج متن و کد از تصاویر\n")
-            f.write(f"تاریخ تولید: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write(f"تعداد تصاویر: {len(self.current_results)}\n")
-            f.write("="*60 + "\n\n")
-            
-            for result in self.current_results:
-                if result['success']:
-                    f.write(f"{'='*50}\n")
-                    f.write(f"فایل: {result['filename']}\n")
-                    f.write(f"{'='*50}\n\n")
-                    
-                    f.write("📝 متن استخراج شده:\n")
-                    f.write(result['cleaned_text'])
-                    f.write("\n\n")
-                    
-                    if result['codes']:
-                        f.write("🔢 کدهای استخراج شده:\n")
-                        for code in result['codes']:
-                            f.write(f"  • {code}\n")
-                        f.write("\n")
-                    
-                    f.write("📊 آمار:\n")
-                    f.write(f"  • تعداد کلمات: {result['word_count']}\n")
-                    f.write(f"  • تعداد کاراکترها: {result['char_count']}\n")
-                    f.write(f"  • تعداد کدها: {result['code_count']}\n")
-                    f.write("\n" + "="*60 + "\n\n")
-    
-    def save_as_json(self, filename):
-        """ذخیره به صورت JSON"""
-        output_data = {
-            'metadata': {
-                'generated_at': datetime.now().isoformat(),
-                'total_images': len(self.current_results),
-                'processed_images': sum(1 for r in self.current_results if r['success']),
-                'total_codes': sum(r.get('code_count', 0) for r in self.current_results if r['success']),
-                'total_words': sum(r.get('word_count', 0) for r in self.current_results if r['success'])
-            },
-            'results': self.current_results
-        }
-        
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(output_data, f, ensure_ascii=False, indent=2, default=str)
-    
-    def save_as_csv(self, filename):
-        """ذخیره به صورت CSV"""
-        import csv
-        
-        with open(filename, 'w', encoding='utf-8-sig', newline='') as f:
-            writer = csv.writer(f)
-            
-            # هدر
-            writer.writerow(['نام فایل', 'تعداد کلمات', 'تعداد کاراکترها', 'تعداد کدها', 'کدها', 'متن'])
-            
-            # داده‌ها
-            for result in self.current_results:
-                if result['success']:
-                    codes_str = '; '.join(result['codes'])
-                    text_preview = result['cleaned_text'][:100] + "..." if len(result['cleaned_text']) > 100 else result['cleaned_text']
-                    
-                    writer.writerow([
-                        result['filename'],
-                        result['word_count'],
-                        result['char_count'],
-                        result['code_count'],
-                        codes_str,
-                        text_preview
-                    ])
 
 def main():
     """تابع اصلی"""
+    allow_large_images()
     root = tk.Tk()
     
     # تنظیم آیکن
@@ -0,0 +1,175 @@
+"""باز کردن تک‌تک صفحات فایل‌های چندصفحه‌ای (TIFF و PDF)
+
+هر صفحه یک مرجع رشته‌ای «مسیر#page=شماره» دارد تا مثل مسیر یک تصویر
+عادی در صف، فرایندهای کارگر و حافظه نهان جابه‌جا شود. شمارش صفحات فقط
+سرآیند صفحه‌ها را می‌خواند و هر صفحه هنگام پردازش جداگانه رمزگشایی
+می‌شود؛ پس حافظه مصرفی به اندازه یک صفحه محدود است. هر رشته فایل
+چندصفحه‌ای که صفحه‌هایش را می‌خواند باز نگه می‌دارد تا صفحه‌های پشت سر
+هم یک TIFF یا PDF با یک بار باز کردن خوانده شوند. خواندن PDF به
+کتابخانه اختیاری pypdfium2 نیاز دارد.
+"""
+import os
+import threading
+
+from PIL import Image
+
+PAGE_MARKER = '#page='
+MULTIPAGE_EXTENSIONS = ('.tif', '.tiff', '.pdf')
+PDF_RENDER_DPI = 300
+
+# نقشه‌ها و پانوراماهای بزرگ (با OCR کاشی‌کاری‌شده) پس از allow_large_images
+# تا این اندازه بدون خطای بمب فشرده‌سازی PIL باز می‌شوند
+MAX_IMAGE_PIXELS = 400_000_000
+
+# صفحه TIFF بزرگ‌تر از این (پیکسل) از فایل باز رشته کپی نمی‌شود و با شیء
+# تازه و رمزگشایی تنبل (مثلاً خواندن نواری tiling) برگردانده می‌شود
+PAGE_COPY_MAX_PIXELS = 50_000_000
+
+# فایل چندصفحه‌ای باز هر رشته: key (مسیر، اندازه، زمان تغییر) و handle
+_open_file = threading.local()
+
+
+def allow_large_images(limit=MAX_IMAGE_PIXELS):
+    """بالا بردن حد بمب فشرده‌سازی PIL در این فرایند تا limit پیکسل
+
+    فقط برنامه‌هایی که فایل‌های خود کاربر را می‌خوانند (خط فرمان و رابط
+    گرافیکی) آن را فراخوانی می‌کنند؛ سرویس HTTP که تصاویر ارسالی دیگران را
+    رمزگشایی می‌کند حد پیش‌فرض PIL را نگه می‌دارد مگر با --max-image-pixels.
+    """
+    if Image.MAX_IMAGE_PIXELS and Image.MAX_IMAGE_PIXELS < limit:
+        Image.MAX_IMAGE_PIXELS = limit
+
+
+def page_ref(path, page):
+    """مرجع صفحه page (از ۱) در فایل path"""
+    return f"{path}{PAGE_MARKER}{page}"
+
+
+def split_page(ref):
+    """(مسیر فایل، شماره صفحه از ۱ یا None)"""
+    path, marker, page = ref.rpartition(PAGE_MARKER)
+    if marker and page.isdigit():
+        return path, int(page)
+    return ref, None
+
+
+def is_pdf(path):
+    return path.lower().endswith('.pdf')
+
+
+def open_pdf(path):
+    # فقط با اولین PDF بارگذاری می‌شود
+    try:
+        import pypdfium2 as pdfium
+    except ImportError:
+        raise RuntimeError("برای خواندن PDF کتابخانه pypdfium2 لازم است")
+    return pdfium.PdfDocument(path)
+
+
+def page_count(path):
+    """تعداد صفحات فایل بدون رمزگشایی تصویر صفحه‌ها"""
+    if is_pdf(path):
+        pdf = open_pdf(path)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+    with Image.open(path) as img:
+        return getattr(img, 'n_frames', 1)
+
+
+def expand_pages(paths):
+    """مرجع هر صفحه فایل‌های چندصفحه‌ای؛ بقیه مسیرها بدون تغییر (generator)"""
+    for path in paths:
+        if not path.lower().endswith(MULTIPAGE_EXTENSIONS):
+            yield path
+            continue
+        try:
+            count = page_count(path)
+        except Exception:
+            # خطای باز کردن فایل هنگام پردازش گزارش می‌شود
+            yield path
+            continue
+        if count == 1 and not is_pdf(path):
+            yield path
+            continue
+        for page in range(1, count + 1):
+            yield page_ref(path, page)
+
+
+def render_pdf_page(path, page, dpi=PDF_RENDER_DPI):
+    """رسم یک صفحه PDF به تصویر خاکستری"""
+    pdf = open_pdf(path)
+    try:
+        return pdf[page - 1].render(scale=dpi / 72, grayscale=True).to_pil()
+    finally:
+        pdf.close()
+
+
+def open_file(path):
+    """شیء باز فایل چندصفحه‌ای path در این رشته؛ فایل قبلی رشته بسته می‌شود
+
+    پس از تغییر اندازه یا زمان تغییر فایل دوباره باز می‌شود.
+    """
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if getattr(_open_file, 'key', None) != key:
+        close_file()
+        _open_file.handle = open_pdf(path) if is_pdf(path) else Image.open(path)
+        _open_file.key = key
+    return _open_file.handle
+
+
+def close_file():
+    """بستن فایل چندصفحه‌ای باز این رشته (مثلاً تا فایل در ویندوز قفل نماند)"""
+    handle = getattr(_open_file, 'handle', None)
+    _open_file.key = _open_file.handle = None
+    if handle is not None:
+        handle.close()
+
+
+def open_page(ref):
+    """باز کردن تصویر یا یک صفحه از فایل چندصفحه‌ای (رمزگشایی تنبل)
+
+    صفحه فایل چندصفحه‌ای از شیء باز رشته (open_file) خوانده می‌شود؛ Pillow
+    مکان قاب‌های دیده‌شده را نگه می‌دارد، پس seek به صفحه بعدی فقط از قاب
+    فعلی جلو می‌رود و خواندن همه صفحه‌های یک TIFF خطی است نه مربعی.
+    """
+    path, page = split_page(ref)
+    if page is None:
+        if is_pdf(path):
+            return render_pdf_page(path, 1)
+        # باز کردن با مسیر (نه شیء فایل) تا Pillow بتواند نوارهای فشرده‌نشده را mmap کند
+        return Image.open(path)
+    try:
+        source = open_file(path)
+        if is_pdf(path):
+            return source[page - 1].render(scale=PDF_RENDER_DPI / 72, grayscale=True).to_pil()
+        source.seek(page - 1)
+        if source.width * source.height > PAGE_COPY_MAX_PIXELS:
+            img = Image.open(path)
+            img.seek(page - 1)
+            return img
+        # شیء باز برای صفحه بعدی می‌ماند؛ فراخواننده کپی مستقل صفحه را می‌گیرد
+        source.load()
+        return source.copy()
+    except Exception:
+        # شیء باز پس از خطای خواندن قابل اعتماد نیست
+        close_file()
+        raise
+
+
+def source_fields(ref):
+    """فیلدهای منبع نتیجه: نام فایل، مسیر و در صورت وجود شماره صفحه"""
+    path, page = split_page(ref)
+    fields = {'filename': os.path.basename(path), 'path': path}
+    if page:
+        fields['page'] = page
+    return fields
+
+
+def display_name(result):
+    """نام نمایشی نتیجه همراه با شماره صفحه"""
+    if result.get('page'):
+        return f"{result['filename']} (صفحه {result['page']})"
+    return result['filename']
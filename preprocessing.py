@@ -0,0 +1,464 @@
+"""پیش‌پردازش تصویر پیش از OCR با کمترین تعداد کپی
+
+بهبود کنتراست یک تابع نقطه‌ای یکنوا است و با فیلتر میانه جابه‌جا می‌شود؛
+پس ابتدا میانگین روشنایی (برای کنتراست) حساب می‌شود، سپس فیلتر میانه
+(با شبکه مرتب‌سازی NumPy، نوار به نوار) اجرا می‌شود و در پایان کنتراست و
+آستانه‌گذاری در یک جدول تبدیل (LUT) واحد و با یک گذر روی تصویر اعمال
+می‌شوند. خروجی روش fixed دقیقاً همان خروجی زنجیره قبلی PIL است.
+
+با config['normalize'] پیش از همه مراحل اندازه تصویر طوری تغییر می‌کند
+که ارتفاع خطوط متن به حدود config['target_text_height'] پیکسل برسد
+(در نبود خط قابل تشخیص، از DPI فایل استفاده می‌شود). تصاویر JPEG در این
+حالت مستقیماً در مقیاس کوچک‌تر رمزگشایی می‌شوند (draft).
+
+روش‌های آستانه‌گذاری:
+    fixed    آستانه ثابت config['threshold'] (پیش‌فرض ۱۸۰)
+    otsu     آستانه سراسری Otsu از روی هیستوگرام
+    sauvola  آستانه محلی Sauvola با تصاویر انتگرالی، نوار به نوار
+"""
+import time
+
+import numpy as np
+from PIL import Image, ImageFilter
+
+CONTRAST_FACTOR = 2.0
+FIXED_THRESHOLD = 180
+THRESHOLD_METHODS = ('fixed', 'otsu', 'sauvola')
+DEFAULT_THRESHOLD_METHOD = 'fixed'
+
+SAUVOLA_WINDOW = 25
+SAUVOLA_K = 0.2
+SAUVOLA_R = 128.0
+
+# تعداد ردیف‌های هر نوار (محدود کردن حافظه آرایه‌های میانی)
+STRIP_ROWS = 128
+
+IDENTITY_LUT = list(range(256))
+
+# نرمال‌سازی وضوح
+TARGET_TEXT_HEIGHT = 32
+TARGET_DPI = 300
+MIN_SCALE = 0.25
+MAX_SCALE = 1.0
+
+# بزرگ‌ترین ضلع نسخه کوچکی که ارتفاع متن روی آن تخمین زده می‌شود
+ESTIMATE_MAX_SIDE = 2048
+
+# خطوط کوتاه‌تر از این (در نسخه کوچک) قابل تفکیک نیستند
+MIN_RESOLVABLE_HEIGHT = 4
+
+# تشخیص صفحه خالی: اندازه نسخه کوچک، اختلاف روشنایی جوهر با زمینه محلی،
+# کمترین نسبت پیکسل‌های جوهر برای وجود متن و بیشترین سهم جوهر توپر
+# (خطوط متن در نسخه کوچک نازک‌اند؛ عکس و لکه توپر است)
+PAGE_SAMPLE_SIDE = 1024
+BLANK_CONTRAST = 40
+BLANK_THRESHOLD = 0.00005
+MAX_SOLID_INK = 0.5
+
+
+class StageTimer:
+    """جمع زمان هر مرحله در دیکشنری timings
+
+    اگر فهرست spans داده شود، هر مرحله به صورت (نام، شروع به میکروثانیه از
+    epoch، مدت به میکروثانیه) هم ثبت می‌شود تا در خط زمانی trace نمایش داده
+    شود.
+    """
+
+    def __init__(self, timings=None, spans=None):
+        self.timings = timings
+        self.spans = spans
+        self.last = time.perf_counter()
+        self.offset = time.time() - self.last
+
+    def __call__(self, stage):
+        now = time.perf_counter()
+        if self.timings is not None:
+            self.timings[stage] = self.timings.get(stage, 0.0) + now - self.last
+        if self.spans is not None:
+            self.spans.append((stage, (self.last + self.offset) * 1e6, (now - self.last) * 1e6))
+        self.last = now
+
+    def restart(self):
+        """شروع مرحله بعد از همین لحظه (زمان سپری‌شده ثبت نمی‌شود)"""
+        self.last = time.perf_counter()
+
+
+def histogram_mean(hist):
+    """میانگین روشنایی از هیستوگرام (مانند ImageStat)"""
+    total = sum(hist)
+    if not total:
+        return 0
+    return sum(i * h for i, h in enumerate(hist)) / total
+
+
+def contrast_lut(mean, factor=CONTRAST_FACTOR):
+    """جدول تبدیل معادل ImageEnhance.Contrast (Image.blend با بریدن اعشار)"""
+    lut = []
+    for v in range(256):
+        value = mean + factor * (v - mean)
+        lut.append(0 if value <= 0 else 255 if value >= 255 else int(value))
+    return lut
+
+
+def otsu_threshold(hist):
+    """آستانه Otsu؛ پیکسل‌های کمتر از آن سیاه می‌شوند"""
+    hist = np.asarray(hist, dtype=np.float64)
+    total = hist.sum()
+    if not total:
+        return FIXED_THRESHOLD
+
+    levels = np.arange(256, dtype=np.float64)
+    weight0 = np.cumsum(hist)
+    weight1 = total - weight0
+    sum0 = np.cumsum(hist * levels)
+    mean0 = np.divide(sum0, weight0, out=np.zeros(256), where=weight0 > 0)
+    mean1 = np.divide(sum0[-1] - sum0, weight1, out=np.zeros(256), where=weight1 > 0)
+    between = weight0 * weight1 * (mean0 - mean1) ** 2
+
+    # کلاس سیاه شامل سطح k است، پس آستانه k + 1
+    return int(np.argmax(between)) + 1
+
+
+def _median_plan():
+    """شبکه مرتب‌سازی میانه ۹ تایی (Paeth) بدون عملیات‌های بی‌اثر"""
+    network = (
+        (1, 2), (4, 5), (7, 8), (0, 1), (3, 4), (6, 7), (1, 2), (4, 5), (7, 8),
+        (0, 3), (5, 8), (4, 7), (3, 6), (1, 4), (2, 5), (4, 7), (4, 2), (6, 4), (4, 2),
+    )
+    live = {4}
+    plan = []
+    for low, high in reversed(network):
+        need_low = low in live
+        need_high = high in live
+        if need_low or need_high:
+            plan.append((low, high, need_low, need_high))
+            live |= {low, high}
+    plan.reverse()
+    return tuple(plan)
+
+
+MEDIAN_PLAN = _median_plan()
+
+
+def median3(img, strip_rows=STRIP_ROWS * 4):
+    """فیلتر میانه ۳×۳ روی تصویر L، هم‌خروجی با ImageFilter.MedianFilter(3)
+
+    لبه‌ها مانند PIL با تکرار پیکسل مرزی گسترش می‌یابند و کار نوار به نوار
+    انجام می‌شود تا آرایه‌های میانی کوچک بمانند.
+    """
+    pixels = np.asarray(img, dtype=np.uint8)
+    height, width = pixels.shape
+    out = np.empty((height, width), dtype=np.uint8)
+
+    for r0 in range(0, height, strip_rows):
+        r1 = min(height, r0 + strip_rows)
+        rows = r1 - r0
+        top = pixels[max(0, r0 - 1):r0] if r0 else pixels[0:1]
+        bottom = pixels[r1:r1 + 1] if r1 < height else pixels[height - 1:height]
+        band = np.concatenate((top, pixels[r0:r1], bottom))
+        band = np.pad(band, ((0, 0), (1, 1)), mode='edge')
+
+        values = [band[dy:dy + rows, dx:dx + width] for dy in range(3) for dx in range(3)]
+        for low, high, need_low, need_high in MEDIAN_PLAN:
+            a, b = values[low], values[high]
+            values[low] = np.minimum(a, b) if need_low else None
+            values[high] = np.maximum(a, b) if need_high else None
+        out[r0:r1] = values[4]
+
+    return Image.fromarray(out)
+
+
+def _box_mean(values, y0, y1, x0, x1, area):
+    """میانگین پنجره‌ای با جمع تجمعی جدا در دو محور"""
+    height, width = values.shape
+    cumulative = np.zeros((height + 1, width), dtype=np.int64)
+    np.cumsum(values, axis=0, out=cumulative[1:])
+    vertical = cumulative[y1] - cumulative[y0]
+
+    cumulative = np.zeros((vertical.shape[0], width + 1), dtype=np.int64)
+    np.cumsum(vertical, axis=1, out=cumulative[:, 1:])
+    return (cumulative.take(x1, axis=1) - cumulative.take(x0, axis=1)) / area
+
+
+def sauvola_binarize(img, window=SAUVOLA_WINDOW, k=SAUVOLA_K, r=SAUVOLA_R,
+                     strip_rows=STRIP_ROWS):
+    """باینری کردن محلی Sauvola روی تصویر L
+
+    آستانه هر پیکسل m * (1 + k * (s / r - 1)) است که m و s میانگین و
+    انحراف معیار پنجره اطراف آن (بریده‌شده در لبه‌ها) هستند. جمع‌های
+    تجمعی با اعداد صحیح و فقط برای یک نوار به همراه حاشیه نیم‌پنجره
+    ساخته می‌شوند.
+    """
+    pixels = np.asarray(img, dtype=np.uint8)
+    height, width = pixels.shape
+    half = max(1, int(window)) // 2
+    out = np.empty((height, width), dtype=bool)
+
+    cols = np.arange(width)
+    x0 = np.clip(cols - half, 0, width)
+    x1 = np.clip(cols + half + 1, 0, width)
+
+    for r0 in range(0, height, strip_rows):
+        r1 = min(height, r0 + strip_rows)
+        b0 = max(0, r0 - half)
+        b1 = min(height, r1 + half + 1)
+
+        rows = np.arange(r0, r1) - b0
+        y0 = np.clip(rows - half, 0, b1 - b0)
+        y1 = np.clip(rows + half + 1, 0, b1 - b0)
+        area = ((y1 - y0)[:, None] * (x1 - x0)[None, :]).astype(np.float64)
+
+        band = pixels[b0:b1].astype(np.int64)
+        mean = _box_mean(band, y0, y1, x0, x1, area)
+        band *= band
+        variance = _box_mean(band, y0, y1, x0, x1, area) - mean * mean
+        del band
+        np.maximum(variance, 0, out=variance)
+        threshold = mean * (1 + k * (np.sqrt(variance) / r - 1))
+
+        # مانند آستانه ثابت: کمتر از آستانه سیاه، بقیه سفید
+        np.greater_equal(pixels[r0:r1], threshold, out=out[r0:r1])
+
+    return Image.fromarray(out)
+
+
+def estimate_text_height(img):
+    """تخمین ارتفاع خطوط متن (پیکسل) از نیم‌رخ افقی جوهر
+
+    خطوط نزدیک به هم در نسخه کوچک ممکن است یکی شوند و ارتفاع را بیشتر
+    نشان دهند؛ کوچک کردن بیش از حد به دقت OCR آسیب می‌زند، پس به جای میانه
+    صدک ۲۵ ارتفاع‌ها برگردانده می‌شود. اگر دست‌کم سه خط قابل تفکیک پیدا
+    نشود None برمی‌گرداند.
+    """
+    if img.mode != 'L':
+        img = img.convert('L')
+
+    ink = np.asarray(img) < otsu_threshold(img.histogram())
+    if ink.mean() > 0.5:
+        # متن روشن روی زمینه تیره
+        ink = ~ink
+
+    profile = ink.mean(axis=1)
+    peak = np.percentile(profile, 95)
+    if peak <= 0:
+        return None
+
+    active = profile > max(0.005, 0.15 * peak)
+    edges = np.diff(np.concatenate(([0], active.astype(np.int8), [0])))
+    heights = np.flatnonzero(edges == -1) - np.flatnonzero(edges == 1)
+    heights = heights[heights >= 2]
+    if len(heights) < 3:
+        return None
+
+    text_height = float(np.percentile(heights, 25))
+    if text_height < MIN_RESOLVABLE_HEIGHT:
+        return None
+    return text_height
+
+
+def resolution_scale(img, config, text_height=None):
+    """ضریب تغییر اندازه برای رسیدن به ارتفاع متن یا DPI هدف"""
+    if text_height:
+        scale = config.get('target_text_height', TARGET_TEXT_HEIGHT) / text_height
+    else:
+        dpi = img.info.get('dpi') or (0, 0)
+        # DPI کمتر از ۱۰۰ (مثلاً ۷۲ در عکس‌های گوشی) معمولاً بی‌معنی است
+        if not dpi[0] or dpi[0] < 100:
+            return 1.0
+        scale = config.get('target_dpi', TARGET_DPI) / float(dpi[0])
+
+    scale = min(max(scale, config.get('min_scale', MIN_SCALE)), config.get('max_scale', MAX_SCALE))
+
+    # تغییرهای جزئی ارزش نمونه‌برداری دوباره را ندارند
+    if 0.9 <= scale <= 1.1:
+        return 1.0
+    return scale
+
+
+def page_sample(img, side=PAGE_SAMPLE_SIDE):
+    """نسخه خاکستری کوچک تصویر (بزرگ‌ترین ضلع حدود side) بدون رمزگشایی کامل JPEG"""
+    width, height = img.size
+    reduction = max(1, -(-max(width, height) // side))
+
+    if img.format == 'JPEG' and getattr(img, 'filename', None):
+        # تصویر اصلی دست نمی‌خورد تا پیش‌پردازش بتواند مقیاس خود را انتخاب کند
+        with Image.open(img.filename) as sample:
+            sample.draft('L', (width // reduction, height // reduction))
+            sample.load()
+            reduction = max(1, -(-max(sample.size) // side))
+            sample = sample.reduce(reduction) if reduction > 1 else sample.copy()
+    else:
+        if img.mode in ('1', 'P'):
+            # reduce این حالت‌ها را نمی‌پذیرد (مثلاً صفحه‌های دودویی فکس)
+            img = img.convert('L')
+        sample = img.reduce(reduction) if reduction > 1 else img
+
+    if sample.mode != 'L':
+        sample = sample.convert('L')
+    return sample
+
+
+def _has_text_lines(ink, axis):
+    """وجود دست‌کم یک نوار هم‌اندازه خط متن در نیم‌رخ جوهر در راستای axis"""
+    counts = ink.sum(axis=axis)
+    length = len(counts)
+    active = counts >= 3
+    edges = np.diff(np.concatenate(([0], active.astype(np.int8), [0])))
+    heights = np.flatnonzero(edges == -1) - np.flatnonzero(edges == 1)
+    return bool(np.any((heights >= 2) & (heights <= max(4, length // 10))))
+
+
+def blank_page_reason(img, config):
+    """تشخیص ارزان صفحه بدون متن پیش از OCR
+
+    روی نسخه کوچک تصویر، پیکسل‌هایی که دست‌کم BLANK_CONTRAST از میانگین
+    محلی تیره‌ترند جوهر حساب می‌شوند (سایه و زمینه ناهموار حذف می‌شود).
+    خروجی 'blank' اگر نسبت جوهر کمتر از config['blank_threshold'] باشد،
+    'no_text' اگر بیشتر جوهر توپر باشد یا هیچ نوار هم‌اندازه خط متن
+    (افقی یا عمودی) نسازد (مانند عکس) و در غیر این صورت None.
+    """
+    sample = page_sample(img)
+    pixels = np.asarray(sample, dtype=np.int16)
+    background = np.asarray(sample.filter(ImageFilter.BoxBlur(8)), dtype=np.int16)
+    ink = pixels < background - BLANK_CONTRAST
+
+    # حذف نقطه‌های تنها (گرد و غبار اسکنر)؛ خطوط حروف همسایه جوهری دارند
+    padded = np.pad(ink, 1)
+    neighbors = np.zeros_like(ink)
+    for dy in (0, 1, 2):
+        for dx in (0, 1, 2):
+            if dy != 1 or dx != 1:
+                neighbors |= padded[dy:dy + ink.shape[0], dx:dx + ink.shape[1]]
+    ink &= neighbors
+
+    ink_count = int(ink.sum())
+    if ink_count < config.get('blank_threshold', BLANK_THRESHOLD) * ink.size:
+        return 'blank'
+
+    # پیکسل‌هایی که کل پنجره ۵×۵ اطرافشان جوهر است (فرسایش جداپذیر)
+    rows = ink[:, 4:].copy()
+    for dx in range(4):
+        rows &= ink[:, dx:dx - 4]
+    solid = rows[4:].copy()
+    for dy in range(4):
+        solid &= rows[dy:dy - 4]
+    if solid.sum() > config.get('max_solid_ink', MAX_SOLID_INK) * ink_count:
+        return 'no_text'
+
+    if not (_has_text_lines(ink, 1) or _has_text_lines(ink, 0)):
+        return 'no_text'
+    return None
+
+
+def load_normalized(img, config, timer):
+    """بارگذاری تصویر با وضوح نرمال‌شده
+
+    برای JPEG ابتدا یک نسخه کوچک برای تخمین ارتفاع متن رمزگشایی می‌شود
+    و سپس تصویر اصلی مستقیماً در نزدیک‌ترین مقیاس بزرگ‌تر از اندازه هدف
+    (۱/۲، ۱/۴ یا ۱/۸) رمزگشایی می‌شود.
+    """
+    width, height = img.size
+    reduction = max(1, -(-max(width, height) // ESTIMATE_MAX_SIDE))
+
+    if img.format == 'JPEG' and getattr(img, 'filename', None):
+        with Image.open(img.filename) as sample:
+            sample.draft('L', (width // reduction, height // reduction))
+            sample.load()
+            text_height = estimate_text_height(sample)
+            if text_height:
+                text_height *= width / sample.width
+        timer('estimate')
+
+        scale = resolution_scale(img, config, text_height)
+        if scale < 1:
+            img.draft('L', (max(1, int(width * scale)), max(1, int(height * scale))))
+        img.load()
+        timer('decode')
+    else:
+        img.load()
+        timer('decode')
+
+        if img.mode not in ('L', 'RGB'):
+            img = img.convert('L')
+            timer('grayscale')
+        sample = img.reduce(reduction) if reduction > 1 else img
+        text_height = estimate_text_height(sample)
+        if text_height:
+            text_height *= reduction
+        timer('estimate')
+        scale = resolution_scale(img, config, text_height)
+
+    target = (max(1, round(width * scale)), max(1, round(height * scale)))
+    if img.size != target:
+        img = img.resize(target, Image.BOX if scale < 1 else Image.BICUBIC)
+        timer('resample')
+    return img
+
+
+def preprocess(img, config, timings=None, timer=None):
+    """پیش‌پردازش کامل یک تصویر بر اساس config
+
+    timings (اختیاری) دیکشنری است که زمان هر مرحله به ثانیه در آن جمع
+    می‌شود: estimate، decode، resample، grayscale، stats، denoise، contrast
+    و binarize. به جای آن می‌توان یک StageTimer آماده داد.
+    """
+    if timer is None:
+        timer = StageTimer(timings)
+
+    if config.get('normalize'):
+        img = load_normalized(img, config, timer)
+    else:
+        img.load()
+        timer('decode')
+
+    if img.mode != 'L':
+        img = img.convert('L')
+        timer('grayscale')
+
+    upscale = config.get('upscale', 1.0)
+    if upscale > 1:
+        # متن ریز پس از بزرگ‌نمایی بهتر خوانده می‌شود
+        img = img.resize((round(img.width * upscale), round(img.height * upscale)), Image.BICUBIC)
+        timer('resample')
+
+    # میانگین پیش از فیلتر میانه، همان مقداری که ImageEnhance.Contrast می‌بیند
+    lut = IDENTITY_LUT
+    if config['enhance_contrast']:
+        # در حالت کاشی میانگین کل تصویر از پیش داده می‌شود
+        mean = config.get('contrast_mean')
+        if mean is None:
+            mean = histogram_mean(img.histogram())
+        lut = contrast_lut(int(mean + 0.5))
+        timer('stats')
+
+    if config['denoise']:
+        img = median3(img)
+        timer('denoise')
+
+    method = config.get('threshold_method', DEFAULT_THRESHOLD_METHOD)
+
+    if not config['binary'] or method == 'sauvola':
+        if lut is not IDENTITY_LUT:
+            img = img.point(lut)
+            timer('contrast')
+        if config['binary']:
+            img = sauvola_binarize(
+                img,
+                window=config.get('sauvola_window', SAUVOLA_WINDOW),
+                k=config.get('sauvola_k', SAUVOLA_K)
+            )
+            timer('binarize')
+        return img
+
+    if method == 'otsu':
+        # هیستوگرام پس از کنتراست بدون ساختن تصویر میانی
+        hist = np.bincount(lut, weights=img.histogram(), minlength=256)
+        threshold = otsu_threshold(hist)
+    else:
+        threshold = config.get('threshold', FIXED_THRESHOLD)
+
+    # کنتراست و آستانه در یک گذر
+    binary_lut = [0 if value < threshold else 255 for value in lut]
+    img = img.point(binary_lut, '1')
+    timer('binarize')
+    return img
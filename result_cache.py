@@ -0,0 +1,220 @@
+"""حافظه نهان دائمی نتایج OCR
+
+کلید هر نتیجه از هش محتوای تصویر به همراه تنظیمات پیش‌پردازش، رشته
+تنظیمات tesseract و نسخه tesseract ساخته می‌شود؛ پس تغییر هر کدام از
+این‌ها نتیجه قبلی را بی‌اثر می‌کند. حجم کل محدود است و قدیمی‌ترین
+نتایج استفاده‌نشده (LRU) حذف می‌شوند.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from tesseract_discovery import tesseract_version
+from page_source import source_fields, split_page
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.ocr_offline', 'cache.sqlite')
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# کلیدهایی از config که روی متن خروجی اثری ندارند
+IGNORED_CONFIG_KEYS = {
+    'engine_batch_size', 'trace', 'dedup', 'dedup_distance', 'tile_workers',
+    'time_limit', 'timeout_fallback'
+}
+
+# تعداد نوشتن‌ها پیش از commit
+COMMIT_EVERY = 50
+
+
+# تعداد هش‌های فایل نگه‌داشته در حافظه (صفحه‌های یک فایل چندصفحه‌ای یک هش دارند)
+DIGEST_MEMO_SIZE = 1024
+
+_digest_memo = OrderedDict()
+_digest_lock = threading.Lock()
+
+
+def file_digest(image_path):
+    """هش محتوای فایل تصویر
+
+    هش هر فایل تا تغییر اندازه یا زمان تغییرش در حافظه می‌ماند؛ پس فایل
+    TIFF یا PDF چندصفحه‌ای برای همه صفحه‌هایش یک بار خوانده می‌شود.
+    """
+    stat = os.stat(image_path)
+    memo_key = (os.path.abspath(image_path), stat.st_size, stat.st_mtime_ns)
+    with _digest_lock:
+        if memo_key in _digest_memo:
+            _digest_memo.move_to_end(memo_key)
+            return _digest_memo[memo_key]
+
+    digest = hashlib.blake2b(digest_size=20)
+    with open(image_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    value = digest.hexdigest()
+
+    with _digest_lock:
+        _digest_memo[memo_key] = value
+        if len(_digest_memo) > DIGEST_MEMO_SIZE:
+            _digest_memo.popitem(last=False)
+    return value
+
+
+def config_digest(config, tesseract_config):
+    """هش تنظیمات پردازش، رشته تنظیمات tesseract و نسخه آن"""
+    relevant = {k: v for k, v in config.items() if k not in IGNORED_CONFIG_KEYS}
+    payload = json.dumps(
+        [relevant, tesseract_config, tesseract_version()],
+        sort_keys=True, default=str
+    )
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=20).hexdigest()
+
+
+class ResultCache:
+    """حافظه نهان نتایج روی دیسک با حذف LRU"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.pending_writes = 0
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS results ('
+            'key TEXT PRIMARY KEY, result TEXT NOT NULL, '
+            'size INTEGER NOT NULL, last_access REAL NOT NULL)'
+        )
+        self.conn.execute(
+            'CREATE INDEX IF NOT EXISTS results_last_access ON results (last_access)'
+        )
+        self.conn.commit()
+
+        self.total_bytes = self.conn.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM results'
+        ).fetchone()[0]
+
+    def make_key(self, image_path, config, tesseract_config):
+        """کلید حافظه نهان برای یک تصویر (یا صفحه) و تنظیمات"""
+        path, page = split_page(image_path)
+        digest = file_digest(path) + (f"#{page}" if page else '')
+        return digest + ':' + config_digest(config, tesseract_config)
+
+    def get(self, key):
+        """نتیجه ذخیره‌شده یا None"""
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT result FROM results WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.conn.execute(
+                'UPDATE results SET last_access = ? WHERE key = ?', (time.time(), key)
+            )
+            self._count_write()
+        return json.loads(row[0])
+
+    def lookup(self, image_path, config, tesseract_config):
+        """جستجوی نتیجه یک تصویر؛ خروجی (کلید، نتیجه یا None)"""
+        key = self.make_key(image_path, config, tesseract_config)
+        result = self.get(key)
+        if result is not None:
+            result = dict(result, **source_fields(image_path), cached=True)
+        return key, result
+
+    def put(self, key, result):
+        """ذخیره یک نتیجه موفق"""
+        if not result.get('success'):
+            return
+
+        data = json.dumps(result, ensure_ascii=False, default=str)
+        size = len(data.encode('utf-8'))
+        with self.lock:
+            old = self.conn.execute(
+                'SELECT size FROM results WHERE key = ?', (key,)
+            ).fetchone()
+            if old:
+                self.total_bytes -= old[0]
+            self.conn.execute(
+                'INSERT OR REPLACE INTO results (key, result, size, last_access) '
+                'VALUES (?, ?, ?, ?)',
+                (key, data, size, time.time())
+            )
+            self.total_bytes += size
+            self._evict()
+            self._count_write()
+
+    def invalidate(self, key=None):
+        """حذف یک نتیجه یا (بدون کلید) کل حافظه نهان"""
+        with self.lock:
+            if key is None:
+                self.conn.execute('DELETE FROM results')
+                self.total_bytes = 0
+            else:
+                row = self.conn.execute(
+                    'SELECT size FROM results WHERE key = ?', (key,)
+                ).fetchone()
+                if row:
+                    self.conn.execute('DELETE FROM results WHERE key = ?', (key,))
+                    self.total_bytes -= row[0]
+            self.conn.commit()
+            self.pending_writes = 0
+
+    def stats(self):
+        """آمار حافظه نهان"""
+        with self.lock:
+            entries = self.conn.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': entries,
+            'bytes': self.total_bytes,
+            'max_bytes': self.max_bytes
+        }
+
+    def reset_counters(self):
+        self.hits = 0
+        self.misses = 0
+
+    def flush(self):
+        """ثبت نوشتن‌های معوق روی دیسک"""
+        with self.lock:
+            self.conn.commit()
+            self.pending_writes = 0
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+    def _count_write(self):
+        self.pending_writes += 1
+        if self.pending_writes >= COMMIT_EVERY:
+            self.conn.commit()
+            self.pending_writes = 0
+
+    def _evict(self):
+        """حذف قدیمی‌ترین نتایج تا رسیدن به سقف حجم"""
+        while self.total_bytes > self.max_bytes:
+            rows = self.conn.execute(
+                'SELECT key, size FROM results ORDER BY last_access LIMIT 64'
+            ).fetchall()
+            if not rows:
+                self.total_bytes = 0
+                break
+            for key, size in rows:
+                self.conn.execute('DELETE FROM results WHERE key = ?', (key,))
+                self.total_bytes -= size
+                if self.total_bytes <= self.max_bytes:
+                    break
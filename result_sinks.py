@@ -0,0 +1,282 @@
+"""نوشتن جریانی نتایج در فایل (JSONL، JSON، CSV و TXT)
+
+هر نتیجه به محض آماده شدن نوشته می‌شود و فقط آمار کلی در حافظه می‌ماند؛
+پس مصرف حافظه به تعداد تصاویر بستگی ندارد و با از کار افتادن برنامه
+نتایج نوشته‌شده از دست نمی‌روند. خلاصه (metadata) در close نوشته می‌شود.
+
+    with open_sink('results.csv') as sink:
+        processor.process_batch(paths, config, on_result=sink.write, collect=False)
+"""
+import csv
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from page_source import display_name
+
+# نوشتن روی دیسک پس از این تعداد نتیجه یا این مدت (ثانیه)
+FLUSH_EVERY = 25
+FLUSH_INTERVAL = 2.0
+
+# فایل‌های JSONL اجراهای رابط گرافیکی (تعداد اجراهای نگه‌داشته‌شده)
+DEFAULT_SPOOL_DIR = os.path.join(os.path.expanduser('~'), '.ocr_offline', 'results')
+SPOOL_KEEP = 10
+
+
+def new_summary():
+    """آمار کلی خالی با همان کلیدهای metadata خروجی JSON"""
+    return {
+        'generated_at': datetime.now().isoformat(),
+        'total_images': 0,
+        'processed_images': 0,
+        'skipped_images': 0,
+        'failed_images': 0,
+        'total_codes': 0,
+        'total_words': 0
+    }
+
+
+def update_summary(summary, result):
+    """افزودن یک نتیجه به آمار کلی"""
+    summary['total_images'] += 1
+    if result['success']:
+        summary['processed_images'] += 1
+        summary['total_codes'] += result.get('code_count', 0)
+        summary['total_words'] += result.get('word_count', 0)
+        if result.get('skipped'):
+            summary['skipped_images'] += 1
+    else:
+        summary['failed_images'] += 1
+
+
+class ResultSink:
+    """پایه نویسنده‌های جریانی
+
+    target مسیر فایل یا یک شیء فایل باز (مثلاً sys.stdout) است؛ فایل‌های
+    باز بسته نمی‌شوند. write(result, index=None) امضای on_result در
+    BatchProcessor.process_batch را دارد.
+    """
+
+    extension = None
+    encoding = 'utf-8'
+    newline = None
+
+    def __init__(self, target, flush_every=FLUSH_EVERY, flush_interval=FLUSH_INTERVAL):
+        if isinstance(target, str):
+            self.file = open(target, 'w', encoding=self.encoding, newline=self.newline)
+            self.owns_file = True
+        else:
+            self.file = target
+            self.owns_file = False
+        self.flush_every = max(1, flush_every)
+        self.flush_interval = flush_interval
+        self.summary = new_summary()
+        self.pending = 0
+        self.last_flush = time.time()
+        self.closed = False
+        self.write_header()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, result, index=None):
+        """نوشتن یک نتیجه و به‌روزرسانی آمار"""
+        update_summary(self.summary, result)
+        self.write_result(result, index)
+        self.pending += 1
+        if self.pending >= self.flush_every or time.time() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        self.file.flush()
+        self.pending = 0
+        self.last_flush = time.time()
+
+    def close(self):
+        """نوشتن خلاصه و بستن فایل"""
+        if self.closed:
+            return
+        self.closed = True
+        self.write_footer()
+        self.flush()
+        if self.owns_file:
+            self.file.close()
+
+    def write_header(self):
+        pass
+
+    def write_result(self, result, index):
+        raise NotImplementedError
+
+    def write_footer(self):
+        pass
+
+
+class JsonlSink(ResultSink):
+    """هر نتیجه یک خط JSON؛ با index شماره تصویر در ورودی هم نوشته می‌شود"""
+
+    extension = '.jsonl'
+
+    def write_result(self, result, index):
+        if index is not None:
+            result = dict(result, index=index)
+        self.file.write(json.dumps(result, ensure_ascii=False, default=str) + '\n')
+
+
+class JsonSink(ResultSink):
+    """سند JSON با فهرست results و در پایان metadata"""
+
+    extension = '.json'
+
+    def write_header(self):
+        self.file.write('{\n  "results": [')
+        self.first = True
+
+    def write_result(self, result, index):
+        item = json.dumps(result, ensure_ascii=False, indent=2, default=str)
+        self.file.write(('\n' if self.first else ',\n') + '    ' + item.replace('\n', '\n    '))
+        self.first = False
+
+    def write_footer(self):
+        metadata = json.dumps(self.summary, ensure_ascii=False, indent=2)
+        self.file.write('\n  ],\n  "metadata": ' + metadata.replace('\n', '\n  ') + '\n}\n')
+
+
+class CsvSink(ResultSink):
+    """یک ردیف برای هر تصویر موفق با پیش‌نمایش متن"""
+
+    extension = '.csv'
+    encoding = 'utf-8-sig'
+    newline = ''
+
+    def write_header(self):
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(['نام فایل', 'صفحه', 'تعداد کلمات', 'تعداد کاراکترها', 'تعداد کدها', 'کدها', 'متن'])
+
+    def write_result(self, result, index):
+        if not result['success']:
+            return
+        codes_str = '; '.join(result['codes'])
+        text_preview = result['cleaned_text'][:100] + "..." if len(result['cleaned_text']) > 100 else result['cleaned_text']
+
+        self.writer.writerow([
+            result['filename'],
+            result.get('page', ''),
+            result['word_count'],
+            result['char_count'],
+            result['code_count'],
+            codes_str,
+            text_preview
+        ])
+
+
+class TxtSink(ResultSink):
+    """گزارش متنی خوانا؛ تعداد تصاویر در پایان فایل نوشته می‌شود"""
+
+    extension = '.txt'
+
+    def write_header(self):
+        f = self.file
+        f.write("="*60 + "\n")
+        f.write("نتایج استخراج متن و کد از تصاویر\n")
+        f.write(f"تاریخ تولید: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+        f.write("="*60 + "\n\n")
+
+    def write_result(self, result, index):
+        if not result['success']:
+            return
+        f = self.file
+        f.write(f"{'='*50}\n")
+        f.write(f"فایل: {display_name(result)}\n")
+        f.write(f"{'='*50}\n\n")
+
+        f.write("📝 متن استخراج شده:\n")
+        f.write(result['cleaned_text'])
+        f.write("\n\n")
+
+        if result['codes']:
+            f.write("🔢 کدهای استخراج شده:\n")
+            for code in result['codes']:
+                f.write(f"  • {code}\n")
+            f.write("\n")
+
+        f.write("📊 آمار:\n")
+        f.write(f"  • تعداد کلمات: {result['word_count']}\n")
+        f.write(f"  • تعداد کاراکترها: {result['char_count']}\n")
+        f.write(f"  • تعداد کدها: {result['code_count']}\n")
+        f.write("\n" + "="*60 + "\n\n")
+
+    def write_footer(self):
+        summary = self.summary
+        self.file.write(f"تعداد تصاویر: {summary['total_images']}\n")
+        self.file.write(f"تعداد کل کدها: {summary['total_codes']}\n")
+        self.file.write(f"تعداد کل کلمات: {summary['total_words']}\n")
+
+
+SINKS = {sink.extension: sink for sink in (JsonlSink, JsonSink, CsvSink, TxtSink)}
+
+
+def open_sink(path, default='.txt', **kwargs):
+    """نویسنده مناسب بر اساس پسوند فایل"""
+    ext = os.path.splitext(path)[1].lower()
+    return SINKS.get(ext, SINKS[default])(path, **kwargs)
+
+
+def new_spool(directory=DEFAULT_SPOOL_DIR, keep=SPOOL_KEEP):
+    """فایل JSONL تازه برای نتایج یک اجرا؛ قدیمی‌ترین اجراها حذف می‌شوند"""
+    try:
+        os.makedirs(directory, exist_ok=True)
+    except OSError:
+        directory = tempfile.gettempdir()
+
+    runs = sorted(name for name in os.listdir(directory)
+                  if name.startswith('run-') and name.endswith('.jsonl'))
+    for name in runs[:max(0, len(runs) - keep + 1)]:
+        try:
+            os.remove(os.path.join(directory, name))
+        except OSError:
+            pass
+
+    name = f"run-{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}.jsonl"
+    return JsonlSink(os.path.join(directory, name))
+
+
+def read_results(spool_path):
+    """خواندن نتایج یک فایل JSONL به ترتیب index
+
+    ابتدا فقط موقعیت هر خط در فایل خوانده می‌شود و سپس نتایج یکی‌یکی به
+    ترتیب ورودی بارگذاری می‌شوند؛ حافظه برای هر تصویر چند بایت است.
+    """
+    offsets = []
+    with open(spool_path, 'rb') as f:
+        position = 0
+        for order, line in enumerate(f):
+            if line.strip():
+                try:
+                    index = json.loads(line).get('index', order)
+                except ValueError:
+                    # خط ناقص (مثلاً پس از قطع ناگهانی برنامه)
+                    index = None
+                if index is not None:
+                    offsets.append((index, position))
+            position += len(line)
+
+        offsets.sort()
+        for index, position in offsets:
+            f.seek(position)
+            result = json.loads(f.readline().decode('utf-8'))
+            result.pop('index', None)
+            yield result
+
+
+def export_results(spool_path, path):
+    """تبدیل جریانی فایل JSONL نتایج به قالب مقصد؛ خروجی آمار کلی"""
+    with open_sink(path) as sink:
+        for result in read_results(spool_path):
+            sink.write(result)
+    return sink.summary
@@ -2,5 +2,5 @@
 chcp 65001
 title استخراج متن و کد از تصاویر
 echo در حال راه‌اندازی برنامه...
-python modern_ocr_app.py
+python p.py
 pause
@@ -0,0 +1,176 @@
+"""یافتن فایل اجرایی tesseract و نسخه و زبان‌های نصب‌شده آن با حافظه نهان
+
+اجرای tesseract --version و --list-langs در هر اجرای کوتاه خط فرمان هزینه
+راه‌اندازی دارد؛ نتیجه در DEFAULT_INFO_PATH ذخیره می‌شود و تا وقتی مسیر،
+اندازه و زمان تغییر فایل اجرایی عوض نشده (مثلاً با ارتقای tesseract) دوباره
+استفاده می‌شود. مسیر به ترتیب از متغیر محیطی TESSERACT_CMD، PATH و در ویندوز
+مسیرهای نصب پیش‌فرض پیدا می‌شود. این ماژول فقط کتابخانه استاندارد را وارد
+می‌کند تا بررسی tesseract هزینه‌ای به راه‌اندازی اضافه نکند.
+
+    python tesseract_discovery.py
+    python tesseract_discovery.py --refresh
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+
+DEFAULT_INFO_PATH = os.path.join(os.path.expanduser('~'), '.ocr_offline', 'tesseract.json')
+
+# متغیر محیطی مسیر صریح فایل اجرایی
+TESSERACT_ENV = 'TESSERACT_CMD'
+
+# مسیرهای نصب پیش‌فرض ویندوز
+WINDOWS_TESSERACT_CMDS = (
+    r'C:\Program Files\Tesseract-OCR\tesseract.exe',
+    r'C:\Program Files (x86)\Tesseract-OCR\tesseract.exe',
+)
+
+# مهلت اجرای tesseract برای خواندن نسخه و زبان‌ها (ثانیه)
+QUERY_TIMEOUT = 10
+
+_lock = threading.Lock()
+_cmd = None
+_info = None
+
+
+def find_tesseract():
+    """مسیر فایل اجرایی tesseract؛ در نبود آن 'tesseract' (خطا هنگام اجرا گزارش می‌شود)"""
+    cmd = os.environ.get(TESSERACT_ENV)
+    if cmd:
+        return shutil.which(cmd) or cmd
+    found = shutil.which('tesseract')
+    if found:
+        return found
+    if os.name == 'nt':
+        for path in WINDOWS_TESSERACT_CMDS:
+            if os.path.exists(path):
+                return path
+    return 'tesseract'
+
+
+def tesseract_cmd():
+    """مسیر tesseract (یک بار در هر فرایند جستجو می‌شود)"""
+    global _cmd
+    if _cmd is None:
+        _cmd = find_tesseract()
+    return _cmd
+
+
+def binary_stamp(cmd):
+    """اندازه و زمان تغییر فایل اجرایی برای تشخیص نصب یا ارتقای دوباره"""
+    stat = os.stat(cmd)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def parse_version(output):
+    """شماره نسخه از سطر اول خروجی --version (مثلاً 'tesseract 5.3.0' به '5.3.0')"""
+    lines = output.strip().splitlines()
+    if not lines:
+        return 'unknown'
+    words = lines[0].split()
+    version = words[-1].lstrip('v') if words else ''
+    return version.partition('-')[0] or 'unknown'
+
+
+def parse_languages(output):
+    """زبان‌ها از خروجی --list-langs (سطر عنوان حذف می‌شود)"""
+    return sorted(
+        line.strip() for line in output.splitlines()
+        if line.strip() and not line.startswith('List of available languages')
+    )
+
+
+def run_query(cmd, option):
+    """خروجی tesseract با یک گزینه؛ نسخه‌های قدیمی در stderr می‌نویسند"""
+    proc = subprocess.run([cmd, option], capture_output=True, timeout=QUERY_TIMEOUT)
+    return (proc.stdout or proc.stderr).decode('utf-8', errors='replace')
+
+
+def query_tesseract(cmd):
+    """اجرای tesseract برای خواندن نسخه و زبان‌ها"""
+    try:
+        version = parse_version(run_query(cmd, '--version'))
+        languages = parse_languages(run_query(cmd, '--list-langs'))
+    except (OSError, subprocess.SubprocessError):
+        return {'version': 'unknown', 'languages': []}
+    return {'version': version, 'languages': languages}
+
+
+def read_info(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_info(path, info):
+    """نوشتن اتمی فایل حافظه نهان (اجراهای هم‌زمان فایل نیمه‌کاره نمی‌بینند)"""
+    try:
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(info, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+    except OSError:
+        pass
+
+
+def tesseract_info(refresh=False, path=DEFAULT_INFO_PATH):
+    """{'cmd', 'version', 'languages'} از حافظه نهان یا با اجرای tesseract
+
+    نتیجه در هر فرایند یک بار ساخته می‌شود؛ با refresh فایل حافظه نهان
+    نادیده گرفته و بازنویسی می‌شود.
+    """
+    global _info
+    with _lock:
+        if _info is not None and not refresh:
+            return _info
+        cmd = tesseract_cmd()
+        try:
+            stamp = binary_stamp(cmd)
+        except OSError:
+            stamp = None
+
+        cached = None if refresh else read_info(path)
+        if stamp is not None and cached and cached.get('cmd') == cmd and cached.get('stamp') == stamp:
+            info = cached
+        else:
+            info = dict(query_tesseract(cmd), cmd=cmd, stamp=stamp)
+            # نبود tesseract ذخیره نمی‌شود تا پس از نصب فوراً پیدا شود
+            if stamp is not None and info['version'] != 'unknown':
+                write_info(path, info)
+        _info = info
+        return info
+
+
+def tesseract_version():
+    """نسخه tesseract نصب‌شده یا 'unknown'"""
+    return tesseract_info()['version']
+
+
+def tesseract_languages():
+    """زبان‌های نصب‌شده tesseract"""
+    return tesseract_info()['languages']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="مسیر، نسخه و زبان‌های tesseract")
+    parser.add_argument('--refresh', action='store_true', help="خواندن دوباره از tesseract")
+    parser.add_argument('--info-path', default=DEFAULT_INFO_PATH, help="مسیر فایل حافظه نهان")
+    args = parser.parse_args(argv)
+
+    info = tesseract_info(args.refresh, args.info_path)
+    print(f"مسیر: {info['cmd']}")
+    print(f"نسخه: {info['version']}")
+    print(f"زبان‌ها: {', '.join(info['languages']) or '-'}")
+    return 0 if info['version'] != 'unknown' else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,487 @@
+"""موتورهای اجرای Tesseract
+
+هر موتور متد recognize برای یک تصویر و recognize_many برای چند تصویر دارد؛
+recognize_data متن را خط‌به‌خط همراه با اطمینان و کادر هر خط و
+recognize_words کلمه‌به‌کلمه همراه با کادر هر کلمه برمی‌گرداند.
+موتور pytesseract همان روش قبلی (یک فرایند برای هر تصویر) است؛ موتور list
+چند تصویر را با یک فرایند و فایل فهرست می‌خواند و موتور tesserocr کتابخانه
+را یک بار در هر فرایند کارگر بارگذاری می‌کند و گرم نگه می‌دارد.
+
+موتورهای مبتنی بر فرایند tesseract را خودشان اجرا می‌کنند تا با رسیدن
+engine.deadline (زمان time.monotonic) یا فراخوانی cancel فرایند در حال
+اجرا کشته شود؛ موتور tesserocr مهلت را به Recognize می‌دهد ولی اجرای
+درون‌فرایندی را نمی‌توان وسط کار لغو کرد.
+
+pytesseract و tesserocr فقط هنگام نیاز وارد می‌شوند تا راه‌اندازی برنامه
+هزینه بارگذاری آن‌ها را نپردازد؛ مسیر tesseract از tesseract_discovery
+خوانده می‌شود.
+"""
+import importlib.util
+import os
+import queue
+import shlex
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from tesseract_discovery import tesseract_cmd
+
+# ماژول tesserocr پس از load_tesserocr
+tesserocr = None
+
+# جداکننده صفحات در خروجی متنی tesseract
+PAGE_SEPARATOR = '\f'
+
+
+class OCRTimeout(RuntimeError):
+    """اجرای موتور از مهلت تصویر بیشتر شد
+
+    در recognize_many، done متن تصاویری است که پیش از تصویر کند تمام شدند.
+    """
+
+    def __init__(self, message="مهلت پردازش تصویر تمام شد", done=()):
+        super().__init__(message)
+        self.done = list(done)
+
+
+class OCRCancelled(RuntimeError):
+    """اجرای موتور با توقف پردازش لغو شد"""
+
+
+def split_config(config):
+    """تبدیل رشته تنظیمات به آرگومان‌های خط فرمان (مانند pytesseract)"""
+    try:
+        return shlex.split(config, posix=sys.platform != 'win32')
+    except ValueError:
+        # نقل‌قول‌های بسته‌نشده در لیست مجاز کاراکترها
+        return shlex.split(config, posix=False)
+
+
+def parse_config(config):
+    """استخراج psm، oem، زبان و متغیرهای -c از رشته تنظیمات"""
+    args = split_config(config)
+    options = {'psm': None, 'oem': None, 'lang': None, 'variables': {}}
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        value = args[i + 1] if i + 1 < len(args) else None
+        if arg == '--psm' and value is not None:
+            options['psm'] = int(value)
+            i += 1
+        elif arg == '--oem' and value is not None:
+            options['oem'] = int(value)
+            i += 1
+        elif arg == '-l' and value is not None:
+            options['lang'] = value
+            i += 1
+        elif arg == '-c' and value is not None and '=' in value:
+            key, val = value.split('=', 1)
+            options['variables'][key] = val
+            i += 1
+        i += 1
+    return options
+
+
+def lines_from_data(data):
+    """خطوط متن از خروجی image_to_data: فهرست {'text', 'conf', 'chars', 'box'}
+
+    اطمینان هر خط میانگین اطمینان کلمات آن با وزن طول کلمه است.
+    """
+    lines = {}
+    for i, word in enumerate(data['text']):
+        word = str(word).strip()
+        if not word:
+            continue
+        key = (data['page_num'][i], data['block_num'][i], data['par_num'][i], data['line_num'][i])
+        left, top = data['left'][i], data['top'][i]
+        right, bottom = left + data['width'][i], top + data['height'][i]
+        line = lines.get(key)
+        if line is None:
+            line = lines[key] = {'words': [], 'confs': [], 'box': [left, top, right, bottom]}
+        else:
+            box = line['box']
+            line['box'] = [min(box[0], left), min(box[1], top), max(box[2], right), max(box[3], bottom)]
+        line['words'].append(word)
+        line['confs'].append((float(data['conf'][i]), len(word)))
+
+    result = []
+    for line in lines.values():
+        scored = [(conf, n) for conf, n in line['confs'] if conf >= 0]
+        chars = sum(n for _, n in scored)
+        result.append({
+            'text': ' '.join(line['words']),
+            'conf': sum(conf * n for conf, n in scored) / chars if chars else 0.0,
+            'chars': sum(n for _, n in line['confs']),
+            'box': tuple(line['box'])
+        })
+    return result
+
+
+def words_from_data(data):
+    """کلمات خروجی image_to_data: فهرست {'text', 'conf', 'box'}"""
+    words = []
+    for i, word in enumerate(data['text']):
+        word = str(word).strip()
+        if word:
+            left, top = data['left'][i], data['top'][i]
+            words.append({
+                'text': word,
+                'conf': float(data['conf'][i]),
+                'box': (left, top, left + data['width'][i], top + data['height'][i])
+            })
+    return words
+
+
+class PytesseractEngine:
+    """اجرای جداگانه tesseract برای هر تصویر"""
+
+    name = 'pytesseract'
+
+    def __init__(self):
+        # زمان پایان مهلت اجرای بعدی (time.monotonic) یا None
+        self.deadline = None
+        # مهلت هر تصویر در recognize_many (ثانیه) یا None
+        self.image_limit = None
+        self.cancelled = False
+        self.proc = None
+        self.lock = threading.Lock()
+
+    def remaining(self):
+        """ثانیه‌های باقی‌مانده تا deadline یا None"""
+        if self.deadline is None:
+            return None
+        remaining = self.deadline - time.monotonic()
+        if remaining <= 0:
+            raise OCRTimeout()
+        return remaining
+
+    def image_deadline(self, deadline):
+        """پایان مهلت تصویر بعدی: image_limit از اکنون و حداکثر تا deadline"""
+        if self.image_limit:
+            limit = time.monotonic() + self.image_limit
+            return limit if deadline is None else min(deadline, limit)
+        return deadline
+
+    def start_tesseract(self, args, **kwargs):
+        """شروع فرایند tesseract (مگر پس از cancel)"""
+        with self.lock:
+            if self.cancelled:
+                raise OCRCancelled("پردازش متوقف شد")
+            try:
+                self.proc = subprocess.Popen([tesseract_cmd()] + args, **kwargs)
+            except FileNotFoundError:
+                import pytesseract
+                raise pytesseract.TesseractNotFoundError()
+            return self.proc
+
+    def check_exit(self, proc, stderr):
+        if self.cancelled:
+            raise OCRCancelled("پردازش متوقف شد")
+        if proc.returncode:
+            import pytesseract
+            raise pytesseract.TesseractError(
+                proc.returncode, stderr.decode('utf-8', errors='replace').strip()
+            )
+
+    def run_tesseract(self, args):
+        """اجرای tesseract با آرگومان‌های args؛ خروجی stdout
+
+        با پایان مهلت یا cancel فرایند کشته می‌شود.
+        """
+        timeout = self.remaining()
+        proc = self.start_tesseract(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        try:
+            stdout, stderr = proc.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.communicate()
+            raise OCRTimeout()
+        finally:
+            with self.lock:
+                self.proc = None
+
+        self.check_exit(proc, stderr)
+        return stdout
+
+    def run_on_image(self, img, args, extension):
+        """اجرای tesseract روی یک تصویر و خواندن فایل خروجی با پسوند extension"""
+        with tempfile.TemporaryDirectory(prefix='ocr_') as temp_dir:
+            image_path = os.path.join(temp_dir, 'image.png')
+            output_base = os.path.join(temp_dir, 'output')
+            img.save(image_path)
+            self.run_tesseract([image_path, output_base] + args)
+            with open(f"{output_base}.{extension}", 'rb') as f:
+                return f.read().decode('utf-8', errors='replace')
+
+    def recognize(self, img, config):
+        """تشخیص متن یک تصویر (هم‌شکل با image_to_string)"""
+        return self.run_on_image(img, split_config(config) + ['txt'], 'txt')
+
+    def recognize_many(self, images, config):
+        """تشخیص متن چند تصویر؛ با image_limit هر تصویر مهلت جدای خودش را دارد"""
+        texts = []
+        deadline = self.deadline
+        try:
+            for img in images:
+                self.deadline = self.image_deadline(deadline)
+                texts.append(self.recognize(img, config))
+        except OCRTimeout as e:
+            raise OCRTimeout(str(e), texts)
+        finally:
+            self.deadline = deadline
+        return texts
+
+    def recognize_tsv(self, img, config):
+        """خروجی image_to_data به صورت دیکشنری ستون‌ها"""
+        from pytesseract.pytesseract import file_to_dict
+        tsv = self.run_on_image(img, ['-c', 'tessedit_create_tsv=1'] + split_config(config), 'tsv')
+        return file_to_dict(tsv, '\t', -1)
+
+    def recognize_data(self, img, config):
+        """تشخیص متن خط‌به‌خط همراه با اطمینان (lines_from_data)"""
+        return lines_from_data(self.recognize_tsv(img, config))
+
+    def recognize_words(self, img, config):
+        """تشخیص کلمات همراه با کادر هر کلمه (words_from_data)"""
+        return words_from_data(self.recognize_tsv(img, config))
+
+    def cancel(self):
+        """لغو اجرای در حال انجام و اجراهای بعدی تا reset"""
+        with self.lock:
+            self.cancelled = True
+            if self.proc is not None:
+                self.proc.kill()
+
+    def reset(self):
+        self.cancelled = False
+        self.deadline = None
+
+    def close(self):
+        pass
+
+
+def read_chunks(stream, chunks):
+    """خواندن خروجی فرایند در حین اجرا؛ بایت خالی یعنی پایان خروجی"""
+    while True:
+        chunk = stream.read1(65536)
+        chunks.put(chunk)
+        if not chunk:
+            return
+
+
+class ListFileEngine(PytesseractEngine):
+    """اجرای یک فرایند tesseract برای چند تصویر با فایل فهرست
+
+    خروجی هنگام اجرا خوانده می‌شود و tesseract پس از هر صفحه جداکننده
+    می‌نویسد؛ پس مهلت image_limit برای هر تصویر جداگانه شمرده می‌شود.
+    """
+
+    name = 'list'
+
+    def recognize(self, img, config):
+        return self.recognize_many([img], config)[0]
+
+    def recognize_many(self, images, config):
+        if not images:
+            return []
+
+        with tempfile.TemporaryDirectory(prefix='ocr_') as temp_dir:
+            list_path = os.path.join(temp_dir, 'images.txt')
+            with open(list_path, 'w', encoding='utf-8') as f:
+                for i, img in enumerate(images):
+                    image_path = os.path.join(temp_dir, f'{i:05d}.png')
+                    img.save(image_path)
+                    f.write(image_path + '\n')
+
+            stdout = self.run_pages([list_path, 'stdout'] + split_config(config), temp_dir)
+
+        pages = split_pages(stdout, len(images))
+
+        if len(pages) != len(images):
+            raise RuntimeError(
+                f"تعداد صفحات خروجی ({len(pages)}) با تعداد تصاویر ({len(images)}) برابر نیست"
+            )
+
+        # هم‌شکل با خروجی image_to_string
+        return [page + PAGE_SEPARATOR for page in pages]
+
+    def run_pages(self, args, temp_dir):
+        """اجرای tesseract روی فایل فهرست؛ خروجی stdout
+
+        مهلت هر تصویر با رسیدن جداکننده صفحه قبلی از نو شروع می‌شود. با
+        پایان مهلت، فرایند کشته و OCRTimeout همراه با صفحه‌های تمام‌شده
+        داده می‌شود.
+        """
+        self.remaining()
+        separator = PAGE_SEPARATOR.encode('utf-8')
+        with open(os.path.join(temp_dir, 'stderr.txt'), 'w+b') as stderr:
+            proc = self.start_tesseract(args, stdout=subprocess.PIPE, stderr=stderr)
+            chunks = queue.Queue()
+            threading.Thread(target=read_chunks, args=(proc.stdout, chunks), daemon=True).start()
+            output = bytearray()
+            finished = 0
+            deadline = self.image_deadline(self.deadline)
+            try:
+                while True:
+                    try:
+                        timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                        chunk = chunks.get(timeout=timeout)
+                    except queue.Empty:
+                        proc.kill()
+                        proc.wait()
+                        done = [page + PAGE_SEPARATOR for page in split_pages(output)[:finished]]
+                        raise OCRTimeout(done=done)
+                    if not chunk:
+                        break
+                    output += chunk
+                    if output.count(separator) > finished:
+                        finished = output.count(separator)
+                        deadline = self.image_deadline(self.deadline)
+                proc.wait()
+            finally:
+                proc.stdout.close()
+                with self.lock:
+                    self.proc = None
+            stderr.seek(0)
+            self.check_exit(proc, stderr.read())
+        return bytes(output)
+
+
+def split_pages(stdout, count=None):
+    """متن صفحه‌های خروجی گروهی
+
+    بیشتر نسخه‌های tesseract پس از هر صفحه جداکننده می‌نویسند و بعضی فقط
+    بین صفحه‌ها؛ با تعداد صفحه‌های مورد انتظار count هر دو شکل (حتی با صفحه
+    آخر خالی) درست جدا می‌شوند. بدون count بخش خالی پس از آخرین جداکننده
+    صفحه حساب نمی‌شود.
+    """
+    pages = bytes(stdout).decode('utf-8', errors='replace').split(PAGE_SEPARATOR)
+    if count is not None:
+        if len(pages) == count + 1 and not pages[-1].strip():
+            # جداکننده پس از هر صفحه
+            pages.pop()
+        return pages
+    if pages and not pages[-1].strip():
+        pages.pop()
+    return pages
+
+
+def load_tesserocr():
+    """وارد کردن tesserocr هنگام ساخت اولین موتور آن"""
+    global tesserocr
+    if tesserocr is None:
+        try:
+            import tesserocr as module
+        except ImportError:
+            raise RuntimeError("کتابخانه tesserocr نصب نیست")
+        tesserocr = module
+    return tesserocr
+
+
+class TesserocrEngine(PytesseractEngine):
+    """موتور درون‌فرایندی tesserocr که مدل زبان را یک بار بارگذاری می‌کند"""
+
+    name = 'tesserocr'
+
+    def __init__(self):
+        load_tesserocr()
+        super().__init__()
+        self.api = None
+        self.api_config = None
+
+    def get_api(self, config):
+        """ساخت یا استفاده مجدد از نمونه API برای این تنظیمات"""
+        if self.api is None or self.api_config != config:
+            self.close()
+            options = parse_config(config)
+            kwargs = {}
+            if options['psm'] is not None:
+                kwargs['psm'] = options['psm']
+            if options['oem'] is not None:
+                kwargs['oem'] = options['oem']
+            if options['lang']:
+                kwargs['lang'] = options['lang']
+
+            self.api = tesserocr.PyTessBaseAPI(**kwargs)
+            for key, value in options['variables'].items():
+                self.api.SetVariable(key, value)
+            self.api_config = config
+        return self.api
+
+    def run_recognize(self, img, config):
+        """تشخیص تصویر در مهلت باقی‌مانده؛ خروجی نمونه API آماده خواندن نتیجه"""
+        if self.cancelled:
+            raise OCRCancelled("پردازش متوقف شد")
+        api = self.get_api(config)
+        api.SetImage(img)
+        timeout = self.remaining()
+        if not api.Recognize(int(timeout * 1000) if timeout is not None else 0):
+            raise OCRTimeout()
+        return api
+
+    def recognize(self, img, config):
+        return self.run_recognize(img, config).GetUTF8Text() + PAGE_SEPARATOR
+
+    def recognize_data(self, img, config):
+        api = self.run_recognize(img, config)
+        level = tesserocr.RIL.TEXTLINE
+        lines = []
+        for item in tesserocr.iterate_level(api.GetIterator(), level):
+            text = ' '.join((item.GetUTF8Text(level) or '').split())
+            if text:
+                lines.append({
+                    'text': text,
+                    'conf': item.Confidence(level),
+                    'chars': len(text.replace(' ', '')),
+                    'box': item.BoundingBox(level)
+                })
+        return lines
+
+    def recognize_words(self, img, config):
+        api = self.run_recognize(img, config)
+        level = tesserocr.RIL.WORD
+        words = []
+        for item in tesserocr.iterate_level(api.GetIterator(), level):
+            text = (item.GetUTF8Text(level) or '').strip()
+            if text:
+                words.append({
+                    'text': text,
+                    'conf': item.Confidence(level),
+                    'box': item.BoundingBox(level)
+                })
+        return words
+
+    def close(self):
+        if self.api is not None:
+            self.api.End()
+            self.api = None
+            self.api_config = None
+
+
+ENGINES = {
+    PytesseractEngine.name: PytesseractEngine,
+    ListFileEngine.name: ListFileEngine,
+    TesserocrEngine.name: TesserocrEngine,
+}
+
+DEFAULT_ENGINE = PytesseractEngine.name
+
+
+def available_engines():
+    """نام موتورهای قابل استفاده در این سیستم"""
+    names = [PytesseractEngine.name, ListFileEngine.name]
+    # فقط وجود بسته بررسی می‌شود؛ بارگذاری کتابخانه tesseract گران است
+    if importlib.util.find_spec('tesserocr') is not None:
+        names.append(TesserocrEngine.name)
+    return names
+
+
+def create_engine(name=None):
+    """ساخت موتور بر اساس نام"""
+    name = name or DEFAULT_ENGINE
+    if name not in ENGINES:
+        raise ValueError(f"موتور ناشناخته: {name}")
+    return ENGINES[name]()
+
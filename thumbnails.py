@@ -0,0 +1,231 @@
+"""ساخت بندانگشتی تصاویر در پس‌زمینه با حافظه نهان LRU محدود
+
+رمزگشایی در رشته‌های کارگر انجام می‌شود و JPEG مستقیماً در مقیاس کوچک
+(draft) و بقیه قالب‌ها با reduce رمزگشایی می‌شوند. بندانگشتی‌ها در حافظه
+(با سقف حجم) و به صورت اختیاری روی دیسک نگه داشته می‌شوند؛ کلید هر
+بندانگشتی شامل زمان تغییر و اندازه فایل است تا فایل تغییرکرده دوباره
+ساخته شود. پوشه دیسک هم سقف حجم دارد و فایل‌هایی که دیرتر از همه استفاده
+شده‌اند (بر اساس زمان تغییر فایل که با هر استفاده به‌روز می‌شود) حذف می‌شوند.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, PngImagePlugin
+
+from page_source import close_file, open_page
+
+THUMBNAIL_SIZE = (450, 450)
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# سقف حجم بندانگشتی‌های روی دیسک (بایت)
+DEFAULT_MAX_DISK_BYTES = 256 * 1024 * 1024
+DEFAULT_THUMB_DIR = os.path.join(os.path.expanduser('~'), '.ocr_offline', 'thumbnails')
+THUMB_WORKERS = 2
+
+
+def make_thumbnail(image_path, size=THUMBNAIL_SIZE):
+    """ساخت بندانگشتی (برای فایل چندصفحه‌ای صفحه اول)؛ خروجی (تصویر، اندازه اصلی)"""
+    img = open_page(image_path)
+    original_size = img.size
+    # JPEG در نزدیک‌ترین مقیاس ۱/۲، ۱/۴ یا ۱/۸ رمزگشایی می‌شود
+    img.draft('RGB', size)
+    if img.mode not in ('RGB', 'RGBA', 'L'):
+        img = img.convert('RGB')
+    # reducing_gap ابتدا با reduce سریع کوچک می‌کند و سپس دقیق نمونه‌برداری می‌کند
+    img.thumbnail(size, reducing_gap=2.0)
+    img.load()
+    return img, original_size
+
+
+class ThumbnailCache:
+    """حافظه نهان بندانگشتی‌ها با بارگذاری در پس‌زمینه
+
+    request(path, callback) نتیجه را با callback(path, thumbnail,
+    original_size, error) برمی‌گرداند؛ اگر بندانگشتی آماده باشد callback
+    بلافاصله در همان رشته و در غیر این صورت در رشته کارگر اجرا می‌شود.
+    """
+
+    def __init__(self, size=THUMBNAIL_SIZE, max_bytes=DEFAULT_MAX_BYTES,
+                 disk_dir=None, workers=THUMB_WORKERS, max_disk_bytes=DEFAULT_MAX_DISK_BYTES):
+        self.size = size
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.disk_entries = OrderedDict()
+        self.disk_bytes = 0
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.disk_lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='thumbnail')
+
+        if disk_dir:
+            try:
+                os.makedirs(disk_dir, exist_ok=True)
+                self._scan_disk()
+            except OSError:
+                self.disk_dir = None
+
+    def make_key(self, image_path):
+        """کلید بندانگشتی؛ None اگر فایل در دسترس نباشد"""
+        try:
+            stat = os.stat(image_path)
+        except OSError:
+            return None
+        return (os.path.abspath(image_path), stat.st_mtime_ns, stat.st_size, self.size)
+
+    def get(self, image_path):
+        """بندانگشتی آماده در حافظه: (تصویر، اندازه اصلی) یا None"""
+        key = self.make_key(image_path)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def request(self, image_path, callback):
+        """درخواست بندانگشتی؛ درخواست‌های هم‌زمان یک تصویر یک بار رمزگشایی می‌شوند"""
+        key = self.make_key(image_path)
+        if key is None:
+            if callback:
+                callback(image_path, None, None, FileNotFoundError(image_path))
+            return
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            else:
+                callbacks = self.pending.get(key)
+                if callbacks is not None:
+                    callbacks.append(callback)
+                    return
+                self.pending[key] = [callback] if callback else []
+
+        if entry is not None:
+            if callback:
+                callback(image_path, entry[0], entry[1], None)
+            return
+        self.executor.submit(self._load, image_path, key)
+
+    def prefetch(self, image_paths):
+        """بارگذاری پیشاپیش بندانگشتی‌ها (مثلاً ردیف‌های نزدیک فهرست)"""
+        for image_path in image_paths:
+            self.request(image_path, None)
+
+    def _load(self, image_path, key):
+        entry = None
+        error = None
+        try:
+            entry = self._load_disk(key)
+            if entry is None:
+                entry = make_thumbnail(image_path, self.size)
+                self._save_disk(key, entry)
+        except Exception as e:
+            error = e
+        finally:
+            # رشته‌های بندانگشتی فایل چندصفحه‌ای را باز نگه نمی‌دارند
+            close_file()
+
+        with self.lock:
+            callbacks = self.pending.pop(key, [])
+            if entry is not None:
+                self._put(key, entry)
+
+        for callback in callbacks:
+            if entry is not None:
+                callback(image_path, entry[0], entry[1], None)
+            else:
+                callback(image_path, None, None, error)
+
+    def _put(self, key, entry):
+        """افزودن به حافظه و حذف قدیمی‌ترین موارد تا زیر سقف حجم"""
+        if key in self.entries:
+            return
+        self.entries[key] = entry
+        self.total_bytes += self._entry_bytes(entry)
+        while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+            _, old = self.entries.popitem(last=False)
+            self.total_bytes -= self._entry_bytes(old)
+
+    def _entry_bytes(self, entry):
+        img = entry[0]
+        return img.width * img.height * len(img.getbands())
+
+    def _disk_path(self, key):
+        if not self.disk_dir:
+            return None
+        name = hashlib.blake2b(repr(key).encode('utf-8'), digest_size=16).hexdigest()
+        return os.path.join(self.disk_dir, name + '.png')
+
+    def _scan_disk(self):
+        """فهرست بندانگشتی‌های موجود روی دیسک به ترتیب آخرین استفاده"""
+        files = []
+        with os.scandir(self.disk_dir) as it:
+            for item in it:
+                if item.name.endswith('.png') and item.is_file():
+                    stat = item.stat()
+                    files.append((stat.st_mtime_ns, item.name, stat.st_size))
+        with self.disk_lock:
+            for _, name, size in sorted(files):
+                self.disk_entries[name] = size
+                self.disk_bytes += size
+            self._evict_disk()
+
+    def _load_disk(self, key):
+        path = self._disk_path(key)
+        if path is None:
+            return None
+        try:
+            with Image.open(path) as img:
+                img.load()
+                # اندازه اصلی در متادیتای PNG ذخیره شده است
+                width, height = img.info.get('original_size', '0x0').split('x')
+                entry = img.copy(), (int(width), int(height))
+            # زمان تغییر فایل زمان آخرین استفاده است
+            os.utime(path)
+        except OSError:
+            # فایل نیست، ناقص است یا هم‌زمان حذف شده؛ دوباره ساخته می‌شود
+            return None
+        with self.disk_lock:
+            if os.path.basename(path) in self.disk_entries:
+                self.disk_entries.move_to_end(os.path.basename(path))
+        return entry
+
+    def _save_disk(self, key, entry):
+        path = self._disk_path(key)
+        if path is None:
+            return
+        info = PngImagePlugin.PngInfo()
+        info.add_text('original_size', f"{entry[1][0]}x{entry[1][1]}")
+        try:
+            entry[0].save(path, pnginfo=info)
+            size = os.path.getsize(path)
+        except OSError:
+            return
+        name = os.path.basename(path)
+        with self.disk_lock:
+            self.disk_bytes += size - self.disk_entries.pop(name, 0)
+            self.disk_entries[name] = size
+            self._evict_disk()
+
+    def _evict_disk(self):
+        """حذف بندانگشتی‌هایی که دیرتر از همه استفاده شده‌اند تا رسیدن به سقف حجم دیسک"""
+        while self.disk_bytes > self.max_disk_bytes and len(self.disk_entries) > 1:
+            name, size = self.disk_entries.popitem(last=False)
+            self.disk_bytes -= size
+            try:
+                os.remove(os.path.join(self.disk_dir, name))
+            except OSError:
+                pass
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
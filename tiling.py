@@ -0,0 +1,258 @@
+"""OCR کاشی‌کاری‌شده برای تصاویر بسیار بزرگ (نقشه‌های مهندسی، پانوراما)
+
+تصویر به کاشی‌های هم‌پوشان تقسیم می‌شود و هر کاشی جداگانه برش،
+پیش‌پردازش و با یکی از موتورهای مخزن خوانده می‌شود؛ کاشی‌ها در چند
+رشته موازی پردازش می‌شوند (نسخه خاکستری، میانه و آستانه کل تصویر ساخته
+نمی‌شود). میانگین کنتراست و آستانه Otsu یک بار از نسخه کوچک کل تصویر
+حساب می‌شوند تا کاشی‌ها یکسان پیش‌پردازش شوند.
+
+حافظه تصویر منبع به قالب فایل بستگی دارد. TIFF فشرده‌نشده با چند نوار یا
+کاشی ردیف‌به‌ردیف کاشی‌ها خوانده می‌شود و فقط یک نوار افقی به ارتفاع کاشی
+رمزگشایی می‌شود؛ TIFF فشرده‌نشده تک‌نواری با mmap باز می‌شود. Pillow
+نمی‌تواند بخشی از JPEG، PNG یا TIFF فشرده (libtiff) را رمزگشایی کند؛ این
+قالب‌ها عمداً یک بار کامل بارگذاری می‌شوند (JPEG مستقیماً خاکستری) و حافظه
+آن‌ها با اندازه تصویر بالا می‌رود.
+
+مرز بین دو کاشی وسط ناحیه هم‌پوشانی است و هر کلمه فقط از کاشی‌ای نگه
+داشته می‌شود که مرکز کادرش در سهم آن کاشی باشد؛ اگر هم‌پوشانی از
+بلندترین کلمه بزرگ‌تر باشد، کاشی صاحب کلمه آن را کامل دیده است و تکه
+بریده همان کلمه در کاشی کناری (که مرکزش سمت دیگر مرز است) حذف می‌شود.
+کلمات نگه‌داشته بر اساس موقعیت در کل تصویر دوباره به خط تبدیل می‌شوند.
+"""
+import os
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import numpy as np
+from PIL import Image
+
+from preprocessing import (
+    preprocess, page_sample, histogram_mean, contrast_lut, otsu_threshold,
+    DEFAULT_THRESHOLD_METHOD, PAGE_SAMPLE_SIDE
+)
+from tesseract_engine import create_engine
+
+# تصاویر بزرگ‌تر از این تعداد پیکسل کاشی‌کاری می‌شوند
+TILE_MIN_PIXELS = 40_000_000
+
+# ضلع کاشی و عرض هم‌پوشانی (پیکسل)؛ هم‌پوشانی باید از بلندترین کلمه بیشتر باشد
+TILE_SIZE = 4096
+TILE_OVERLAP = 256
+
+# اندازه بلوک حافظه تصاویر Pillow هنگام خواندن نوار به نوار (بایت)؛ بلوک‌های
+# بزرگ‌تر از آستانه mmap در glibc با آزاد شدن به سیستم عامل برمی‌گردند و
+# نوارهای پیاپی حافظه را تکه‌تکه و رو به افزایش نمی‌کنند
+BAND_BLOCK_SIZE = 64 * 1024 * 1024
+
+# فاصله عمودی بیش از این ضریب ارتفاع خط، پاراگراف جدید است
+PARAGRAPH_GAP = 1.5
+
+
+def needs_tiling(img, config):
+    width, height = img.size
+    return width * height > config.get('tile_min_pixels', TILE_MIN_PIXELS)
+
+
+def tile_spans(length, size=TILE_SIZE, overlap=TILE_OVERLAP):
+    """بازه‌های کاشی در یک راستا: فهرست (شروع، پایان، شروع سهم، پایان سهم)
+
+    سهم هر کاشی تا وسط هم‌پوشانی با کاشی‌های کناری است و سهم‌ها کل طول
+    را بدون هم‌پوشانی می‌پوشانند.
+    """
+    if length <= size:
+        return [(0, length, 0, length)]
+    count = -(-(length - overlap) // (size - overlap))
+    step = (length - overlap) / count
+    bounds = [(round(i * step), min(length, round((i + 1) * step + overlap))) for i in range(count)]
+
+    spans = []
+    for i, (start, end) in enumerate(bounds):
+        core_start = 0 if i == 0 else (start + bounds[i - 1][1]) // 2
+        core_end = length if i == count - 1 else (bounds[i + 1][0] + end) // 2
+        spans.append((start, end, core_start, core_end))
+    return spans
+
+
+def tile_grid(width, height, size=TILE_SIZE, overlap=TILE_OVERLAP):
+    """کاشی‌های تصویر: فهرست (کادر کاشی، کادر سهم) به ترتیب سطر"""
+    return [
+        ((x0, y0, x1, y1), (cx0, cy0, cx1, cy1))
+        for y0, y1, cy0, cy1 in tile_spans(height, size, overlap)
+        for x0, x1, cx0, cx1 in tile_spans(width, size, overlap)
+    ]
+
+
+def band_reader(img):
+    """تابع read(y0, y1) برای رمزگشایی فقط یک نوار افقی تصویر، یا None
+
+    فقط برای TIFF فشرده‌نشده با چند نوار یا کاشی ممکن است؛ هر بار فایل
+    دوباره باز و فقط نوارهای ذخیره‌شده هم‌پوشان با بازه رمزگشایی می‌شوند.
+    خروجی read زوج (تصویر نوارها با عرض کل تصویر، ردیف آغاز آن در تصویر)
+    است؛ تصویر بدون برش دوباره برگردانده می‌شود تا نوار دو بار کپی نشود.
+    """
+    tiles = getattr(img, 'tile', None)
+    if (img.format != 'TIFF' or not getattr(img, 'filename', None) or not tiles or len(tiles) < 2
+            or any(tile[0] == 'libtiff' for tile in tiles)):
+        return None
+    frame = img.tell()
+    if Image.core.get_block_size() < BAND_BLOCK_SIZE:
+        Image.core.set_block_size(BAND_BLOCK_SIZE)
+
+    def read(y0, y1):
+        with Image.open(img.filename) as band:
+            if frame:
+                band.seek(frame)
+            parts = [tile for tile in band.tile if tile[1][1] < y1 and tile[1][3] > y0]
+            top = min(tile[1][1] for tile in parts)
+            bottom = max(tile[1][3] for tile in parts)
+            # تصویر فقط به اندازه نوارهای انتخاب‌شده ساخته می‌شود
+            band._size = (band.width, bottom - top)
+            band.tile = [shift_tile(tile, top) for tile in parts]
+            band.load()
+            return band, top
+    return read
+
+
+def shift_tile(tile, top):
+    """جابه‌جایی عمودی کادر یک توصیف‌گر نوار Pillow (تاپل یا ImageFile._Tile)"""
+    x0, y0, x1, y1 = tile[1]
+    extents = (x0, y0 - top, x1, y1 - top)
+    if hasattr(tile, '_replace'):
+        return tile._replace(extents=extents)
+    return (tile[0], extents) + tuple(tile[2:])
+
+
+def banded_sample(img, read, side=PAGE_SAMPLE_SIDE):
+    """نسخه خاکستری کوچک (مانند page_sample) با خواندن نوار به نوار"""
+    width, height = img.size
+    reduction = max(1, -(-max(width, height) // side))
+    sample = Image.new('L', (-(-width // reduction), -(-height // reduction)))
+    step = reduction * max(1, TILE_SIZE // reduction)
+    for y0 in range(0, height, step):
+        y1 = min(height, y0 + step)
+        band, top = read(y0, y1)
+        if band.mode in ('1', 'P'):
+            band = band.convert('L')
+        part = band.reduce(reduction, (0, y0 - top, width, y1 - top))
+        del band
+        if part.mode != 'L':
+            part = part.convert('L')
+        sample.paste(part, (0, y0 // reduction))
+    return sample
+
+
+def tile_config(img, config, sample=None):
+    """تنظیمات پیش‌پردازش کاشی‌ها با آماره‌های کل تصویر از نسخه کوچک آن
+
+    نرمال‌سازی وضوح در حالت کاشی انجام نمی‌شود.
+    """
+    config = dict(config, normalize=False)
+    if sample is None:
+        sample = page_sample(img)
+    hist = sample.histogram()
+    lut = list(range(256))
+    if config['enhance_contrast']:
+        mean = histogram_mean(hist)
+        config['contrast_mean'] = mean
+        lut = contrast_lut(int(mean + 0.5))
+    if config['binary'] and config.get('threshold_method', DEFAULT_THRESHOLD_METHOD) == 'otsu':
+        config['threshold_method'] = 'fixed'
+        config['threshold'] = otsu_threshold(np.bincount(lut, weights=hist, minlength=256))
+    return config
+
+
+def merge_words(words):
+    """متن کل تصویر از کلمات {'text', 'box'} با مختصات کل تصویر"""
+    lines = []
+    for word in sorted(words, key=lambda w: w['box'][1] + w['box'][3]):
+        left, top, right, bottom = word['box']
+        middle = (top + bottom) / 2
+        line = lines[-1] if lines else None
+        if line is not None and line['top'] <= middle <= line['bottom']:
+            line['words'].append(word)
+            line['top'] = min(line['top'], top)
+            line['bottom'] = max(line['bottom'], bottom)
+        else:
+            lines.append({'words': [word], 'top': top, 'bottom': bottom})
+
+    parts = []
+    previous = None
+    for line in lines:
+        if previous is not None:
+            height = previous['bottom'] - previous['top']
+            if line['top'] - previous['bottom'] > PARAGRAPH_GAP * height:
+                parts.append('')
+        parts.append(' '.join(w['text'] for w in sorted(line['words'], key=lambda w: w['box'][0])))
+        previous = line
+    return '\n'.join(parts) + '\n'
+
+
+def recognize_tiled(img, config, tesseract_config, workers=None, deadline=None, engines=None):
+    """OCR تصویر بزرگ کاشی‌به‌کاشی در چند رشته؛ خروجی {'text', 'tiles'}
+
+    هر رشته در هر لحظه یک موتور جدا از مخزن موتورها دارد (موتور tesserocr
+    امن برای چند رشته نیست). موتورها مهلت deadline کل تصویر را دارند و
+    تا پایان کار در مجموعه engines (در صورت وجود) هستند تا فراخواننده
+    بتواند آن‌ها را لغو کند. کاشی‌ها ردیف‌به‌ردیف خوانده می‌شوند تا در
+    صورت امکان (band_reader) فقط نوار همان ردیف رمزگشایی شود.
+    """
+    read = band_reader(img)
+    if read is None:
+        if img.format == 'JPEG':
+            # رمزگشایی مستقیم خاکستری بدون نسخه رنگی کامل
+            img.draft('L', img.size)
+        img.load()
+
+    size = config.get('tile_size', TILE_SIZE)
+    overlap = config.get('tile_overlap', TILE_OVERLAP)
+    tiles = tile_grid(img.width, img.height, size, overlap)
+    prepared = tile_config(img, config, banded_sample(img, read) if read else None)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(tiles)))
+
+    # ردیف‌های کاشی: همه کاشی‌های یک ردیف بازه عمودی یکسان دارند
+    rows = {}
+    for tile in tiles:
+        rows.setdefault(tile[0][1::2], []).append(tile)
+
+    pool = queue.Queue()
+    created = []
+    for _ in range(workers):
+        engine = create_engine(config.get('engine'))
+        engine.deadline = deadline
+        created.append(engine)
+        pool.put(engine)
+    if engines is not None:
+        engines.update(created)
+
+    def read_tile(source, top, tile):
+        (x0, y0, x1, y1), (cx0, cy0, cx1, cy1) = tile
+        engine = pool.get()
+        try:
+            # برش فقط همین کاشی را کپی می‌کند
+            part = preprocess(source.crop((x0, y0 - top, x1, y1 - top)), prepared)
+            found = engine.recognize_words(part, tesseract_config)
+        finally:
+            pool.put(engine)
+        kept = []
+        for word in found:
+            left, top, right, bottom = word['box']
+            box = (left + x0, top + y0, right + x0, bottom + y0)
+            middle_x, middle_y = (box[0] + box[2]) / 2, (box[1] + box[3]) / 2
+            if cx0 <= middle_x < cx1 and cy0 <= middle_y < cy1:
+                kept.append(dict(word, box=box))
+        return kept
+
+    try:
+        words = []
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ocr-tile') as executor:
+            for (y0, y1), row in rows.items():
+                source, top = read(y0, y1) if read else (img, 0)
+                for kept in executor.map(partial(read_tile, source, top), row):
+                    words.extend(kept)
+    finally:
+        if engines is not None:
+            engines.difference_update(created)
+        for engine in created:
+            engine.close()
+    return {'text': merge_words(words), 'tiles': len(tiles)}
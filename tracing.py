@@ -0,0 +1,157 @@
+"""آمار زمان مراحل پردازش و خروجی خط زمانی Chrome Trace
+
+هر نتیجه در result['timings'] زمان هر مرحله (ثانیه) را دارد. StageStats
+این زمان‌ها را جمع می‌کند و جدول p50/p95/max می‌سازد. با config['trace']
+هر نتیجه در result['trace'] بازه‌های زمانی مراحل را همراه با شناسه فرایند
+و رشته سازنده‌اش دارد و TraceWriter آن‌ها را در قالب JSON رویدادهای Chrome
+(قابل باز کردن در chrome://tracing یا ui.perfetto.dev) می‌نویسد.
+PipelineStats میزان مشغول بودن مراحل خط لوله پردازش ترتیبی را نشان می‌دهد.
+"""
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# ترتیب نمایش مراحل شناخته‌شده در جدول
+STAGE_ORDER = (
+    'queue', 'read', 'cache', 'open', 'classify', 'estimate', 'decode', 'resample', 'grayscale',
+    'stats', 'denoise', 'contrast', 'binarize', 'ocr', 'cascade', 'clean_text', 'extract_codes', 'total'
+)
+
+
+def percentile(sorted_values, fraction):
+    """صدک به روش نزدیک‌ترین رتبه روی فهرست مرتب"""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(fraction * len(sorted_values)) - 1
+    return sorted_values[max(0, min(len(sorted_values) - 1, rank))]
+
+
+class StageStats:
+    """جمع زمان مراحل همه نتایج برای جدول پایانی"""
+
+    def __init__(self):
+        self.durations = {}
+
+    def add(self, timings):
+        for stage, seconds in (timings or {}).items():
+            self.durations.setdefault(stage, []).append(seconds)
+
+    def rows(self):
+        """(مرحله، تعداد، p50، p95، بیشینه، مجموع) به ثانیه"""
+        order = {stage: i for i, stage in enumerate(STAGE_ORDER)}
+        stages = sorted(self.durations, key=lambda s: (order.get(s, len(order)), s))
+        rows = []
+        for stage in stages:
+            values = sorted(self.durations[stage])
+            rows.append((stage, len(values), percentile(values, 0.5),
+                         percentile(values, 0.95), values[-1], sum(values)))
+        return rows
+
+    def table(self):
+        """جدول متنی زمان مراحل به میلی‌ثانیه"""
+        lines = [f"{'مرحله':<14} {'تعداد':>7} {'p50':>9} {'p95':>9} {'max':>9} {'مجموع':>10}"]
+        for stage, count, p50, p95, peak, total in self.rows():
+            lines.append(
+                f"{stage:<14} {count:>7} {p50 * 1000:>9.1f} {p95 * 1000:>9.1f} "
+                f"{peak * 1000:>9.1f} {total * 1000:>10.0f}"
+            )
+        return '\n'.join(lines)
+
+
+class PipelineStats:
+    """زمان کار هر مرحله خط لوله پردازش و عمق صف‌های بین مراحل"""
+
+    def __init__(self, stages, queues):
+        self.busy = {stage: 0.0 for stage in stages}
+        self.items = {stage: 0 for stage in stages}
+        self.capacity = dict(queues)
+        self.depths = {name: [] for name in queues}
+        self.lock = threading.Lock()
+        self.start = time.perf_counter()
+        self.elapsed = 0.0
+
+    def record(self, stage, seconds, items=1):
+        with self.lock:
+            self.busy[stage] += seconds
+            self.items[stage] += items
+
+    def sample(self, name, depth):
+        """ثبت عمق صف هنگام برداشتن یک مورد از آن"""
+        with self.lock:
+            self.depths[name].append(depth)
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.start
+
+    def table(self):
+        """جدول متنی استفاده از مراحل و عمق صف‌ها"""
+        elapsed = self.elapsed or (time.perf_counter() - self.start)
+        lines = [f"{'مرحله':<14} {'تعداد':>7} {'مشغول s':>9} {'استفاده':>8}"]
+        for stage, busy in self.busy.items():
+            share = busy / elapsed if elapsed else 0.0
+            lines.append(f"{stage:<14} {self.items[stage]:>7} {busy:>9.2f} {share:>8.0%}")
+        lines.append(f"{'صف':<14} {'ظرفیت':>7} {'میانگین':>9} {'بیشینه':>8}")
+        for name, depths in self.depths.items():
+            mean = sum(depths) / len(depths) if depths else 0.0
+            lines.append(f"{name:<14} {self.capacity[name]:>7} {mean:>9.1f} {max(depths, default=0):>8}")
+        return '\n'.join(lines)
+
+
+class TraceWriter:
+    """جمع رویدادهای trace همه فرایندها و نوشتن آن‌ها در یک فایل JSON"""
+
+    def __init__(self, process_name='ocr'):
+        self.events = []
+        self.pid = os.getpid()
+        self.lanes = {(self.pid, None): process_name}
+
+    def add_result(self, result, index=None):
+        """افزودن بازه‌های مراحل یک نتیجه (result['trace'])"""
+        trace = result.get('trace')
+        if not trace:
+            return
+        pid, tid = trace['pid'], trace['tid']
+        if (pid, None) not in self.lanes:
+            self.lanes[(pid, None)] = 'ocr' if pid == self.pid else f"worker {pid}"
+        self.lanes.setdefault((pid, tid), trace.get('thread') or f"thread {tid}")
+
+        args = {'file': result.get('filename')}
+        if index is not None:
+            args['index'] = index
+        for name, start, duration in trace['spans']:
+            self.events.append({
+                'name': name, 'cat': 'stage', 'ph': 'X',
+                'ts': round(start, 1), 'dur': round(duration, 1),
+                'pid': pid, 'tid': tid, 'args': args
+            })
+
+    @contextmanager
+    def span(self, name, **args):
+        """ثبت یک بازه در فرایند و رشته فعلی"""
+        tid = threading.get_ident()
+        self.lanes.setdefault((self.pid, tid), threading.current_thread().name)
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.events.append({
+                'name': name, 'cat': 'batch', 'ph': 'X',
+                'ts': round(start * 1e6, 1), 'dur': round((time.time() - start) * 1e6, 1),
+                'pid': self.pid, 'tid': tid, 'args': args
+            })
+
+    def write(self, path):
+        """نوشتن فایل trace همراه با نام فرایندها و رشته‌ها"""
+        metadata = []
+        for (pid, tid), name in self.lanes.items():
+            if tid is None:
+                metadata.append({'name': 'process_name', 'ph': 'M', 'pid': pid, 'args': {'name': name}})
+            else:
+                metadata.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': name}})
+
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': metadata + self.events, 'displayTimeUnit': 'ms'},
+                      f, ensure_ascii=False)